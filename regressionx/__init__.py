@@ -1,4 +1,6 @@
 from .domain import Case as Case
+from .domain import Preprocess as Preprocess
+from .domain import PyCall as PyCall
 from .config import load_config as load_config
 from .factory import Template as Template
 
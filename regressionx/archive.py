@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from .metrics import write_atomic
+
+ARCHIVE_VERSION = 1
+CHUNK_SIZE = 4 * 1024 * 1024
+COMPRESS_LEVEL = 3
+STAT_CACHE_NAME = "statcache.json"
+
+@dataclass
+class ArchiveStats:
+    files: int = 0
+    bytes: int = 0
+    unchanged_files: int = 0 # Taken from the stat cache without reading
+    new_chunks: int = 0
+    stored_bytes: int = 0    # Compressed bytes of the new chunks
+
+    def summary(self) -> str:
+        return (f"{self.files} files, {self.bytes} bytes ({self.unchanged_files} unchanged); "
+                f"{self.new_chunks} new chunks, {self.stored_bytes} bytes stored")
+
+
+class ChunkStore:
+    """
+    A content-addressed store of zlib-compressed chunks under `root`.
+
+    Files are split into fixed-size chunks named by the sha256 of their raw
+    content, so identical files and identical runs of chunks are stored once,
+    across sides, cases and runs. Each archived run has an index under
+    `runs/` listing, per case and side, every entry and its chunk digests.
+    A stat cache maps (path, size, mtime, inode) to chunk digests so that
+    unchanged files are added without being read.
+    """
+    def __init__(self, root: Path, chunk_size: int = CHUNK_SIZE, level: int = COMPRESS_LEVEL):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.level = level
+        self._lock = threading.Lock()
+        self._stat_cache: Optional[Dict[str, list]] = None
+
+    # -- Chunks --------------------------------------------------------------
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest
+
+    def put_chunk(self, data: bytes, stats: Optional[ArchiveStats] = None) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if path.exists():
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        packed = zlib.compress(data, self.level)
+        fd, tmp_path = tempfile.mkstemp(prefix=".chunk-", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(packed)
+            # link() fails if the chunk exists, so of two writers only one creates it
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return digest
+        finally:
+            os.unlink(tmp_path)
+        if stats is not None:
+            with self._lock:
+                stats.new_chunks += 1
+                stats.stored_bytes += len(packed)
+        return digest
+
+    def get_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    # -- Stat cache ----------------------------------------------------------
+
+    def _load_stat_cache(self) -> Dict[str, list]:
+        if self._stat_cache is None:
+            try:
+                with open(self.root / STAT_CACHE_NAME, encoding="utf-8") as f:
+                    self._stat_cache = json.load(f)
+            except (OSError, ValueError):
+                self._stat_cache = {}
+        return self._stat_cache
+
+    def save_stat_cache(self):
+        with self._lock:
+            cache = dict(self._load_stat_cache())
+        write_atomic(str(self.root / STAT_CACHE_NAME), json.dumps(cache))
+
+    # -- Files and trees -----------------------------------------------------
+
+    def put_file(self, path: Path, stats: Optional[ArchiveStats] = None) -> dict:
+        """
+        Streams one file into the store and returns its index entry.
+        """
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        signature = [st.st_size, st.st_mtime_ns, st.st_ino]
+        with self._lock:
+            cached = self._load_stat_cache().get(key)
+        if cached is not None and cached[:3] == signature and all(
+            self._chunk_path(d).exists() for d in cached[3]
+        ):
+            chunks = cached[3]
+            if stats is not None:
+                with self._lock:
+                    stats.unchanged_files += 1
+        else:
+            chunks = []
+            with open(path, "rb") as f:
+                while True:
+                    data = f.read(self.chunk_size)
+                    if not data:
+                        break
+                    chunks.append(self.put_chunk(data, stats))
+            with self._lock:
+                self._load_stat_cache()[key] = signature + [chunks]
+        if stats is not None:
+            with self._lock:
+                stats.files += 1
+                stats.bytes += st.st_size
+        return {"type": "file", "size": st.st_size, "mode": st.st_mode & 0o777, "chunks": chunks}
+
+    def put_trees(
+        self,
+        roots: List[Path],
+        jobs: int = 4,
+        stats: Optional[ArchiveStats] = None
+    ) -> List[dict]:
+        """
+        Archives several output trees (or single files) with `jobs` threads.
+        Files are streamed in chunks; at most 2 * `jobs` are in flight.
+        """
+        trees = []
+        for root in roots:
+            root = Path(root)
+            if not root.exists():
+                trees.append(None)
+            else:
+                trees.append({"is_file": root.is_file(), "entries": {}})
+
+        def walk() -> Iterator[Tuple[dict, str, Path]]:
+            for tree, root in zip(trees, roots):
+                if tree is None:
+                    continue
+                root = Path(root)
+                if tree["is_file"]:
+                    yield tree, root.name, root
+                    continue
+                for dirpath, dirnames, filenames in os.walk(root):
+                    dirnames.sort()
+                    rel_dir = Path(dirpath).relative_to(root)
+                    with self._lock:
+                        for name in dirnames:
+                            tree["entries"][(rel_dir / name).as_posix()] = {"type": "dir"}
+                    for name in sorted(filenames):
+                        yield tree, (rel_dir / name).as_posix(), Path(dirpath) / name
+
+        slots = threading.BoundedSemaphore(2 * jobs)
+        errors = []
+
+        def ingest(tree, rel, path):
+            try:
+                entry = self.put_file(path, stats)
+                with self._lock:
+                    tree["entries"][rel] = entry
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+        # No per-file futures are kept, so memory does not grow with the file count
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="regressionx-archive") as executor:
+            for tree, rel, path in walk():
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                executor.submit(ingest, tree, rel, path)
+        if errors:
+            raise errors[0]
+        return trees
+
+    def restore_tree(self, tree: dict, dest: Path):
+        """
+        Writes an archived tree (or single file) to `dest`.
+        """
+        dest = Path(dest)
+        if tree["is_file"]:
+            entry = next(iter(tree["entries"].values()))
+            self._restore_file(entry, dest)
+            return
+        dest.mkdir(parents=True, exist_ok=True)
+        for rel, entry in sorted(tree["entries"].items()):
+            target = dest / rel
+            if entry["type"] == "dir":
+                target.mkdir(parents=True, exist_ok=True)
+            else:
+                self._restore_file(entry, target)
+
+    def _restore_file(self, entry: dict, target: Path):
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as f:
+            for digest in entry["chunks"]:
+                f.write(self.get_chunk(digest))
+        os.chmod(target, entry.get("mode", 0o644))
+
+    # -- Run indexes ---------------------------------------------------------
+
+    def index_path(self, run_id: str) -> Path:
+        return self.root / "runs" / f"{quote(run_id, safe='')}.json"
+
+    def write_index(self, run_id: str, cases: Dict[str, dict]):
+        index = {"version": ARCHIVE_VERSION, "run": run_id, "created": time.time(), "cases": cases}
+        write_atomic(str(self.index_path(run_id)), json.dumps(index, sort_keys=True))
+
+    def load_index(self, run_id: str) -> dict:
+        path = self.index_path(run_id)
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported archive index version in {path}: {index.get('version')}")
+        return index
+
+    def runs(self) -> List[str]:
+        """
+        Ids of the archived runs, oldest first by the time their index was written.
+        """
+        runs_dir = self.root / "runs"
+        if not runs_dir.is_dir():
+            return []
+        created = []
+        for path in runs_dir.glob("*.json"):
+            run_id = unquote(path.stem)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    created.append((json.load(f).get("created", 0.0), run_id))
+            except (OSError, ValueError):
+                continue # Unreadable index; load_index reports it if asked for
+        return [run_id for _, run_id in sorted(created)]
+
+def default_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S")
@@ -1,9 +1,27 @@
 import argparse
+import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
 from pathlib import Path
 from .config import load_config
-from .executor import run_case, skipped_result
-from .comparator import compare_directories
+from .executor import run_case, skipped_result, cancel_on_interrupt, CancelToken, CaseCancelled
+from .comparator import compare_directories, IncrementalComparator, ComparatorResult, DEFAULT_MAX_EXAMPLES
+from .metrics import RunMetrics, MetricsWriter
+from .trace import Tracer, Profiler, ProbeSet
+from .scheduler import Scheduler
+from .pool import PyWorkerPools
+from .flaky import scratch_case, summarize
+from .sampling import DEFAULT_SAMPLE_FRACTION
+from .scratch import ScratchBudget, ScratchRun, parse_size
+from .resources import ResourceAdmission
+from .archive import ArchiveStats, ChunkStore, default_run_id
+from .merkle import MerkleIncrementalComparator, merkle_compare
+from .preprocess import collect_preprocesses, run_preprocesses
+from .manifest import build_manifest, write_manifest, load_manifest, manifest_path, compare_to_manifest
 
 COMMAND_MODES = {
     "run": (True, True, False),
@@ -12,91 +30,646 @@ COMMAND_MODES = {
     "run_cand": (False, True, False),
 }
 
+# Arguments holding paths, made absolute before a request is sent to a daemon
+PATH_ARGS = ("config", "report", "metrics", "trace", "profile", "manifests", "rerun_dir",
+             "scratch_root", "from_archive")
+
 def main(args=None):
     if args is None:
         args = sys.argv[1:]
-        
+
     parser = argparse.ArgumentParser(description="RegressionX CLI")
     subparsers = parser.add_subparsers(dest="command", required=True)
-    
+
     def add_common_args(subparser):
         subparser.add_argument("--config", required=True, help="Path to config file")
         subparser.add_argument("--report", default="regression_report.md", help="Path to generate Markdown report")
+        subparser.add_argument("--metrics", default=None,
+                               help="Periodically write run metrics to this file (.json for JSON, otherwise Prometheus text)")
+        subparser.add_argument("--metrics-interval", type=float, default=10.0,
+                               help="Seconds between metrics file updates (default: 10)")
+        subparser.add_argument("--trace", default=None,
+                               help="Write a Chrome trace-event timeline of run phases to this JSON file")
+        subparser.add_argument("--profile", default=None,
+                               help="Profile comparison and reporting with cProfile and dump stats to this file")
+        subparser.add_argument("--incremental-compare", action="store_true",
+                               help="Compare settled output files while the commands are still running")
+        subparser.add_argument("--poll-interval", type=float, default=5.0,
+                               help="Seconds between output scans in --incremental-compare mode (default: 5)")
+        subparser.add_argument("--jobs", "-j", type=int, default=None,
+                               help="Number of cases to run concurrently (default: 1, or the CPU count with --adaptive; through a daemon, its slots)")
+        subparser.add_argument("--adaptive", action="store_true",
+                               help="Start cases only when their cores/memory hints fit the host and it is not under pressure")
+        subparser.add_argument("--host-cores", type=float, default=None, metavar="N",
+                               help="Cores available to --adaptive (default: all)")
+        subparser.add_argument("--host-memory", type=parse_size, default=None, metavar="SIZE",
+                               help="Memory available to --adaptive (default: MemTotal)")
+        subparser.add_argument("--max-failures", type=int, default=None, metavar="N",
+                               help="Stop scheduling cases and kill running ones after N failures")
+        subparser.add_argument("--fail-fast", action="store_true",
+                               help="Shorthand for --max-failures 1")
+        subparser.add_argument("--rerun-preprocess", action="store_true",
+                               help="Run preprocess steps even if their fingerprint is unchanged")
+        subparser.add_argument("--manifests", default=None, metavar="DIR",
+                               help="Compare candidates against baseline manifests in DIR instead of base_path (compare/run_cand)")
+        subparser.add_argument("--text-digests", action="store_true",
+                               help="Compare text files by normalized-text digest when manifests provide one")
+        subparser.add_argument("--sample", type=float, nargs="?", const=DEFAULT_SAMPLE_FRACTION, default=None,
+                               metavar="FRACTION",
+                               help=f"Spot-check files: compare sizes, head, tail and ~FRACTION of random blocks (default: {DEFAULT_SAMPLE_FRACTION})")
+        subparser.add_argument("--merkle", action="store_true",
+                               help="Compare by Merkle directory digests cached next to the outputs; skip equal subtrees")
+        subparser.add_argument("--max-examples", type=int, default=DEFAULT_MAX_EXAMPLES, metavar="N",
+                               help=f"List at most N differences per category and case; count and group the rest (default: {DEFAULT_MAX_EXAMPLES})")
+        subparser.add_argument("--rerun-failures", type=int, default=0, metavar="N",
+                               help="Re-run each failed case N times in parallel to classify it as FAIL or FLAKY")
+        subparser.add_argument("--rerun-dir", default=None, metavar="DIR",
+                               help="Scratch directory for --rerun-failures (default: a temporary directory)")
+        subparser.add_argument("--scratch-root", default=None, metavar="DIR",
+                               help="Run cases in DIR (e.g. /dev/shm) and copy outputs to base_path/cand_path only on failure")
+        subparser.add_argument("--scratch-budget", type=parse_size, default=None, metavar="SIZE",
+                               help="Do not start cases that could push --scratch-root usage past SIZE (e.g. 20G)")
+        subparser.add_argument("--scratch-estimate", type=parse_size, default=None, metavar="SIZE",
+                               help="Expected scratch footprint of a case until one is measured "
+                                    "(default: run cases one at a time until then)")
+        subparser.add_argument("--keep-outputs", action="store_true",
+                               help="With --scratch-root, also copy outputs of passing cases")
+        subparser.add_argument("--socket", default=None, metavar="PATH",
+                               help="Daemon socket to send the request to, if a daemon listens there (default: $REGRESSIONX_SOCKET)")
+        subparser.add_argument("--no-daemon", action="store_true",
+                               help="Run in this process even if a daemon is listening")
+        subparser.add_argument("--from-archive", default=None, metavar="DIR",
+                               help="Restore archived outputs from DIR per case before comparing (compare/run_cand)")
+        subparser.add_argument("--archive-run", default=None, metavar="RUN",
+                               help="Archived run to use with --from-archive (default: the latest)")
 
     add_common_args(subparsers.add_parser("run"))
     add_common_args(subparsers.add_parser("compare"))
     add_common_args(subparsers.add_parser("run_base"))
     add_common_args(subparsers.add_parser("run_cand"))
-    
+
+    freeze_parser = subparsers.add_parser("freeze", help="Freeze each case's base_path into a digest manifest")
+    freeze_parser.add_argument("--config", required=True, help="Path to config file")
+    freeze_parser.add_argument("--manifests", required=True, metavar="DIR", help="Directory to write manifests to")
+    freeze_parser.add_argument("--text-digests", action="store_true",
+                               help="Also record normalized-text digests for text files")
+    freeze_parser.add_argument("--jobs", "-j", type=int, default=1,
+                               help="Number of cases to freeze concurrently (default: 1)")
+
+    archive_parser = subparsers.add_parser("archive", help="Store each case's output trees in a deduplicating archive")
+    archive_parser.add_argument("--config", required=True, help="Path to config file")
+    archive_parser.add_argument("--store", required=True, metavar="DIR", help="Archive directory")
+    archive_parser.add_argument("--run", default=None, metavar="RUN",
+                                help="Id of the archived run (default: current date and time)")
+    archive_parser.add_argument("--jobs", "-j", type=int, default=4,
+                                help="Number of files to ingest concurrently (default: 4)")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve run/compare requests from a warm process on a Unix socket")
+    serve_parser.add_argument("--socket", default=None, metavar="PATH",
+                              help="Socket path (default: $REGRESSIONX_SOCKET, else regressionx.sock in $XDG_RUNTIME_DIR or /tmp/regressionx-<uid>)")
+    serve_parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                              help="Cases running at once across all requests (default: CPU count)")
+
     parsed_args = parser.parse_args(args)
-    
+
+    if parsed_args.command == "serve":
+        from .daemon import serve
+        try:
+            serve(parsed_args.socket, slots=parsed_args.jobs)
+        except (OSError, RuntimeError) as e:
+            print(f"Error starting daemon: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if parsed_args.command == "freeze":
+        _freeze(parsed_args)
+        return
+
+    if parsed_args.command == "archive":
+        _archive(parsed_args)
+        return
+
     if parsed_args.command in COMMAND_MODES:
+        if parsed_args.metrics_interval <= 0:
+            parser.error("--metrics-interval must be positive")
+        if parsed_args.manifests and COMMAND_MODES[parsed_args.command][0]:
+            parser.error("--manifests replaces the baseline tree and cannot be used when running the baseline")
+        if parsed_args.rerun_failures and COMMAND_MODES[parsed_args.command][2]:
+            parser.error("--rerun-failures needs a mode that runs commands")
+        if parsed_args.scratch_root and COMMAND_MODES[parsed_args.command][2]:
+            parser.error("--scratch-root needs a mode that runs commands")
+        if parsed_args.from_archive:
+            if COMMAND_MODES[parsed_args.command][0]:
+                parser.error("--from-archive replaces the baseline tree and cannot be used when running the baseline")
+            if parsed_args.manifests or parsed_args.scratch_root:
+                parser.error("--from-archive cannot be combined with --manifests or --scratch-root")
+        if parsed_args.sample is not None:
+            if not 0 < parsed_args.sample <= 1:
+                parser.error("--sample FRACTION must be in (0, 1]")
+            if parsed_args.manifests or parsed_args.incremental_compare:
+                parser.error("--sample cannot be combined with --manifests or --incremental-compare")
+        if parsed_args.merkle and (parsed_args.manifests or parsed_args.sample is not None):
+            parser.error("--merkle cannot be combined with --manifests or --sample")
+
+        if not parsed_args.no_daemon:
+            from .daemon import daemon_available, run_via_daemon
+            socket_path = daemon_available(parsed_args.socket)
+            if socket_path is not None:
+                code = run_via_daemon(socket_path, parsed_args)
+                if code:
+                    sys.exit(code)
+                return
+
+        run_mode(parsed_args)
+
+def run_mode(parsed_args, session=None):
+    """
+    Runs one run/compare/run_base/run_cand invocation from its parsed arguments.
+    `session` is the daemon's warm state when serving a client request.
+    Without --jobs, a daemon request may use all of the daemon's slots (its
+    fair share still applies); a local run uses 1, or the CPU count with
+    --adaptive.
+    """
+    if parsed_args.jobs is None:
+        if session is not None:
+            parsed_args.jobs = session.slots
+        else:
+            parsed_args.jobs = (os.cpu_count() or 1) if parsed_args.adaptive else 1
+    metrics = RunMetrics()
+    metrics_writer = None
+    if parsed_args.metrics:
+        metrics_writer = MetricsWriter(metrics, parsed_args.metrics, parsed_args.metrics_interval)
+        metrics_writer.start()
+
+    tracer = Tracer() if parsed_args.trace else None
+    profiler = Profiler(parsed_args.profile) if parsed_args.profile else None
+
+    try:
+        _run_cases(parsed_args, metrics, tracer, profiler, session)
+    finally:
+        if metrics_writer is not None:
+            metrics_writer.stop()
+        if tracer is not None:
+            tracer.write(parsed_args.trace)
+            print(f"Trace written: {parsed_args.trace}")
+        if profiler is not None:
+            profiler.write()
+            print(f"Profile written: {parsed_args.profile}")
+
+def _archive(parsed_args):
+    """
+    Ingests every case's base_path and cand_path into the archive as one run.
+    """
+    try:
+        cases = load_config(parsed_args.config)
+    except Exception as e:
+        print(f"Error loading config: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    store = ChunkStore(Path(parsed_args.store))
+    run_id = parsed_args.run or default_run_id()
+    stats = ArchiveStats()
+    roots = [Path(p) for case in cases for p in (case.base_path, case.cand_path)]
+    try:
+        trees = store.put_trees(roots, jobs=parsed_args.jobs, stats=stats)
+    finally:
+        store.save_stat_cache()
+
+    index = {}
+    for i, case in enumerate(cases):
+        base_tree, cand_tree = trees[2 * i], trees[2 * i + 1]
+        for side, tree, path in (("baseline", base_tree, case.base_path), ("candidate", cand_tree, case.cand_path)):
+            if tree is None:
+                print(f"{case.name}: {side} output missing: {path}")
+        index[case.name] = {"baseline": base_tree, "candidate": cand_tree}
+    store.write_index(run_id, index)
+    print(f"Archived run '{run_id}': {stats.summary()}")
+
+def _freeze(parsed_args):
+    """
+    Writes one manifest per case describing its baseline output tree.
+    """
+    try:
+        cases = load_config(parsed_args.config)
+    except Exception as e:
+        print(f"Error loading config: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    lock = threading.Lock()
+
+    def freeze_one(case):
         try:
-            cases = load_config(parsed_args.config)
+            manifest = build_manifest(Path(case.base_path), text=parsed_args.text_digests)
+            path = manifest_path(parsed_args.manifests, case.name)
+            write_manifest(path, manifest)
         except Exception as e:
-            print(f"Error loading config: {e}", file=sys.stderr)
+            with lock:
+                print(f"{case.name}: ERROR: {e}")
+            return False
+        with lock:
+            print(f"{case.name}: {len(manifest['entries'])} entries -> {path}")
+        return True
+
+    results = Scheduler(jobs=parsed_args.jobs).run(cases, freeze_one)
+    if not all(results):
+        sys.exit(1)
+
+class _RunContext:
+    """
+    State shared by all cases of one CLI invocation.
+    """
+    def __init__(self, parsed_args, metrics: RunMetrics, tracer=None, profiler=None, session=None):
+        self.args = parsed_args
+        self.session = session
+        self.mode = COMMAND_MODES[parsed_args.command]
+        self.metrics = metrics
+        self.probe = ProbeSet(metrics, tracer)
+        self.profiler = profiler
+        # A daemon request is cancelled by the daemon, e.g. when its client goes away
+        self.cancel = session.cancel if session is not None else CancelToken()
+        self.max_failures = 1 if parsed_args.fail_fast else parsed_args.max_failures
+        self.failures = 0
+        self.preprocess_results = {}
+        self.pools = None
+        # Commands of a daemon request run in the client's environment
+        self.base_env = session.env if session is not None else None
+        self.resources = None
+        if parsed_args.adaptive:
+            self.resources = ResourceAdmission(cores=parsed_args.host_cores, memory=parsed_args.host_memory)
+        self.archive = None
+        self.archive_index = None
+        if parsed_args.from_archive:
+            self.archive = ChunkStore(Path(parsed_args.from_archive))
+        self.scratch_dir = None
+        self.scratch_budget = None
+        self._lock = threading.Lock()
+
+    def admission(self) -> list:
+        """
+        Admission controllers for schedulers of this run's cases.
+        """
+        controllers = [self.resources] if self.resources is not None else []
+        if self.session is not None:
+            controllers.extend(self.session.admission())
+        return controllers
+
+    def load_config(self, path: str):
+        return self.session.load_config(path) if self.session is not None else load_config(path)
+
+    def load_manifest(self, path):
+        return self.session.load_manifest(path) if self.session is not None else load_manifest(path)
+
+    def profiled(self):
+        return self.profiler.section() if self.profiler is not None else nullcontext()
+
+    def emit(self, lines):
+        """
+        Prints the lines of one case without interleaving with other workers.
+        """
+        with self._lock:
+            for line in lines:
+                print(line)
+
+    def record_failure(self):
+        """
+        Counts a failed case and cancels the run once the failure limit is reached.
+        """
+        with self._lock:
+            self.failures += 1
+            limit_reached = self.max_failures is not None and self.failures >= self.max_failures
+        if limit_reached and not self.cancel.cancelled:
+            self.emit([f"Failure limit ({self.max_failures}) reached, cancelling remaining cases"])
+            self.cancel.cancel("failure limit reached")
+
+def _run_cases(parsed_args, metrics: RunMetrics, tracer=None, profiler=None, session=None):
+    ctx = _RunContext(parsed_args, metrics, tracer, profiler, session)
+
+    try:
+        with ctx.probe.phase("load_config"):
+            cases = ctx.load_config(parsed_args.config)
+    except Exception as e:
+        print(f"Error loading config: {e}", file=sys.stderr)
+        sys.exit(1)
+    metrics.cases_total = len(cases)
+
+    if ctx.archive is not None:
+        run_id = parsed_args.archive_run or (ctx.archive.runs() or [None])[-1]
+        try:
+            if run_id is None:
+                raise FileNotFoundError(f"No archived runs in {parsed_args.from_archive}")
+            ctx.archive_index = ctx.archive.load_index(run_id)
+        except (OSError, ValueError) as e:
+            print(f"Error loading archive: {e}", file=sys.stderr)
             sys.exit(1)
-    
-        # Initialize Reporter
-        from .reporter import MarkdownReporter
-        reporter = MarkdownReporter(parsed_args.report)
-
-        # Initialize a failure counter for the new logic
-        total_failures = 0
-
-        run_baseline, run_candidate, compare_only = COMMAND_MODES[parsed_args.command]
-
-        for case in cases:
-            try:
-                if compare_only:
-                    base_res = skipped_result()
-                    cand_res = skipped_result()
-                    base_path = Path(case.base_path)
-                    cand_path = Path(case.cand_path)
-                else:
-                    base_res, cand_res, base_path, cand_path = run_case(
-                        case,
-                        run_baseline=run_baseline,
-                        run_candidate=run_candidate
-                    )
-                
-                if compare_only or (
-                    (not run_baseline or base_res.returncode == 0) and
-                    (not run_candidate or cand_res.returncode == 0)
-                ):
-                    cmp_result = compare_directories(base_path, cand_path)
-                    
-                    reporter.add_result(case, base_res, cand_res, cmp_result)
-                    
-                    if not cmp_result.match:
-                        print("FAILED (Mismatch)")
-                        for err in cmp_result.errors:
-                            print(f"  [Structure] {err}")
-                        for diff in cmp_result.diffs:
-                            print(f"  [Content]   {diff}")
-                        total_failures += 1
-                else:
-                    print("FAILED (Execution Error)")
-                    if run_baseline and base_res.returncode != 0:
-                        print(f"  Baseline Failed ({base_res.returncode})")
-                    if run_candidate and cand_res.returncode != 0:
-                        print(f"  Candidate Failed ({cand_res.returncode})")
-                    
-                    from .comparator import ComparatorResult
-                    fail_cmp = ComparatorResult(match=False, errors=["Execution Failed"], diffs=[])
-                    reporter.add_result(case, base_res, cand_res, fail_cmp)
-                    
-                    total_failures += 1
-            except Exception as e:
-                print(f"ERROR: {e}")
+
+    # Initialize Reporter
+    from .reporter import MarkdownReporter
+    reporter = MarkdownReporter(parsed_args.report)
+
+    run_baseline, run_candidate, compare_only = ctx.mode
+    # Commands run in their own process groups: kill them if we are interrupted
+    with cancel_on_interrupt(ctx.cancel):
+        preprocesses = collect_preprocesses(cases)
+        if preprocesses and not compare_only:
+            with ctx.probe.phase("preprocess"):
+                ctx.preprocess_results = run_preprocesses(
+                    preprocesses,
+                    run_baseline=run_baseline,
+                    run_candidate=run_candidate,
+                    use_cache=not parsed_args.rerun_preprocess,
+                    cancel=ctx.cancel,
+                    probe=ctx.probe,
+                    base_env=ctx.base_env
+                )
+            for pre in preprocesses:
+                for side, res in zip(("Baseline", "Candidate"), ctx.preprocess_results[id(pre)]):
+                    if res.returncode != 0:
+                        print(f"{pre.name}: {side} preprocess failed ({res.returncode})")
+                        if res.stderr:
+                            print(res.stderr.rstrip())
+                    elif res.args == "(cached)":
+                        print(f"{pre.name}: {side} preprocess unchanged, skipped")
+
+        if parsed_args.scratch_root:
+            # A directory of its own, so the budget measures only this run's usage
+            Path(parsed_args.scratch_root).mkdir(parents=True, exist_ok=True)
+            ctx.scratch_dir = Path(tempfile.mkdtemp(prefix="regressionx-", dir=parsed_args.scratch_root))
+            if parsed_args.scratch_budget is not None:
+                ctx.scratch_budget = ScratchBudget(parsed_args.scratch_budget, parsed_args.scratch_estimate,
+                                                   root=ctx.scratch_dir)
+
+        admission = ctx.admission()
+        if ctx.scratch_budget is not None:
+            admission.append(ctx.scratch_budget)
+        scheduler = Scheduler(jobs=parsed_args.jobs, cancel=ctx.cancel, admission=admission)
+        # A daemon session lends warm pools for this run's sole use
+        ctx.pools = session.pools(parsed_args.jobs) if session is not None else PyWorkerPools(size=parsed_args.jobs)
+        try:
+            if not compare_only:
+                ctx.pools.prepare(cases, run_baseline=run_baseline, run_candidate=run_candidate)
+            outcomes = scheduler.run(cases, lambda case: _run_one(case, ctx))
+            flakiness = {}
+            if parsed_args.rerun_failures > 0 and not ctx.cancel.cancelled:
+                with ctx.probe.phase("rerun_failures"):
+                    flakiness = _rerun_failures(cases, outcomes, ctx)
+        finally:
+            if ctx.cancel.cancelled:
+                ctx.pools.terminate()
+            elif session is not None:
+                session.release_pools(ctx.pools)
+            else:
+                ctx.pools.close()
+            if ctx.scratch_dir is not None:
+                shutil.rmtree(ctx.scratch_dir, ignore_errors=True)
+
+    # Initialize a failure counter for the new logic
+    total_failures = 0
+
+    for case, outcome in zip(cases, outcomes):
+        if outcome is None:
+            # Never started: the run was cancelled before reaching this case
+            metrics.case_skipped()
+            reporter.add_skipped(case, f"not run ({ctx.cancel.reason})")
+        elif outcome is _CANCELLED:
+            reporter.add_skipped(case, f"cancelled while running ({ctx.cancel.reason})")
+        elif outcome is _ERROR:
+            total_failures += 1
+        else:
+            reporter.add_result(case, *outcome, flakiness=flakiness.get(id(case)))
+            if not outcome[2].match:
                 total_failures += 1
-                
-        # Generate Report
+
+    # Generate Report
+    with ctx.probe.phase("report"), ctx.profiled():
         reporter.generate()
-        print(f"Report generated: {parsed_args.report}")
-        
-        if total_failures > 0:
-            sys.exit(1)
+    print(f"Report generated: {parsed_args.report}")
+
+    if total_failures > 0:
+        sys.exit(1)
+
+def _rerun_failures(cases, outcomes, ctx: _RunContext) -> dict:
+    """
+    Re-runs every failed case `--rerun-failures` times, all attempts in
+    parallel and each in its own scratch directory, and classifies it.
+    Returns {id(case): FlakinessResult}.
+    """
+    run_baseline, run_candidate, _ = ctx.mode
+    failed = [
+        (case, outcome) for case, outcome in zip(cases, outcomes)
+        if isinstance(outcome, tuple) and not outcome[2].match
+    ]
+    if not failed:
+        return {}
+
+    attempts = ctx.args.rerun_failures
+    scratch_root = Path(ctx.args.rerun_dir or tempfile.mkdtemp(prefix="regressionx-rerun-"))
+    owners = [index for index in range(len(failed)) for _ in range(attempts)]
+    # Scratch copies are the scheduled items so admission controllers see their hints
+    copies = [
+        scratch_case(case, scratch_root / f"{index:04d}" / f"attempt{attempt}", run_baseline, run_candidate)
+        for index, (case, _) in enumerate(failed) for attempt in range(attempts)
+    ]
+
+    def rerun(copy):
+        try:
+            with ctx.probe.phase("rerun", copy.name):
+                if ctx.archive is not None:
+                    # Each attempt compares against its own restore of the archived trees
+                    return _process_from_archive(copy, ctx, quiet=True, isolated=True)[2]
+                return _process_case(copy, ctx, quiet=True)[2]
+        except CaseCancelled:
+            return None
+        except Exception as e:
+            return ComparatorResult(match=False, errors=[f"Error: {e}"])
+
+    ctx.emit([f"Re-running {len(failed)} failed case(s) {attempts} time(s) each"])
+    try:
+        rerun_results = Scheduler(jobs=ctx.args.jobs, cancel=ctx.cancel, admission=ctx.admission()).run(copies, rerun)
+    finally:
+        if not ctx.args.rerun_dir:
+            shutil.rmtree(scratch_root, ignore_errors=True)
+
+    flakiness = {}
+    for index, (case, outcome) in enumerate(failed):
+        attempts_cmp = [outcome[2]] + [
+            res for i, res in zip(owners, rerun_results) if i == index and res is not None
+        ]
+        result = summarize(attempts_cmp)
+        flakiness[id(case)] = result
+        ctx.emit([f"{case.name}: {result.verdict} ({result.passed}/{result.attempts} attempts passed)"])
+    return flakiness
+
+# Sentinel outcomes for cases that produced no result
+_CANCELLED = object()
+_ERROR = object()
+
+def _run_one(case, ctx: _RunContext):
+    """
+    Scheduler entry point for one case. Returns (base_res, cand_res, cmp_result),
+    or one of the _CANCELLED / _ERROR sentinels.
+    """
+    ctx.metrics.case_started()
+    try:
+        with ctx.probe.phase("case", case.name):
+            if ctx.args.scratch_root:
+                outcome = _process_in_scratch(case, ctx)
+            elif ctx.archive is not None:
+                outcome = _process_from_archive(case, ctx)
+            else:
+                outcome = _process_case(case, ctx)
+    except CaseCancelled:
+        ctx.metrics.case_cancelled()
+        return _CANCELLED
+    except Exception as e:
+        ctx.emit([f"ERROR: {e}"])
+        ctx.metrics.case_finished(False)
+        ctx.record_failure()
+        return _ERROR
+
+    passed = outcome[2].match
+    ctx.metrics.case_finished(passed)
+    if not passed:
+        ctx.record_failure()
+    return outcome
+
+def _process_in_scratch(case, ctx: _RunContext):
+    """
+    Runs and compares a case under --scratch-root, persisting its outputs to
+    the configured paths only if it failed (or with --keep-outputs). A
+    baseline-only run always persists: its outputs are the reference later
+    runs compare against.
+    """
+    run_baseline, run_candidate, _ = ctx.mode
+    keep_outputs = ctx.args.keep_outputs or (run_baseline and not run_candidate)
+    run = ScratchRun(case, ctx.scratch_dir, run_baseline, run_candidate)
+    try:
+        outcome = _process_case(run.scratch, ctx)
+        if ctx.scratch_budget is not None:
+            ctx.scratch_budget.observe(run.footprint())
+        if not outcome[2].match or keep_outputs:
+            with ctx.probe.phase("persist", case.name):
+                run.persist()
+        return outcome
+    finally:
+        run.cleanup()
+
+def _process_from_archive(case, ctx: _RunContext, quiet: bool = False, isolated: bool = False):
+    """
+    Restores the archived baseline (and, in compare mode, candidate) of a case
+    into a temporary directory, then runs and compares it as usual. With
+    `isolated`, the candidate also runs in that directory (for re-runs).
+    """
+    restore_candidate = ctx.mode[2]
+    archived = ctx.archive_index["cases"].get(case.name) or {}
+    sides = [("baseline", archived.get("baseline"))]
+    if restore_candidate:
+        sides.append(("candidate", archived.get("candidate")))
+    missing = [side for side, tree in sides if tree is None]
+    if missing:
+        if not quiet:
+            ctx.emit([f"{case.name}: FAILED (Not Archived)"])
+        fail_cmp = ComparatorResult(
+            match=False, errors=[f"No archived {' and '.join(missing)} output in run '{ctx.archive_index['run']}'"]
+        )
+        return (skipped_result(), skipped_result(), fail_cmp)
+
+    root = Path(tempfile.mkdtemp(prefix="regressionx-restore-"))
+    try:
+        restored = scratch_case(case, root, run_baseline=True, run_candidate=restore_candidate or isolated)
+        with ctx.probe.phase("restore", case.name):
+            ctx.archive.restore_tree(sides[0][1], Path(restored.base_path))
+            if restore_candidate:
+                ctx.archive.restore_tree(sides[1][1], Path(restored.cand_path))
+        return _process_case(restored, ctx, quiet=quiet)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def _process_case(case, ctx: _RunContext, quiet: bool = False):
+    """
+    Runs (or skips) the commands of one case and compares the outputs.
+    Returns (base_res, cand_res, cmp_result). With `quiet`, nothing is printed.
+    """
+    emit = (lambda lines: None) if quiet else ctx.emit
+    run_baseline, run_candidate, compare_only = ctx.mode
+
+    pre = getattr(case, "preprocess", None)
+    if pre is not None and id(pre) in ctx.preprocess_results:
+        pre_base, pre_cand = ctx.preprocess_results[id(pre)]
+        if pre_base.returncode != 0 or pre_cand.returncode != 0:
+            emit([f"{case.name}: FAILED (Preprocess Error)"])
+            fail_cmp = ComparatorResult(match=False, errors=[f"Preprocess '{pre.name}' Failed"], diffs=[])
+            return (pre_base, pre_cand, fail_cmp)
+
+    watcher = None
+    if compare_only:
+        base_res = skipped_result()
+        cand_res = skipped_result()
+        base_path = Path(case.base_path)
+        cand_path = Path(case.cand_path)
+    else:
+        run_kwargs = {}
+        if ctx.args.incremental_compare and not ctx.args.manifests:
+            comparator_class = MerkleIncrementalComparator if ctx.args.merkle else IncrementalComparator
+            watcher = comparator_class(Path(case.base_path), Path(case.cand_path),
+                                       max_examples=ctx.args.max_examples)
+            run_kwargs = {"watcher": watcher, "poll_interval": ctx.args.poll_interval}
+        base_res, cand_res, base_path, cand_path = run_case(
+            case,
+            run_baseline=run_baseline,
+            run_candidate=run_candidate,
+            probe=ctx.probe,
+            cancel=ctx.cancel,
+            pools=ctx.pools,
+            base_env=ctx.base_env,
+            **run_kwargs
+        )
+
+    if compare_only or (
+        (not run_baseline or base_res.returncode == 0) and
+        (not run_candidate or cand_res.returncode == 0)
+    ):
+        start = time.perf_counter()
+        with ctx.probe.phase("compare", case.name), ctx.profiled():
+            if ctx.args.manifests:
+                try:
+                    manifest = ctx.load_manifest(manifest_path(ctx.args.manifests, case.name))
+                except FileNotFoundError:
+                    cmp_result = ComparatorResult(match=False, errors=[f"No baseline manifest for case '{case.name}'"])
+                else:
+                    cmp_result = compare_to_manifest(manifest, cand_path, text=ctx.args.text_digests,
+                                                     max_examples=ctx.args.max_examples)
+            elif watcher is not None:
+                cmp_result = watcher.finish()
+            elif ctx.args.merkle:
+                cmp_result = merkle_compare(base_path, cand_path, max_examples=ctx.args.max_examples)
+            else:
+                cmp_result = compare_directories(base_path, cand_path, max_examples=ctx.args.max_examples,
+                                                 sample_fraction=ctx.args.sample)
+        ctx.metrics.add_comparison(cmp_result, time.perf_counter() - start)
+
+        if not cmp_result.match:
+            lines = [f"{case.name}: FAILED (Mismatch)"]
+            for err in cmp_result.errors:
+                lines.append(f"  [Structure] {err}")
+            for diff in cmp_result.diffs:
+                lines.append(f"  [Content]   {diff}")
+            if isinstance(cmp_result, ComparatorResult) and cmp_result.truncated:
+                lines.append(f"  [Omitted]   {cmp_result.omitted_errors} structural, "
+                             f"{cmp_result.omitted_diffs} content differences not listed")
+            for detail in getattr(cmp_result, "details", {}).values():
+                lines.append(f"  [Detail]    {detail.path}: {detail.summary()}")
+            emit(lines)
+        return (base_res, cand_res, cmp_result)
+
+    lines = [f"{case.name}: FAILED (Execution Error)"]
+    if run_baseline and base_res.returncode != 0:
+        lines.append(f"  Baseline Failed ({base_res.returncode})")
+    if run_candidate and cand_res.returncode != 0:
+        lines.append(f"  Candidate Failed ({cand_res.returncode})")
+    emit(lines)
+
+    fail_cmp = ComparatorResult(match=False, errors=["Execution Failed"], diffs=[])
+    return (base_res, cand_res, fail_cmp)
 
 if __name__ == "__main__":
     main()
@@ -1,20 +1,189 @@
 import filecmp
+import os
+import posixpath
+import sys
+import time
+from enum import Enum
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from .diagnostics import MismatchDetail, diagnose_mismatch
+from .sampling import diagnose_sampled, sampled_equal
+
+# (size, mtime_ns) of a file, used to detect whether it changed since it was compared
+Signature = Tuple[int, int]
+
+# Mismatching files diagnosed per comparison; beyond this only the mismatch is recorded
+DEFAULT_MAX_DETAILS = 50
+
+# Differences listed individually per category; the rest are only counted and grouped
+DEFAULT_MAX_EXAMPLES = 200
+
+# Distinct (kind, directory/extension) groups tracked; further groups are pooled
+MAX_GROUPS = 1000
+OTHER_GROUP = "(other)"
+
+class DiffKind(Enum):
+    ONLY_IN_BASELINE = "Only in baseline"
+    ONLY_IN_CANDIDATE = "Only in candidate"
+    TYPE_MISMATCH = "Type mismatch"
+    CONTENT_MISMATCH = "Content mismatch"
+
+    @property
+    def structural(self) -> bool:
+        return self is not DiffKind.CONTENT_MISMATCH
+
+def _group_of(rel: str) -> str:
+    """
+    Groups a relative path by its directory and extension, e.g. "data/*.csv".
+    """
+    parent, name = posixpath.split(rel)
+    ext = posixpath.splitext(name)[1]
+    return sys.intern(f"{parent or '.'}/*{ext}")
 
 @dataclass
 class ComparatorResult:
+    """
+    Outcome of a comparison.
+
+    Per-file differences are counted in `counts` and `groups`, but only the
+    first `max_examples` of each category are kept as messages in `errors`
+    and `diffs`; `omitted_errors`/`omitted_diffs` count the rest. This keeps
+    memory and report size bounded when every file of a huge tree differs.
+    """
     match: bool = True
     errors: List[str] = field(default_factory=list) # Structural errors (missing files)
     diffs: List[str] = field(default_factory=list)   # Content mismatches
+    files_compared: int = 0 # Files whose content was compared
+    bytes_compared: int = 0 # Bytes of baseline content covered by those comparisons
+    details: Dict[str, MismatchDetail] = field(default_factory=dict) # First-difference diagnoses by relative path
+    max_examples: int = DEFAULT_MAX_EXAMPLES
+    counts: Dict[DiffKind, int] = field(default_factory=dict) # Per-file differences by kind
+    groups: Dict[Tuple[DiffKind, str], int] = field(default_factory=dict) # ... by kind and directory/extension
+    omitted_errors: int = 0
+    omitted_diffs: int = 0
+    sampled: bool = False # Content was only spot-checked (--sample); a match is not a full proof
+
+    @property
+    def error_count(self) -> int:
+        return len(self.errors) + self.omitted_errors
+
+    @property
+    def diff_count(self) -> int:
+        return len(self.diffs) + self.omitted_diffs
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.omitted_errors or self.omitted_diffs)
+
+    def add_difference(self, kind: DiffKind, rel: str):
+        """
+        Records a per-file difference, keeping its message only while under the cap.
+        """
+        self.match = False
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        key = (kind, _group_of(rel))
+        if key not in self.groups and len(self.groups) >= MAX_GROUPS:
+            key = (kind, OTHER_GROUP)
+        self.groups[key] = self.groups.get(key, 0) + 1
+
+        messages = self.errors if kind.structural else self.diffs
+        if len(messages) < self.max_examples:
+            messages.append(f"{kind.value}: {rel}")
+        elif kind.structural:
+            self.omitted_errors += 1
+        else:
+            self.omitted_diffs += 1
+
+    def group_summary(self) -> List[Tuple[DiffKind, str, int]]:
+        """
+        (kind, group, count) triples, largest group first.
+        """
+        return sorted(
+            ((kind, group, count) for (kind, group), count in self.groups.items()),
+            key=lambda item: (-item[2], item[0].value, item[1])
+        )
+
+    def add_content_mismatch(
+        self,
+        rel: str,
+        path_a: Path,
+        path_b: Path,
+        max_details: int,
+        sample_fraction: Optional[float] = None
+    ):
+        """
+        Records a content mismatch and, while under `max_details`, diagnoses
+        it. With `sample_fraction` the diagnosis only reads sampled blocks.
+        """
+        rel = sys.intern(rel)
+        self.add_difference(DiffKind.CONTENT_MISMATCH, rel)
+        if len(self.details) < max_details:
+            try:
+                if sample_fraction is not None:
+                    self.details[rel] = diagnose_sampled(path_a, path_b, sample_fraction, rel)
+                else:
+                    self.details[rel] = diagnose_mismatch(path_a, path_b, rel)
+            except OSError:
+                pass # The files vanished or became unreadable; the mismatch itself stands
 
-def compare_directories(baseline: Path, candidate: Path) -> ComparatorResult:
+def _signature(path: Path) -> Signature:
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+def _files_equal(
+    path_a: Path,
+    path_b: Path,
+    result: ComparatorResult,
+    rel: Optional[str] = None,
+    precompared: Optional[Dict[str, Tuple[Signature, Signature, bool]]] = None,
+    sample_fraction: Optional[float] = None
+) -> bool:
+    """
+    Byte-compares two files and records the work done on `result`.
+    A verdict in `precompared` is reused if neither file changed since; such
+    files are not counted, as no bytes are read for them here.
+    With `sample_fraction`, only sizes and sampled blocks are compared.
+    """
+    if sample_fraction is not None:
+        equal, sampled = sampled_equal(path_a, path_b, sample_fraction, rel or path_a.name)
+        result.files_compared += 1
+        result.bytes_compared += sampled
+        return equal
+    if precompared is not None and rel in precompared:
+        sig_a, sig_b, equal = precompared[rel]
+        if _signature(path_a) == sig_a and _signature(path_b) == sig_b:
+            return equal
+    result.files_compared += 1
+    result.bytes_compared += path_a.stat().st_size
+    return filecmp.cmp(path_a, path_b, shallow=False)
+
+def compare_directories(
+    baseline: Path,
+    candidate: Path,
+    precompared: Optional[Dict[str, Tuple[Signature, Signature, bool]]] = None,
+    max_details: int = DEFAULT_MAX_DETAILS,
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
+    sample_fraction: Optional[float] = None
+) -> ComparatorResult:
     """
     Recursively compares two directories.
     Returns a ComparatorResult.
+
+    `precompared` maps relative file paths to (baseline signature, candidate
+    signature, equal) verdicts gathered earlier, e.g. by IncrementalComparator;
+    files whose signatures still match are not read again.
+
+    The first `max_details` mismatching files get a MismatchDetail in
+    `result.details` (first differing offset, size delta, diff excerpt).
+    At most `max_examples` differences per category are listed by name; all
+    of them are counted.
+
+    With `sample_fraction` set, files are only spot-checked: sizes, then the
+    head, tail and a deterministic random selection of blocks (see
+    regressionx.sampling). The result is flagged as `sampled`.
     """
-    result = ComparatorResult()
+    result = ComparatorResult(max_examples=max_examples, sampled=sample_fraction is not None)
     
     if not baseline.exists():
         result.match = False
@@ -28,9 +197,8 @@ def compare_directories(baseline: Path, candidate: Path) -> ComparatorResult:
 
     # Check if they are files
     if baseline.is_file() and candidate.is_file():
-        if not filecmp.cmp(baseline, candidate, shallow=False):
-            result.match = False
-            result.diffs.append(f"Content mismatch: {baseline.name}")
+        if not _files_equal(baseline, candidate, result, sample_fraction=sample_fraction):
+            result.add_content_mismatch(baseline.name, baseline, candidate, max_details, sample_fraction)
         return result
         
     # Assume directories
@@ -45,12 +213,10 @@ def compare_directories(baseline: Path, candidate: Path) -> ComparatorResult:
     def _recursive_cmp(dcmp, rel_path=Path(".")):
         # 1. Structural checks
         for name in dcmp.left_only:
-            result.match = False
-            result.errors.append(f"Only in baseline: {rel_path / name}")
+            result.add_difference(DiffKind.ONLY_IN_BASELINE, (rel_path / name).as_posix())
             
         for name in dcmp.right_only:
-            result.match = False
-            result.errors.append(f"Only in candidate: {rel_path / name}")
+            result.add_difference(DiffKind.ONLY_IN_CANDIDATE, (rel_path / name).as_posix())
             
         # 2. Content checks (for files in both)
         # dcmp.diff_files only checks shallow unless we verify content.
@@ -59,9 +225,9 @@ def compare_directories(baseline: Path, candidate: Path) -> ComparatorResult:
         for name in dcmp.common_files:
             path_a = Path(dcmp.left) / name
             path_b = Path(dcmp.right) / name
-            if not filecmp.cmp(path_a, path_b, shallow=False):
-                result.match = False
-                result.diffs.append(f"Content mismatch: {rel_path / name}")
+            rel = (rel_path / name).as_posix()
+            if not _files_equal(path_a, path_b, result, rel, precompared, sample_fraction):
+                result.add_content_mismatch(rel, path_a, path_b, max_details, sample_fraction)
                 
         # 3. Recurse into subdirectories
         for sub_name, sub_dcmp in dcmp.subdirs.items():
@@ -71,3 +237,86 @@ def compare_directories(baseline: Path, candidate: Path) -> ComparatorResult:
     _recursive_cmp(dcmp)
     
     return result
+
+
+class IncrementalComparator:
+    """
+    Compares output files while the commands that produce them are still running.
+
+    Each `poll()` walks the baseline tree and compares every file that exists on
+    both sides and has settled: its size and mtime are unchanged since the
+    previous poll and older than `settle_seconds`. `finish()` then runs the
+    regular `compare_directories`, reusing verdicts for files that have not
+    changed since they were compared, so only the remainder is read at the end.
+    Files and bytes compared by the polls are added to the final result.
+    """
+    def __init__(
+        self,
+        baseline: Path,
+        candidate: Path,
+        settle_seconds: float = 2.0,
+        max_examples: int = DEFAULT_MAX_EXAMPLES
+    ):
+        self.baseline = Path(baseline)
+        self.candidate = Path(candidate)
+        self.settle_seconds = settle_seconds
+        self.max_examples = max_examples
+        self._last_seen: Dict[str, Tuple[Signature, Signature]] = {}
+        self.compared: Dict[str, Tuple[Signature, Signature, bool]] = {}
+        self.files_compared = 0
+        self.bytes_compared = 0
+
+    def poll(self) -> int:
+        """
+        Compares newly settled files. Returns how many were compared.
+        """
+        if not self.baseline.is_dir() or not self.candidate.is_dir():
+            return 0
+
+        now_ns = time.time_ns()
+        settle_ns = int(self.settle_seconds * 1e9)
+        count = 0
+        for root, _dirs, files in os.walk(self.baseline):
+            rel_dir = Path(root).relative_to(self.baseline)
+            for name in files:
+                rel = (rel_dir / name).as_posix()
+                path_a = self.baseline / rel
+                path_b = self.candidate / rel
+                try:
+                    sigs = (_signature(path_a), _signature(path_b))
+                except OSError:
+                    continue # Not (yet) present on both sides
+
+                previous = self._last_seen.get(rel)
+                self._last_seen[rel] = sigs
+                done = self.compared.get(rel)
+                if done is not None and done[:2] == sigs:
+                    continue
+                if previous != sigs:
+                    continue # Still changing, or first sighting
+                if any(now_ns - sig[1] < settle_ns for sig in sigs):
+                    continue
+
+                try:
+                    equal = self._compare_files(rel, path_a, path_b)
+                except OSError:
+                    continue
+                self.compared[rel] = (sigs[0], sigs[1], equal)
+                self.files_compared += 1
+                self.bytes_compared += sigs[0][0]
+                count += 1
+        return count
+
+    def _compare_files(self, rel: str, path_a: Path, path_b: Path) -> bool:
+        return filecmp.cmp(path_a, path_b, shallow=False)
+
+    def finish(self) -> ComparatorResult:
+        """
+        Compares whatever has not been compared yet and returns the full result.
+        """
+        result = compare_directories(
+            self.baseline, self.candidate, precompared=self.compared, max_examples=self.max_examples
+        )
+        result.files_compared += self.files_compared
+        result.bytes_compared += self.bytes_compared
+        return result
@@ -2,11 +2,13 @@ import importlib.util
 import os
 from typing import List
 from .domain import Case
+from .resources import check_hints
 
 def load_config(path: str) -> List[Case]:
     """
     Loads a python configuration file and returns the list of cases defined in it.
     The configuration file must define a variable named 'cases' which is a list of Case objects.
+    Malformed resource hints raise ValueError naming the case.
     """
     if not os.path.exists(path):
          raise FileNotFoundError(f"Config file not found: {path}")
@@ -28,5 +30,6 @@ def load_config(path: str) -> List[Case]:
     cases = getattr(module, 'cases')
     if not isinstance(cases, list):
         raise TypeError("'cases' must be a list")
-        
+
+    check_hints(cases)
     return cases
@@ -0,0 +1,543 @@
+import contextvars
+import dataclasses
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+from argparse import Namespace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import cli
+from .executor import CancelToken
+from .manifest import load_manifest
+from .pool import PyWorkerPools
+
+# Where the CLI looks for a daemon unless --socket is given
+SOCKET_ENV = "REGRESSIONX_SOCKET"
+
+# Output of the request being served by the current thread (and its workers)
+_current_output: contextvars.ContextVar = contextvars.ContextVar("regressionx_output", default=None)
+
+def daemon_supported() -> bool:
+    """
+    Daemon mode needs Unix domain sockets and user ids (not on e.g. Windows).
+    """
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+def _fallback_dir() -> str:
+    # Used without $XDG_RUNTIME_DIR: a directory of our own, never the shared temp dir itself
+    return os.path.join(tempfile.gettempdir(), f"regressionx-{os.getuid()}")
+
+def default_socket_path() -> str:
+    """
+    $REGRESSIONX_SOCKET, else a socket in $XDG_RUNTIME_DIR (private to the
+    user), else one in an owner-only directory under the temp dir.
+    """
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or _fallback_dir()
+    return os.path.join(runtime_dir, "regressionx.sock")
+
+def _private_dir(path: str):
+    """
+    Creates `path` accessible to its owner only, or checks that an existing
+    one is ours and closed to others, so nobody can plant a socket there.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be a directory owned by and accessible to only the current user")
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """
+    User id of the process at the other end, where the OS reports it (SO_PEERCRED).
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+def _connect(path: str) -> Optional[socket.socket]:
+    """
+    Connects to the daemon on `path`, if it runs as the current user: both
+    the socket file and (where supported) the listening process must be ours.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        peer = _peer_uid(sock)
+    except OSError:
+        sock.close()
+        return None
+    if peer is not None and peer != os.getuid():
+        sock.close()
+        return None
+    return sock
+
+def _env_delta(env: Dict[str, str], daemon_env: Dict[str, str]) -> Tuple[Dict[str, str], List[str]]:
+    """
+    What turns `daemon_env` into `env`: the variables to set and those to unset.
+    """
+    changed = {k: v for k, v in env.items() if daemon_env.get(k) != v}
+    return changed, sorted(k for k in daemon_env if k not in env)
+
+def _apply_env_delta(daemon_env: Dict[str, str], changed: Dict[str, str], unset: List[str]) -> Dict[str, str]:
+    env = dict(daemon_env)
+    env.update(changed)
+    for name in unset:
+        env.pop(name, None)
+    return env
+
+def daemon_available(path: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the socket path if a daemon accepts connections on it. Where
+    daemon mode is unsupported there is never one.
+    """
+    if not daemon_supported():
+        return None
+    path = path or default_socket_path()
+    sock = _connect(path)
+    if sock is None:
+        return None
+    sock.close()
+    return path
+
+
+# -- Client --------------------------------------------------------------------
+
+def run_via_daemon(path: str, parsed_args: Namespace) -> int:
+    """
+    Sends a parsed run/compare request to the daemon, relays its output and
+    returns its exit code. Path arguments are made absolute first, since the
+    daemon does not share our working directory. The commands run in our
+    environment; only the variables that differ from the daemon's own
+    environment (which it sends when we connect) are sent.
+    """
+    args = dict(vars(parsed_args))
+    for name in cli.PATH_ARGS:
+        if args.get(name):
+            args[name] = os.path.abspath(args[name])
+
+    sock = _connect(path)
+    if sock is None:
+        print(f"Error: RegressionX daemon not reachable at {path}", file=sys.stderr)
+        return 1
+    try:
+        with sock, sock.makefile("rwb") as stream:
+            hello = json.loads(stream.readline() or b"{}")
+            changed, unset = _env_delta(dict(os.environ), hello.get("env", {}))
+            request = {"args": args, "cwd": os.getcwd(), "env": changed, "unset": unset}
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            for line in stream:
+                message = json.loads(line)
+                if "stdout" in message:
+                    sys.stdout.write(message["stdout"])
+                    sys.stdout.flush()
+                elif "stderr" in message:
+                    sys.stderr.write(message["stderr"])
+                    sys.stderr.flush()
+                elif "exit" in message:
+                    return message["exit"]
+    except OSError as e:
+        print(f"Error: lost connection to the RegressionX daemon: {e}", file=sys.stderr)
+        return 1
+    print("Error: RegressionX daemon closed the connection without an exit code", file=sys.stderr)
+    return 1
+
+
+# -- Server --------------------------------------------------------------------
+
+class _ContextStream:
+    """
+    Stand-in for sys.stdout/sys.stderr that sends writes to the output of the
+    request served by the current context, and elsewhere to the real stream.
+    """
+    def __init__(self, stream, name: str):
+        self._stream = stream
+        self._name = name
+
+    def write(self, text: str) -> int:
+        output = _current_output.get()
+        if output is None:
+            return self._stream.write(text)
+        output.send({self._name: text})
+        return len(text)
+
+    def flush(self):
+        if _current_output.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _RequestOutput:
+    """
+    Sends messages to a client; `on_disconnect` is called once if it went away.
+    """
+    def __init__(self, stream, on_disconnect=None):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self.on_disconnect = on_disconnect
+        self.disconnected = False
+
+    def send(self, message: dict):
+        with self._lock:
+            if self.disconnected:
+                return
+            try:
+                self._stream.write(json.dumps(message).encode("utf-8") + b"\n")
+                self._stream.flush()
+                return
+            except OSError:
+                self.disconnected = True
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+
+
+class FairShare:
+    """
+    Admission controller shared by the schedulers of all requests.
+
+    At most `slots` cases run at once across the daemon, and while several
+    requests are in flight each is held to an equal share of the slots. A
+    request running alone may use all of them, up to its own --jobs (which
+    defaults to the daemon's slots). Shares are per request, not per user:
+    the daemon only serves the user it runs as.
+    """
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._requests = set()
+        self._running: Dict[object, int] = {} # request -> running cases
+        self._items: Dict[int, object] = {}   # id(item) -> request
+
+    def register(self, request):
+        with self._lock:
+            self._requests.add(request)
+
+    def unregister(self, request):
+        with self._lock:
+            self._requests.discard(request)
+
+    def requests(self) -> list:
+        with self._lock:
+            return list(self._requests)
+
+    def for_request(self, request) -> "_RequestShare":
+        return _RequestShare(self, request)
+
+    def _try_acquire(self, request, item) -> bool:
+        with self._lock:
+            share = max(1, self.slots // max(1, len(self._requests)))
+            if sum(self._running.values()) >= self.slots or self._running.get(request, 0) >= share:
+                return False
+            self._acquire(request, item)
+            return True
+
+    def _acquire(self, request, item):
+        self._running[request] = self._running.get(request, 0) + 1
+        self._items[id(item)] = request
+
+    def _force_acquire(self, request, item):
+        with self._lock:
+            self._acquire(request, item)
+
+    def _release(self, item):
+        with self._lock:
+            request = self._items.pop(id(item), None)
+            if request is not None:
+                self._running[request] -= 1
+                if not self._running[request]:
+                    del self._running[request]
+
+
+class _RequestShare:
+    # Per-request view of a FairShare, plugged into the request's Scheduler
+    def __init__(self, fair: FairShare, request):
+        self.fair = fair
+        self.request = request
+
+    def try_acquire(self, item) -> bool:
+        return self.fair._try_acquire(self.request, item)
+
+    def force_acquire(self, item) -> bool:
+        self.fair._force_acquire(self.request, item)
+        return True
+
+    def release(self, item):
+        self.fair._release(item)
+
+
+def _absolute(path: Optional[str], cwd: str) -> Optional[str]:
+    return os.path.join(cwd, path) if path and not os.path.isabs(path) else path
+
+def _resolve_cases(cases, cwd: str):
+    """
+    Copies of `cases` with their output and preprocess paths made absolute
+    against the client's working directory.
+    """
+    preprocesses = {}
+    resolved = []
+    for case in cases:
+        pre = case.preprocess
+        if pre is not None and id(pre) not in preprocesses:
+            preprocesses[id(pre)] = dataclasses.replace(
+                pre,
+                base_path=_absolute(pre.base_path, cwd),
+                cand_path=_absolute(pre.cand_path, cwd),
+                inputs=[_absolute(p, cwd) for p in pre.inputs] if pre.inputs else pre.inputs,
+                base_inputs=[_absolute(p, cwd) for p in pre.base_inputs] if pre.base_inputs else pre.base_inputs,
+                cand_inputs=[_absolute(p, cwd) for p in pre.cand_inputs] if pre.cand_inputs else pre.cand_inputs,
+            )
+        resolved.append(dataclasses.replace(
+            case,
+            base_path=_absolute(case.base_path, cwd),
+            cand_path=_absolute(case.cand_path, cwd),
+            preprocess=preprocesses[id(pre)] if pre is not None else None,
+        ))
+    return resolved
+
+
+# Idle worker pool sets kept warm per pool size
+MAX_IDLE_POOLS = 4
+
+# Seconds shutdown waits for idle worker pools to be terminated
+SHUTDOWN_TIMEOUT = 5.0
+
+class DaemonState:
+    """
+    What the daemon keeps warm between requests: loaded configs and
+    manifests (reloaded when the file changes), idle worker pools, and the
+    fair-share admission controller.
+
+    A request checks worker pools out for its sole use and checks them back
+    in when it is done, so cancelling one request (which terminates its
+    pools) never affects the calls of another.
+    """
+    def __init__(self, slots: int):
+        self.fair = FairShare(slots)
+        self._lock = threading.Lock()
+        self._configs: Dict[Tuple[str, str], Tuple[tuple, list]] = {}
+        self._manifests: Dict[str, Tuple[tuple, dict]] = {}
+        self._idle_pools: Dict[int, List[PyWorkerPools]] = {}
+
+    @staticmethod
+    def _stamp(path: str) -> tuple:
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+
+    def load_config(self, path: str, cwd: str) -> list:
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._configs.get((path, cwd))
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, _resolve_cases(cli.load_config(path), cwd))
+            with self._lock:
+                self._configs[(path, cwd)] = cached
+        # Fresh Case objects per request: schedulers and controllers key items by id()
+        return [dataclasses.replace(case) for case in cached[1]]
+
+    def load_manifest(self, path) -> dict:
+        path = str(path)
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._manifests.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        manifest = load_manifest(Path(path))
+        with self._lock:
+            self._manifests[path] = (stamp, manifest)
+        return manifest
+
+    def checkout_pools(self, size: int) -> PyWorkerPools:
+        with self._lock:
+            idle = self._idle_pools.get(size)
+            pools = idle.pop() if idle else None
+        if pools is None:
+            return PyWorkerPools(size=size)
+        # Workers keep the code they imported: restart pools whose sources were edited since
+        pools.drop_stale()
+        return pools
+
+    def checkin_pools(self, pools: PyWorkerPools):
+        with self._lock:
+            idle = self._idle_pools.setdefault(pools.size, [])
+            if len(idle) < MAX_IDLE_POOLS:
+                idle.append(pools)
+                return
+        pools.close()
+
+    def close(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """
+        Cancels the requests still in flight and terminates the idle worker
+        pools, waiting at most `timeout` seconds so that a stuck worker
+        cannot keep the daemon from exiting.
+        """
+        for session in self.fair.requests():
+            session.cancel.cancel("daemon shutting down")
+        with self._lock:
+            pools = [p for idle in self._idle_pools.values() for p in idle]
+            self._idle_pools.clear()
+
+        def terminate():
+            for pool in pools:
+                pool.terminate()
+
+        stopper = threading.Thread(target=terminate, name="regressionx-shutdown", daemon=True)
+        stopper.start()
+        stopper.join(timeout)
+
+
+class Session:
+    """
+    The daemon's state as seen by one request (see cli._RunContext).
+    """
+    def __init__(self, state: DaemonState, cwd: str, env: Optional[Dict[str, str]] = None):
+        self.state = state
+        self.cwd = cwd
+        self.env = env
+        self.cancel = CancelToken()
+
+    @property
+    def slots(self) -> int:
+        return self.state.fair.slots
+
+    def load_config(self, path: str) -> list:
+        return self.state.load_config(path, self.cwd)
+
+    def load_manifest(self, path) -> dict:
+        return self.state.load_manifest(path)
+
+    def pools(self, size: int) -> PyWorkerPools:
+        return self.state.checkout_pools(size)
+
+    def release_pools(self, pools: PyWorkerPools):
+        self.state.checkin_pools(pools)
+
+    def admission(self) -> list:
+        return [self.state.fair.for_request(self)]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            peer = _peer_uid(self.connection)
+        except OSError:
+            return
+        if peer is not None and peer != os.getuid():
+            return # Only serve our own user; the socket's mode should already ensure this
+        output = _RequestOutput(self.wfile)
+        output.send({"env": dict(os.environ)})
+        try:
+            line = self.rfile.readline()
+        except OSError:
+            return # e.g. daemon_available() probing and hanging up
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            parsed_args = Namespace(**request["args"])
+            cwd = request["cwd"]
+            env = _apply_env_delta(dict(os.environ), dict(request["env"]), list(request.get("unset", [])))
+        except (ValueError, KeyError, TypeError) as e:
+            output.send({"stderr": f"Invalid request: {e}\n"})
+            output.send({"exit": 2})
+            return
+
+        state = self.server.state
+        session = Session(state, cwd, env)
+        # Nobody is waiting for the results of a client that went away: stop its commands
+        output.on_disconnect = lambda: session.cancel.cancel("client disconnected")
+        finished = threading.Event()
+        threading.Thread(target=self._watch_client, args=(output, finished), daemon=True).start()
+        state.fair.register(session)
+        token = _current_output.set(output)
+        try:
+            cli.run_mode(parsed_args, session=session)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except Exception as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            finished.set()
+            _current_output.reset(token)
+            state.fair.unregister(session)
+        output.send({"exit": code})
+
+    def _watch_client(self, output: _RequestOutput, finished: threading.Event):
+        # The client sends nothing after its request, so EOF means it hung up
+        try:
+            while self.connection.recv(4096):
+                pass
+        except OSError:
+            pass
+        if not finished.is_set() and output.on_disconnect is not None:
+            output.on_disconnect()
+
+
+# Only defined where AF_UNIX exists; DaemonServer is never built elsewhere (see daemon_supported)
+_UnixStreamServer = getattr(socketserver, "UnixStreamServer", socketserver.TCPServer)
+
+class DaemonServer(socketserver.ThreadingMixIn, _UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, state: DaemonState):
+        self.state = state
+        super().__init__(path, _Handler)
+
+
+def serve(path: Optional[str] = None, slots: int = 1):
+    """
+    Serves run/compare requests on a Unix socket until interrupted.
+    """
+    if not daemon_supported():
+        raise RuntimeError("Daemon mode needs Unix domain sockets, which this platform lacks")
+    path = path or default_socket_path()
+    if os.path.dirname(path) == _fallback_dir():
+        _private_dir(_fallback_dir())
+    if daemon_available(path):
+        raise RuntimeError(f"A RegressionX daemon is already listening on {path}")
+    if os.path.lexists(path):
+        os.unlink(path) # Stale socket of a daemon that is gone
+
+    sys.stdout = _ContextStream(sys.stdout, "stdout")
+    sys.stderr = _ContextStream(sys.stderr, "stderr")
+    state = DaemonState(slots)
+    old_umask = os.umask(0o177) # Socket is only accessible by its owner
+    try:
+        server = DaemonServer(path, state)
+    finally:
+        os.umask(old_umask)
+    # shutdown() blocks until serve_forever returns, so it cannot run in the handler itself
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"RegressionX daemon listening on {path} ({slots} slots)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state.close()
+        if os.path.exists(path):
+            os.unlink(path)
+        sys.stdout = sys.stdout._stream
+        sys.stderr = sys.stderr._stream
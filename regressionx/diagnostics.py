@@ -0,0 +1,173 @@
+import difflib
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+BLOCK_SIZE = 1024 * 1024
+TEXT_SNIFF_BYTES = 8192
+
+# Defaults for the size of a diagnosis
+DEFAULT_MAX_LINES = 20   # Lines of unified diff kept per file
+DEFAULT_MAX_BYTES = 4096 # Bytes of unified diff kept per file
+CONTEXT_LINES = 3
+
+@dataclass
+class MismatchDetail:
+    """
+    A cheap, size-capped explanation of why two files differ.
+    """
+    path: str
+    base_size: int
+    cand_size: int
+    first_diff_offset: Optional[int] = None # Byte offset of the first difference
+    first_diff_line: Optional[int] = None   # 1-based line of the first difference (text only)
+    is_text: bool = False
+    excerpt: List[str] = field(default_factory=list) # Unified diff lines around the first difference
+    truncated: bool = False # Whether the excerpt was cut at the line/byte cap
+    sampled: bool = False   # Only sampled blocks were inspected (--sample)
+
+    @property
+    def size_delta(self) -> int:
+        return self.cand_size - self.base_size
+
+    def summary(self) -> str:
+        parts = [f"size {self.base_size} -> {self.cand_size} ({self.size_delta:+d} bytes)"]
+        if self.first_diff_offset is not None:
+            where = f"first {'sampled ' if self.sampled else ''}difference at byte {self.first_diff_offset}"
+            if self.first_diff_line is not None:
+                where += f" (line {self.first_diff_line})"
+            parts.append(where)
+        return ", ".join(parts)
+
+def looks_like_text(head: bytes) -> bool:
+    if b"\0" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the end of the sample is fine
+        return e.start >= len(head) - 3
+    return True
+
+def _first_difference(path_a: Path, path_b: Path, context: int):
+    """
+    Streams both files block by block until the first differing byte.
+
+    Returns (offset, newline_count_before_offset, line_starts) where
+    line_starts holds the offsets of the last `context + 1` line starts at or
+    before the difference. offset is None if the files are identical.
+    """
+    line_starts = deque([0], maxlen=context + 1)
+    newlines = 0
+    offset = 0
+    with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+        while True:
+            block_a = fa.read(BLOCK_SIZE)
+            block_b = fb.read(BLOCK_SIZE)
+            if block_a == block_b:
+                if not block_a:
+                    return None, newlines, line_starts
+                upto = len(block_a)
+                found = False
+            else:
+                upto = min(len(block_a), len(block_b))
+                i = 0
+                # Narrow down in chunks before going byte by byte
+                step = 4096
+                while i + step <= upto and block_a[i:i + step] == block_b[i:i + step]:
+                    i += step
+                while i < upto and block_a[i] == block_b[i]:
+                    i += 1
+                upto = i
+                found = True
+
+            newlines += block_a.count(b"\n", 0, upto)
+            recent = []
+            pos = upto
+            while len(recent) < context + 1:
+                nl = block_a.rfind(b"\n", 0, pos)
+                if nl < 0:
+                    break
+                recent.append(offset + nl + 1)
+                pos = nl
+            line_starts.extend(reversed(recent))
+
+            if found:
+                return offset + upto, newlines, line_starts
+            offset += upto
+
+def _read_lines(path: Path, start: int, max_lines: int, max_bytes: int) -> List[str]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(max_bytes)
+    lines = data.decode("utf-8", errors="replace").splitlines(keepends=True)
+    return lines[:max_lines]
+
+def diagnose_mismatch(
+    path_a: Path,
+    path_b: Path,
+    rel: str,
+    max_lines: int = DEFAULT_MAX_LINES,
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> MismatchDetail:
+    """
+    Describes the difference between two files without loading them whole.
+
+    Only the prefix up to the first difference is streamed. For text files a
+    unified diff of a bounded window starting a few lines before the first
+    difference is attached, capped at `max_lines` lines and `max_bytes` bytes.
+    """
+    path_a = Path(path_a)
+    path_b = Path(path_b)
+    detail = MismatchDetail(
+        path=rel,
+        base_size=path_a.stat().st_size,
+        cand_size=path_b.stat().st_size
+    )
+
+    with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+        detail.is_text = looks_like_text(fa.read(TEXT_SNIFF_BYTES)) and looks_like_text(fb.read(TEXT_SNIFF_BYTES))
+
+    offset, newlines, line_starts = _first_difference(path_a, path_b, CONTEXT_LINES)
+    detail.first_diff_offset = offset
+    if offset is None or not detail.is_text:
+        return detail
+    detail.first_diff_line = newlines + 1
+
+    # Window of lines starting a little before the first difference
+    window_start = line_starts[0]
+    first_line_no = detail.first_diff_line - (len(line_starts) - 1)
+    window_lines = max_lines * 2
+    window_bytes = max_bytes * 4
+    lines_a = _read_lines(path_a, window_start, window_lines, window_bytes)
+    lines_b = _read_lines(path_b, window_start, window_lines, window_bytes)
+
+    excerpt = []
+    size = 0
+    for line in difflib.unified_diff(lines_a, lines_b, fromfile=f"baseline/{rel}", tofile=f"candidate/{rel}",
+                                     n=CONTEXT_LINES, lineterm=""):
+        line = line.rstrip("\r\n")
+        if line.startswith("@@"):
+            # Hunk headers are relative to the window; shift them to file line numbers
+            line = _shift_hunk_header(line, first_line_no - 1)
+        if len(excerpt) >= max_lines or size + len(line) > max_bytes:
+            detail.truncated = True
+            break
+        excerpt.append(line)
+        size += len(line) + 1
+    detail.excerpt = excerpt
+    return detail
+
+def _shift_hunk_header(header: str, shift: int) -> str:
+    # "@@ -a,b +c,d @@"
+    try:
+        _, old, new, *_ = header.split(" ")
+        def shifted(spec):
+            sign, rest = spec[0], spec[1:]
+            start, _, count = rest.partition(",")
+            start = int(start) + shift
+            return f"{sign}{start}" + (f",{count}" if count else "")
+        return f"@@ {shifted(old)} {shifted(new)} @@"
+    except (ValueError, IndexError):
+        return header
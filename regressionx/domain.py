@@ -1,5 +1,57 @@
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+@dataclass
+class PyCall:
+    """
+    A Python function to call in-process instead of a shell command.
+
+       - target: "package.module:function".
+       - kwargs: Keyword arguments passed to the function.
+       - path: (Optional) Entries prepended to sys.path in the worker, e.g. the
+               checkout a baseline or candidate version lives in.
+
+    The function runs in a pre-started worker that has already imported its
+    module. Its return value becomes the return code (None -> 0, int -> itself);
+    an uncaught exception yields return code 1 and the traceback on stderr.
+    """
+    target: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    path: Optional[List[str]] = None
+
+    @property
+    def module(self) -> str:
+        return self.target.partition(":")[0]
+
+    def __str__(self) -> str:
+        args = ", ".join(f"{k}={v!r}" for k, v in self.kwargs.items())
+        return f"{self.target}({args})"
+
+@dataclass(eq=False)
+class Preprocess:
+    """
+    A setup step (build, compile, install) run once per version before any case.
+
+    Cases share a Preprocess by referencing the same object; it runs exactly
+    once for the baseline and once for the candidate, in parallel.
+       - baseline_command / candidate_command: Shell commands for each version.
+       - base_path / cand_path: Working directories the commands run in.
+       - env: Optional environment variables for the commands.
+       - inputs: (Optional) Files or directories both sides depend on (e.g. shared headers).
+       - base_inputs / cand_inputs: (Optional) Files or directories only one side depends
+                 on (e.g. its source tree). A side's inputs, command and env form its
+                 fingerprint; if it is unchanged since the last successful run, that side
+                 is skipped. A side without any inputs is always run.
+    """
+    baseline_command: str
+    candidate_command: str
+    base_path: str
+    cand_path: str
+    env: Optional[Dict[str, str]] = None
+    inputs: Optional[List[str]] = None
+    name: str = "preprocess"
+    base_inputs: Optional[List[str]] = None
+    cand_inputs: Optional[List[str]] = None
 
 @dataclass
 class Case:
@@ -9,8 +61,10 @@ class Case:
     A Case consists of two parts:
     1. Execution: "Run this"
        - name: Unique identifier for the case.
-       - command: The actual shell command to execute.
+       - command: The actual shell command to execute, or a PyCall.
        - env: Optional environment variables to set during execution.
+       - cores / memory: (Optional) Resource hints for --adaptive scheduling: cores
+                         used by a command and its peak memory (bytes or e.g. "100G").
        
     2. Verification: "Check this"
        - output: (Optional) The path (file or directory) where the command writes its result.
@@ -21,16 +75,23 @@ class Case:
     name: str # Identity
     
     # Baseline (The Control)
-    baseline_command: str
+    baseline_command: Union[str, PyCall]
 
     # Candidate (The Experiment)
-    candidate_command: str
+    candidate_command: Union[str, PyCall]
 
     # Execution Paths
     base_path: str
     cand_path: str
     
     env: Optional[Dict[str, str]] = None # Action Context
+
+    # Shared once-per-version setup this case depends on
+    preprocess: Optional[Preprocess] = None
+
+    # Resource hints (see --adaptive)
+    cores: Optional[float] = None
+    memory: Optional[Union[int, str]] = None
     
     # Verification
     # Output paths are now handled by the Executor (Sandbox) or auto-generated.
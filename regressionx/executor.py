@@ -1,17 +1,160 @@
 import subprocess
 import os
-from .domain import Case
+import signal
+import threading
+from .domain import Case, PyCall
 
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
+
+class CaseCancelled(Exception):
+    """
+    Raised when a case is aborted because its CancelToken was triggered.
+    """
+
+class CancelToken:
+    """
+    Shared cancellation flag for a run.
+
+    Commands started with a token run in their own process group; `cancel()`
+    kills every registered group so that in-flight cases stop promptly.
+    `reason` keeps why the token was first cancelled, for reporting skipped cases.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._procs = set()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if not self._event.is_set():
+                self.reason = reason
+            self._event.set()
+            procs = list(self._procs)
+        for proc in procs:
+            _kill_process_group(proc)
+
+    def register(self, proc: subprocess.Popen):
+        with self._lock:
+            self._procs.add(proc)
+        if self.cancelled:
+            _kill_process_group(proc)
+
+    def unregister(self, proc: subprocess.Popen):
+        with self._lock:
+            self._procs.discard(proc)
+
+def _kill_process_group(proc: subprocess.Popen):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass # Already exited
+
+@contextmanager
+def cancel_on_interrupt(cancel: CancelToken):
+    """
+    Fires `cancel` if the enclosed block is left by an exception, including
+    KeyboardInterrupt, or by SIGTERM (raised as SystemExit).
+
+    Commands started with a token run in their own process group, so signals
+    sent to ours no longer reach them; this kills them instead of leaving
+    them running. Signal handlers are only installed from the main thread.
+    """
+    def on_sigterm(signum, frame):
+        cancel.cancel("terminated")
+        raise SystemExit(128 + signum)
+
+    previous = None
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGTERM, on_sigterm)
+    try:
+        yield
+    except KeyboardInterrupt:
+        cancel.cancel("interrupted")
+        raise
+    except BaseException:
+        cancel.cancel("aborted")
+        raise
+    finally:
+        if previous is not None:
+            signal.signal(signal.SIGTERM, previous)
 
 def skipped_result() -> subprocess.CompletedProcess:
     return subprocess.CompletedProcess(args="(skipped)", returncode=0, stdout="", stderr="")
 
+def run_command(
+    command: str,
+    cwd: Path,
+    env: dict,
+    watcher=None,
+    poll_interval: float = 5.0,
+    cancel: CancelToken = None
+) -> subprocess.CompletedProcess:
+    """
+    Runs a shell command and captures its output.
+    If a watcher is given, its `poll()` is called every `poll_interval`
+    seconds while the command is running. If a cancel token is given, the
+    command runs in its own process group and CaseCancelled is raised when
+    the token fires.
+    """
+    if cancel is not None and cancel.cancelled:
+        raise CaseCancelled(command)
+
+    if watcher is None and cancel is None:
+        return subprocess.run(
+            command,
+            cwd=str(cwd),
+            shell=True,
+            capture_output=True, # We might want to stream this later, but capture for now
+            text=True,
+            env=env
+        )
+
+    proc = subprocess.Popen(
+        command,
+        cwd=str(cwd),
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        start_new_session=cancel is not None
+    )
+    if cancel is not None:
+        cancel.register(proc)
+    try:
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=poll_interval if watcher is not None else None)
+                break
+            except subprocess.TimeoutExpired:
+                watcher.poll()
+    finally:
+        if cancel is not None:
+            cancel.unregister(proc)
+    if cancel is not None and cancel.cancelled:
+        raise CaseCancelled(command)
+    return subprocess.CompletedProcess(args=command, returncode=proc.returncode, stdout=stdout, stderr=stderr)
+
 def run_case(
     case: Case,
     run_baseline: bool = True,
-    run_candidate: bool = True
+    run_candidate: bool = True,
+    probe=None,
+    watcher=None,
+    poll_interval: float = 5.0,
+    cancel: CancelToken = None,
+    pools=None,
+    base_env: Optional[dict] = None
 ) -> Tuple[subprocess.CompletedProcess, subprocess.CompletedProcess, Path, Path]:
     """
     Executes the baseline and candidate commands in configured directories.
@@ -20,6 +163,16 @@ def run_case(
         case: The Case object containing commands and output paths.
         run_baseline: Whether to execute the baseline command.
         run_candidate: Whether to execute the candidate command.
+        probe: Optional object with a `phase(name, case_name)` context manager
+               (e.g. RunMetrics) used to time the baseline/candidate phases.
+        watcher: Optional IncrementalComparator polled while the candidate runs.
+                 The baseline runs first, so its tree is final by then, while
+                 the candidate tree is left over from an earlier run until
+                 the candidate starts.
+        poll_interval: Seconds between watcher polls.
+        cancel: Optional CancelToken; raises CaseCancelled if it fires.
+        pools: Optional PyWorkerPools used for PyCall commands.
+        base_env: Environment the case's `env` is applied to (default: os.environ).
         
     Returns:
         (baseline_result, candidate_result, baseline_path, candidate_path)
@@ -34,33 +187,31 @@ def run_case(
     base_path.mkdir(parents=True, exist_ok=True)
     cand_path.mkdir(parents=True, exist_ok=True)
     
-    env = os.environ.copy()
+    env = dict(base_env) if base_env is not None else os.environ.copy()
     if case.env:
         env.update(case.env)
         
+    def phase(name):
+        return probe.phase(name, case.name) if probe is not None else nullcontext()
+
+    def execute(command, side, cwd):
+        side_watcher = watcher if side == "candidate" else None
+        if isinstance(command, PyCall):
+            from .pool import run_pycall
+            return run_pycall(command, side, cwd, env, pools, side_watcher, poll_interval, cancel)
+        return run_command(command, cwd, env, side_watcher, poll_interval, cancel)
+
     # 2. Run Baseline
     if run_baseline:
-        base_res = subprocess.run(
-            case.baseline_command,
-            cwd=str(base_path),
-            shell=True,
-            capture_output=True, # We might want to stream this later, but capture for now
-            text=True,
-            env=env
-        )
+        with phase("baseline"):
+            base_res = execute(case.baseline_command, "baseline", base_path)
     else:
         base_res = skipped_result()
     
     # 3. Run Candidate
     if run_candidate:
-        cand_res = subprocess.run(
-            case.candidate_command,
-            cwd=str(cand_path),
-            shell=True,
-            capture_output=True,
-            text=True,
-            env=env
-        )
+        with phase("candidate"):
+            cand_res = execute(case.candidate_command, "candidate", cand_path)
     else:
         cand_res = skipped_result()
     
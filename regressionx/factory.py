@@ -1,5 +1,5 @@
-from typing import List, Dict, Optional, Any
-from .domain import Case
+from typing import List, Dict, Optional, Any, Union
+from .domain import Case, Preprocess, PyCall
 
 class Template:
     """
@@ -7,17 +7,23 @@ class Template:
     """
     def __init__(
         self,
-        baseline_command: str,
-        candidate_command: str,
+        baseline_command: Union[str, PyCall],
+        candidate_command: Union[str, PyCall],
         env: Optional[Dict[str, str]] = None,
         base_path: Optional[str] = None,
-        cand_path: Optional[str] = None
+        cand_path: Optional[str] = None,
+        preprocess: Optional[Preprocess] = None,
+        cores: Optional[float] = None,
+        memory: Optional[Union[int, str]] = None
     ):
         self.baseline_template = baseline_command
         self.candidate_template = candidate_command
         self.env_template = env or {}
         self.base_path_template = base_path
         self.cand_path_template = cand_path
+        self.preprocess = preprocess
+        self.cores = cores
+        self.memory = memory
 
     def _resolve_path(self, template: Optional[str], data: Dict[str, Any], label: str) -> str:
         if template is not None:
@@ -29,9 +35,19 @@ class Template:
             return str(data[label])
         raise KeyError(f"Data dictionary must include '{label}' or provide a template.")
 
+    @staticmethod
+    def _format_command(template: Union[str, PyCall], data: Dict[str, Any]) -> Union[str, PyCall]:
+        if not isinstance(template, PyCall):
+            return template.format(**data)
+        # String arguments and path entries are templates too
+        kwargs = {k: v.format(**data) if isinstance(v, str) else v for k, v in template.kwargs.items()}
+        path = [p.format(**data) for p in template.path] if template.path else template.path
+        return PyCall(target=template.target, kwargs=kwargs, path=path)
+
     def generate(self, data_list: List[Dict[str, Any]]) -> List[Case]:
         """
         Generates a list of Case objects by applying each dictionary in data_list to the templates.
+        A 'cores' or 'memory' key in a dictionary overrides the template's resource hint.
         """
         cases = []
         for data in data_list:
@@ -40,8 +56,8 @@ class Template:
             
             # Format commands
             try:
-                base_cmd = self.baseline_template.format(**data)
-                cand_cmd = self.candidate_template.format(**data)
+                base_cmd = self._format_command(self.baseline_template, data)
+                cand_cmd = self._format_command(self.candidate_template, data)
             except KeyError as e:
                 raise KeyError(f"Missing key in data for command template: {e}")
             
@@ -59,7 +75,10 @@ class Template:
                 candidate_command=cand_cmd,
                 base_path=self._resolve_path(self.base_path_template, data, "base_path"),
                 cand_path=self._resolve_path(self.cand_path_template, data, "cand_path"),
-                env=env if env else None
+                env=env if env else None,
+                preprocess=self.preprocess,
+                cores=data.get("cores", self.cores),
+                memory=data.get("memory", self.memory)
             ))
             
         return cases
@@ -0,0 +1,55 @@
+import dataclasses
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from .domain import Case
+
+@dataclass
+class FlakinessResult:
+    """
+    Outcome of re-running a failed case several times.
+
+    `attempts` includes the original run. `differences` counts, for every
+    structural error or content diff seen in any attempt, in how many
+    attempts it occurred.
+    """
+    attempts: int
+    passed: int
+    differences: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def verdict(self) -> str:
+        # Any passing attempt means the failure is not reproducible
+        return "FLAKY" if self.passed > 0 else "FAIL"
+
+    def stability(self) -> List[tuple]:
+        """
+        (difference, occurrences) pairs, least stable (most frequent) first.
+        """
+        return sorted(self.differences.items(), key=lambda item: (-item[1], item[0]))
+
+def scratch_case(case: Case, root: Path, run_baseline: bool, run_candidate: bool) -> Case:
+    """
+    Copy of `case` whose executed sides write under `root` instead of their
+    configured paths. Sides that are not re-run keep their configured path.
+    """
+    root = Path(root)
+    return dataclasses.replace(
+        case,
+        base_path=str(root / "baseline") if run_baseline else case.base_path,
+        cand_path=str(root / "candidate") if run_candidate else case.cand_path,
+    )
+
+def summarize(cmp_results: list) -> FlakinessResult:
+    """
+    Classifies a case from the ComparatorResults of all of its attempts.
+    """
+    result = FlakinessResult(attempts=len(cmp_results), passed=0)
+    for cmp_result in cmp_results:
+        if cmp_result.match:
+            result.passed += 1
+            continue
+        for entry in set(cmp_result.errors) | set(cmp_result.diffs):
+            result.differences[entry] = result.differences.get(entry, 0) + 1
+    return result
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import posixpath
+import time
+from pathlib import Path
+from typing import Dict
+from urllib.parse import quote
+
+from .comparator import ComparatorResult, DiffKind, DEFAULT_MAX_DETAILS, DEFAULT_MAX_EXAMPLES
+from .diagnostics import MismatchDetail, TEXT_SNIFF_BYTES, looks_like_text
+from .metrics import write_atomic
+
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def _normalize_text(data: bytes) -> bytes:
+    # Line endings and trailing whitespace are not significant in normalized digests
+    return b"\n".join(line.rstrip() for line in data.splitlines())
+
+def file_digests(path: Path, text: bool = False) -> Dict[str, str]:
+    """
+    Streams a file once and returns its sha256 and, if `text` is set and the
+    file looks like text, a digest of its normalized lines.
+    """
+    raw = hashlib.sha256()
+    normalized = hashlib.sha256() if text else None
+    pending = b""
+    is_text = None
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            raw.update(block)
+            if normalized is None:
+                continue
+            if is_text is None:
+                is_text = looks_like_text(block[:TEXT_SNIFF_BYTES])
+                if not is_text:
+                    normalized = None
+                    continue
+            data = pending + block
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                normalized.update(_normalize_text(data[:cut]) + b"\n")
+            pending = data[cut:]
+    digests = {"sha256": raw.hexdigest()}
+    if normalized is not None:
+        if pending:
+            normalized.update(_normalize_text(pending))
+        digests["text_sha256"] = normalized.hexdigest()
+    return digests
+
+def build_manifest(root: Path, text: bool = False) -> dict:
+    """
+    Freezes an output tree (or single file) into paths, types, sizes and digests.
+    """
+    root = Path(root)
+    if not root.exists():
+        raise FileNotFoundError(f"Cannot freeze missing output: {root}")
+
+    entries = {}
+    if root.is_file():
+        st = root.stat()
+        entries[root.name] = {"type": "file", "size": st.st_size, **file_digests(root, text)}
+    else:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            rel_dir = Path(dirpath).relative_to(root)
+            for name in dirnames:
+                entries[(rel_dir / name).as_posix()] = {"type": "dir"}
+            for name in sorted(filenames):
+                path = Path(dirpath) / name
+                entries[(rel_dir / name).as_posix()] = {
+                    "type": "file", "size": path.stat().st_size, **file_digests(path, text)
+                }
+
+    return {
+        "version": MANIFEST_VERSION,
+        "root": str(root),
+        "is_file": root.is_file(),
+        "created": time.time(),
+        "entries": entries,
+    }
+
+def manifest_path(directory: str, case_name: str) -> Path:
+    return Path(directory) / f"{quote(case_name, safe='')}.json"
+
+def write_manifest(path: Path, manifest: dict):
+    write_atomic(str(path), json.dumps(manifest, sort_keys=True))
+
+def load_manifest(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version in {path}: {manifest.get('version')}")
+    return manifest
+
+def compare_to_manifest(
+    manifest: dict,
+    candidate: Path,
+    text: bool = False,
+    max_examples: int = DEFAULT_MAX_EXAMPLES
+) -> ComparatorResult:
+    """
+    Compares a candidate output tree against a frozen baseline manifest.
+
+    Only the candidate side is read. Files whose size differs from the
+    manifest are reported without hashing. With `text` set, files that have
+    a normalized-text digest on both sides are compared by that digest.
+    """
+    result = ComparatorResult(max_examples=max_examples)
+    candidate = Path(candidate)
+    if not candidate.exists():
+        result.match = False
+        result.errors.append(f"Candidate directory does not exist: {candidate}")
+        return result
+
+    expected = manifest["entries"]
+    if manifest.get("is_file") and candidate.is_file():
+        # Single-file outputs are keyed by the baseline file name
+        actual = {next(iter(expected), candidate.name): candidate}
+    else:
+        actual = {}
+        for dirpath, dirnames, filenames in os.walk(candidate):
+            rel_dir = Path(dirpath).relative_to(candidate)
+            for name in dirnames + filenames:
+                actual[(rel_dir / name).as_posix()] = Path(dirpath) / name
+
+    def under_reported(rel, reported):
+        parent = posixpath.dirname(rel)
+        while parent:
+            if parent in reported:
+                return True
+            parent = posixpath.dirname(parent)
+        return False
+
+    # 1. Structural checks (a missing or retyped directory is reported once, not per child)
+    retyped = set()
+    for rel in sorted(expected):
+        path = actual.get(rel)
+        if path is not None and (expected[rel]["type"] == "dir") != path.is_dir():
+            retyped.add(rel)
+            result.add_difference(DiffKind.TYPE_MISMATCH, rel)
+    missing = set(retyped)
+    for rel in sorted(expected):
+        if rel not in actual and not under_reported(rel, missing):
+            missing.add(rel)
+            result.add_difference(DiffKind.ONLY_IN_BASELINE, rel)
+    extra = set(retyped)
+    for rel in sorted(actual):
+        if rel not in expected and not under_reported(rel, extra):
+            extra.add(rel)
+            result.add_difference(DiffKind.ONLY_IN_CANDIDATE, rel)
+
+    # 2. Content checks
+    for rel in sorted(expected):
+        entry = expected[rel]
+        path = actual.get(rel)
+        if entry["type"] != "file" or path is None or rel in retyped:
+            continue
+
+        size = path.stat().st_size
+        result.files_compared += 1
+        if size == entry["size"]:
+            result.bytes_compared += size
+            digests = file_digests(path, text=text and "text_sha256" in entry)
+            if text and "text_sha256" in entry and "text_sha256" in digests:
+                equal = digests["text_sha256"] == entry["text_sha256"]
+            else:
+                equal = digests["sha256"] == entry["sha256"]
+            if equal:
+                continue
+        elif text and "text_sha256" in entry:
+            # Normalization may change the size, so hash before deciding
+            result.bytes_compared += size
+            digests = file_digests(path, text=True)
+            if digests.get("text_sha256") == entry["text_sha256"]:
+                continue
+
+        result.add_difference(DiffKind.CONTENT_MISMATCH, rel)
+        if len(result.details) < DEFAULT_MAX_DETAILS:
+            result.details[rel] = MismatchDetail(path=rel, base_size=entry["size"], cand_size=size)
+
+    return result
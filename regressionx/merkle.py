@@ -0,0 +1,276 @@
+import filecmp
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .comparator import (
+    ComparatorResult, DiffKind, IncrementalComparator, DEFAULT_MAX_DETAILS, DEFAULT_MAX_EXAMPLES
+)
+from .metrics import write_atomic
+
+MERKLE_VERSION = 2
+MERKLE_SUFFIX = ".regressionx-merkle.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def digest_cache_path(root: Path) -> Path:
+    """
+    The digest cache of an output lives next to it, not inside it, so it
+    never shows up in a comparison.
+    """
+    root = Path(root)
+    return root.parent / (root.name + MERKLE_SUFFIX)
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+class DigestCache:
+    """
+    File digests of one output tree, keyed by relative path and reused while
+    the file's (size, mtime_ns, inode) is unchanged. Persisted next to the
+    output (see digest_cache_path) so later runs start warm, together with
+    the tree's root digest and the stamp of the scan it was computed from.
+    """
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.path = digest_cache_path(self.root)
+        self.hashed_files = 0
+        self.hashed_bytes = 0
+        self.root_digest: Optional[str] = None
+        self.stamp: Optional[str] = None
+        self._dirty = False
+        self._entries: Dict[str, list] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MERKLE_VERSION:
+                self._entries = data["files"]
+                self.root_digest = data.get("root")
+                self.stamp = data.get("stamp")
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def file_digest(self, rel: str, path: Optional[Path] = None) -> str:
+        path = Path(path) if path is not None else self.root / rel
+        st = os.stat(path)
+        signature = [st.st_size, st.st_mtime_ns, st.st_ino]
+        cached = self._entries.get(rel)
+        if cached is not None and cached[:3] == signature:
+            return cached[3]
+        digest = _hash_file(path)
+        self._entries[rel] = signature + [digest]
+        self._dirty = True
+        self.hashed_files += 1
+        self.hashed_bytes += st.st_size
+        return digest
+
+    def cached_root(self, stamp: str) -> Optional[str]:
+        """
+        The saved root digest, if the tree is still exactly as it was scanned then.
+        """
+        return self.root_digest if self.stamp == stamp else None
+
+    def prune(self, live: set):
+        stale = [rel for rel in self._entries if rel not in live]
+        for rel in stale:
+            del self._entries[rel]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self, root_digest: Optional[str] = None, stamp: Optional[str] = None):
+        if not self._dirty and (root_digest, stamp) == (self.root_digest, self.stamp):
+            return
+        self.root_digest, self.stamp = root_digest, stamp
+        data = {"version": MERKLE_VERSION, "root": root_digest, "stamp": stamp, "files": self._entries}
+        write_atomic(str(self.path), json.dumps(data))
+        self._dirty = False
+
+
+@dataclass
+class MerkleNode:
+    digest: str
+    is_dir: bool
+    size: int = 0
+    children: Dict[str, "MerkleNode"] = field(default_factory=dict)
+    is_link: bool = False
+
+# rel -> ("d",), ("l", target) or ("f", size, mtime_ns, inode); the root is ""
+Scan = Dict[str, tuple]
+
+def scan_tree(root: Path) -> Scan:
+    """
+    Stats an output tree without reading any file. Names in
+    filecmp.DEFAULT_IGNORES are skipped, as compare_directories does, and
+    symlinks below the root are recorded by target rather than followed.
+    """
+    root = Path(root)
+    scan: Scan = {}
+
+    def visit(path: Path, rel: str):
+        if rel and path.is_symlink():
+            scan[rel] = ("l", os.readlink(path))
+        elif path.is_dir():
+            scan[rel] = ("d",)
+            for name in sorted(os.listdir(path)):
+                if name not in filecmp.DEFAULT_IGNORES:
+                    visit(path / name, f"{rel}/{name}" if rel else name)
+        else:
+            st = path.stat()
+            scan[rel] = ("f", st.st_size, st.st_mtime_ns, st.st_ino)
+
+    visit(root, "")
+    return scan
+
+def scan_stamp(scan: Scan) -> str:
+    h = hashlib.sha256()
+    for rel, entry in sorted(scan.items()):
+        h.update(f"{rel}\0{entry!r}\n".encode("utf-8"))
+    return h.hexdigest()
+
+def build_tree(root: Path, cache: DigestCache, scan: Optional[Scan] = None) -> MerkleNode:
+    """
+    Builds the Merkle tree of an output directory (or single file) from its
+    scan. A directory's digest covers its children's names, types and
+    digests; a symlink's digest is that of its target path.
+    """
+    root = Path(root)
+    scan = scan if scan is not None else scan_tree(root)
+    live = set()
+    children: Dict[str, List[str]] = {}
+    for rel in scan:
+        if rel:
+            parent, _, name = rel.rpartition("/")
+            children.setdefault(parent, []).append(name)
+
+    def visit(rel: str) -> MerkleNode:
+        entry = scan[rel]
+        if entry[0] == "l":
+            digest = hashlib.sha256(f"link:{entry[1]}".encode("utf-8")).hexdigest()
+            return MerkleNode(digest, is_dir=False, is_link=True)
+        if entry[0] == "f":
+            key = rel or root.name
+            live.add(key)
+            return MerkleNode(cache.file_digest(key, root / rel if rel else root), is_dir=False, size=entry[1])
+        node = MerkleNode("", is_dir=True)
+        h = hashlib.sha256()
+        for name in sorted(children.get(rel, ())):
+            child = visit(f"{rel}/{name}" if rel else name)
+            node.children[name] = child
+            kind = "d" if child.is_dir else "l" if child.is_link else "f"
+            h.update(f"{kind}:{name}:{child.digest}\n".encode("utf-8"))
+        node.digest = h.hexdigest()
+        return node
+
+    tree = visit("")
+    cache.prune(live)
+    return tree
+
+def merkle_compare(
+    baseline: Path,
+    candidate: Path,
+    max_details: int = DEFAULT_MAX_DETAILS,
+    max_examples: int = DEFAULT_MAX_EXAMPLES,
+    caches: Optional[List[DigestCache]] = None
+) -> ComparatorResult:
+    """
+    Compares two outputs by Merkle digests.
+
+    Both outputs are scanned (stat only) first. If neither changed since its
+    root digest was cached and the cached roots are equal, that is a match
+    without building the trees. Otherwise equal root digests are still a
+    match without looking further, and only subtrees whose digests differ
+    are descended. File digests come from the digest caches persisted next
+    to each output, so only files that changed since they were last
+    digested are read. `caches` may pass in warm (baseline, candidate)
+    caches, e.g. from MerkleIncrementalComparator.
+    """
+    baseline = Path(baseline)
+    candidate = Path(candidate)
+    result = ComparatorResult(max_examples=max_examples)
+
+    if not baseline.exists():
+        result.match = False
+        result.errors.append(f"Baseline directory does not exist: {baseline}")
+        return result
+    if not candidate.exists():
+        result.match = False
+        result.errors.append(f"Candidate directory does not exist: {candidate}")
+        return result
+
+    base_cache, cand_cache = caches or (DigestCache(baseline), DigestCache(candidate))
+    base_scan, cand_scan = scan_tree(baseline), scan_tree(candidate)
+    base_stamp, cand_stamp = scan_stamp(base_scan), scan_stamp(cand_scan)
+    base_root = base_cache.cached_root(base_stamp)
+    if base_root is not None and base_root == cand_cache.cached_root(cand_stamp):
+        return result
+
+    base_tree = build_tree(baseline, base_cache, base_scan)
+    cand_tree = build_tree(candidate, cand_cache, cand_scan)
+    base_cache.save(base_tree.digest, base_stamp)
+    cand_cache.save(cand_tree.digest, cand_stamp)
+    result.bytes_compared = base_cache.hashed_bytes + cand_cache.hashed_bytes
+
+    def files_differ(rel: str, node_a: MerkleNode, node_b: MerkleNode, path_a: Path, path_b: Path):
+        result.files_compared += 1
+        if node_a.digest != node_b.digest:
+            result.add_content_mismatch(rel, path_a, path_b, max_details)
+
+    if not base_tree.is_dir or not cand_tree.is_dir:
+        if base_tree.is_dir != cand_tree.is_dir:
+            result.add_difference(DiffKind.TYPE_MISMATCH, baseline.name)
+        else:
+            files_differ(baseline.name, base_tree, cand_tree, baseline, candidate)
+        return result
+
+    def descend(node_a: MerkleNode, node_b: MerkleNode, path_a: Path, path_b: Path, rel: str):
+        if node_a.digest == node_b.digest:
+            return
+        for name in sorted(node_a.children.keys() | node_b.children.keys()):
+            child_rel = f"{rel}/{name}" if rel else name
+            child_a = node_a.children.get(name)
+            child_b = node_b.children.get(name)
+            if child_b is None:
+                result.add_difference(DiffKind.ONLY_IN_BASELINE, child_rel)
+            elif child_a is None:
+                result.add_difference(DiffKind.ONLY_IN_CANDIDATE, child_rel)
+            elif (child_a.is_dir, child_a.is_link) != (child_b.is_dir, child_b.is_link):
+                result.add_difference(DiffKind.TYPE_MISMATCH, child_rel)
+            elif child_a.is_dir:
+                descend(child_a, child_b, path_a / name, path_b / name, child_rel)
+            elif child_a.is_link:
+                if child_a.digest != child_b.digest:
+                    result.add_difference(DiffKind.CONTENT_MISMATCH, child_rel)
+            else:
+                files_differ(child_rel, child_a, child_b, path_a / name, path_b / name)
+
+    descend(base_tree, cand_tree, baseline, candidate, "")
+    return result
+
+
+class MerkleIncrementalComparator(IncrementalComparator):
+    """
+    IncrementalComparator that digests settled files into the Merkle digest
+    caches while the commands run, so `finish()` only hashes what is left.
+    """
+    def __init__(self, *args, max_details: int = DEFAULT_MAX_DETAILS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_details = max_details
+        self.caches = (DigestCache(self.baseline), DigestCache(self.candidate))
+
+    def _compare_files(self, rel: str, path_a: Path, path_b: Path) -> bool:
+        return self.caches[0].file_digest(rel, path_a) == self.caches[1].file_digest(rel, path_b)
+
+    def finish(self) -> ComparatorResult:
+        return merkle_compare(
+            self.baseline, self.candidate,
+            max_details=self.max_details, max_examples=self.max_examples, caches=list(self.caches)
+        )
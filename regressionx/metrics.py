@@ -0,0 +1,196 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class RunMetrics:
+    """
+    Thread-safe counters describing the progress of a regression run.
+
+    The CLI updates these while cases execute so that an external watcher
+    (e.g. a node_exporter textfile collector) can observe a run in flight.
+    """
+    def __init__(self, cases_total: int = 0):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.cases_total = cases_total
+        self.cases_started = 0
+        self.cases_running = 0
+        self.cases_passed = 0
+        self.cases_failed = 0
+        self.cases_skipped = 0
+        self.files_compared = 0
+        self.bytes_compared = 0
+        self.compare_seconds = 0.0
+        self.phase_seconds: Dict[str, float] = {}
+
+    def case_started(self):
+        with self._lock:
+            self.cases_started += 1
+            self.cases_running += 1
+
+    def case_finished(self, passed: bool):
+        with self._lock:
+            self.cases_running -= 1
+            if passed:
+                self.cases_passed += 1
+            else:
+                self.cases_failed += 1
+
+    def case_cancelled(self):
+        """
+        Marks a started case as aborted by cancellation (counted as skipped).
+        """
+        with self._lock:
+            self.cases_running -= 1
+            self.cases_skipped += 1
+
+    def case_skipped(self):
+        """
+        Marks a case that was never started (e.g. after fail-fast) as skipped.
+        """
+        with self._lock:
+            self.cases_started += 1
+            self.cases_skipped += 1
+
+    def add_comparison(self, cmp_result, seconds: float):
+        with self._lock:
+            self.files_compared += getattr(cmp_result, "files_compared", 0)
+            self.bytes_compared += getattr(cmp_result, "bytes_compared", 0)
+            self.compare_seconds += seconds
+
+    def add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str, case_name: Optional[str] = None):
+        """
+        Times the enclosed block and accumulates it under `name`.
+        `case_name` is accepted for symmetry with other probes and ignored.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            throughput = self.bytes_compared / self.compare_seconds if self.compare_seconds > 0 else 0.0
+            return {
+                "cases_total": self.cases_total,
+                "cases_queued": max(self.cases_total - self.cases_started, 0),
+                "cases_running": self.cases_running,
+                "cases_passed": self.cases_passed,
+                "cases_failed": self.cases_failed,
+                "cases_skipped": self.cases_skipped,
+                "files_compared": self.files_compared,
+                "bytes_compared": self.bytes_compared,
+                "compare_seconds": self.compare_seconds,
+                "compare_throughput_bytes_per_second": throughput,
+                "phase_seconds": dict(self.phase_seconds),
+                "elapsed_seconds": time.time() - self.started_at,
+                "updated_at": time.time(),
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the snapshot in the Prometheus text exposition format.
+        """
+        snap = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, value, labels=""):
+            lines.append(f"# HELP regressionx_{name} {help_text}")
+            lines.append(f"# TYPE regressionx_{name} {kind}")
+            lines.append(f"regressionx_{name}{labels} {value}")
+
+        lines.append("# HELP regressionx_cases Number of cases by state.")
+        lines.append("# TYPE regressionx_cases gauge")
+        for state in ("total", "queued", "running", "passed", "failed", "skipped"):
+            lines.append(f'regressionx_cases{{state="{state}"}} {snap["cases_" + state]}')
+
+        metric("files_compared_total", "counter", "Files compared by content.", snap["files_compared"])
+        metric("bytes_compared_total", "counter", "Bytes of file content compared.", snap["bytes_compared"])
+        metric("compare_throughput_bytes_per_second", "gauge", "Comparator throughput.",
+               f'{snap["compare_throughput_bytes_per_second"]:.3f}')
+
+        lines.append("# HELP regressionx_phase_seconds_total Time spent per phase.")
+        lines.append("# TYPE regressionx_phase_seconds_total counter")
+        for name, seconds in sorted(snap["phase_seconds"].items()):
+            lines.append(f'regressionx_phase_seconds_total{{phase="{name}"}} {seconds:.6f}')
+
+        metric("elapsed_seconds", "gauge", "Wall time since the run started.", f'{snap["elapsed_seconds"]:.3f}')
+        metric("last_update_timestamp_seconds", "gauge", "Unix time of the last metrics write.",
+               f'{snap["updated_at"]:.3f}')
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def render(self, path: str) -> str:
+        """
+        Chooses the output format from the file extension (.json or Prometheus text).
+        """
+        if path.endswith(".json"):
+            return self.to_json()
+        return self.to_prometheus()
+
+
+def write_atomic(path: str, text: str):
+    """
+    Writes `text` to `path` so that readers never observe a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".regressionx-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # mkstemp creates the file 0600; collectors often run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class MetricsWriter:
+    """
+    Periodically writes a RunMetrics snapshot to a file from a background thread.
+    """
+    def __init__(self, metrics: RunMetrics, path: str, interval: float = 10.0):
+        if interval <= 0:
+            raise ValueError("metrics interval must be positive")
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="regressionx-metrics", daemon=True)
+
+    def write(self):
+        write_atomic(self.path, self.metrics.render(self.path))
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                # Keep the run going; the next interval retries
+                print(f"Error writing metrics to {self.path}: {e}", file=sys.stderr)
+
+    def start(self):
+        self.write()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
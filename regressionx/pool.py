@@ -0,0 +1,295 @@
+import hashlib
+import importlib
+import importlib.machinery
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .domain import Case, PyCall
+
+def _start_method() -> str:
+    # Avoid plain fork: the parent runs scheduler/metrics threads
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+# Modules whose preload failed in this worker, with the formatted error
+_preload_errors: Dict[str, str] = {}
+
+def _init_worker(sys_path: List[str], modules: List[str]):
+    """
+    Worker initializer: sets up sys.path and imports the target modules once.
+
+    An initializer that raises makes multiprocessing respawn the worker
+    forever, so import errors are only recorded here. The call re-imports
+    its module and reports the error as a failed command.
+    """
+    for entry in reversed(sys_path):
+        if entry not in sys.path:
+            sys.path.insert(0, entry)
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except BaseException:
+            _preload_errors[module] = traceback.format_exc()
+
+def _resolve(target: str):
+    module_name, _, func_name = target.partition(":")
+    if not func_name:
+        raise ValueError(f"PyCall target must be 'module:function', got '{target}'")
+    func = importlib.import_module(module_name)
+    for attr in func_name.split("."):
+        func = getattr(func, attr)
+    return func
+
+def _read_capture(f) -> str:
+    f.seek(0)
+    return f.read().decode("utf-8", errors="replace")
+
+def _call_in_worker(target: str, kwargs: dict, cwd: str, env: Dict[str, str]) -> Tuple[int, str, str]:
+    """
+    Runs one call with its own cwd, environment and captured stdout/stderr,
+    then restores the worker's state. Returns (returncode, stdout, stderr).
+    """
+    saved_cwd = os.getcwd()
+    saved_env = dict(os.environ)
+    saved_fds = (os.dup(1), os.dup(2))
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(out.fileno(), 1)
+        os.dup2(err.fileno(), 2)
+        try:
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(env)
+            try:
+                value = _resolve(target)(**kwargs)
+                returncode = value if isinstance(value, int) and not isinstance(value, bool) else 0
+            except SystemExit as e:
+                code = e.code
+                returncode = code if isinstance(code, int) else (0 if code is None else 1)
+                if code is not None and not isinstance(code, int):
+                    print(code, file=sys.stderr)
+            except BaseException:
+                traceback.print_exc()
+                returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for fd in saved_fds:
+                os.close(fd)
+            os.chdir(saved_cwd)
+            os.environ.clear()
+            os.environ.update(saved_env)
+        return returncode, _read_capture(out), _read_capture(err)
+
+
+def source_fingerprint(sys_path: Iterable[str], modules: Iterable[str]) -> str:
+    """
+    Digest of the size and mtime of the Python sources a pool imports: every
+    module file under its `sys_path` entries or, without any, under the
+    locations of its modules' top-level packages. Workers keep what they
+    imported, so a pool whose sources changed must not serve new calls.
+    """
+    roots = list(sys_path)
+    if not roots:
+        for module in sorted(set(modules)):
+            spec = importlib.machinery.PathFinder.find_spec(module.split(".")[0], sys.path)
+            if spec is not None:
+                roots.extend(spec.submodule_search_locations or [spec.origin])
+    suffixes = tuple(importlib.machinery.all_suffixes())
+    h = hashlib.sha256()
+    for root in roots:
+        if not root:
+            continue
+        if os.path.isfile(root):
+            st = os.stat(root)
+            h.update(f"{root}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for name in sorted(filenames):
+                if name.endswith(suffixes):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    h.update(f"{path}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class PyWorkerPool:
+    """
+    A pool of long-lived worker processes sharing one sys.path, with the
+    modules of their calls imported up front.
+    """
+    def __init__(self, size: int, sys_path: Iterable[str] = (), modules: Iterable[str] = ()):
+        self.sys_path = list(sys_path)
+        self.modules = sorted(set(modules))
+        self.fingerprint = source_fingerprint(self.sys_path, self.modules)
+        ctx = multiprocessing.get_context(_start_method())
+        self._pool = ctx.Pool(processes=size, initializer=_init_worker, initargs=(self.sys_path, self.modules))
+
+    def submit(self, call: PyCall, cwd: str, env: Dict[str, str]):
+        return self._pool.apply_async(_call_in_worker, (call.target, dict(call.kwargs), str(cwd), dict(env)))
+
+    def terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+
+# Pools kept alive at once; idle ones beyond this are closed, least recently used first
+DEFAULT_MAX_POOLS = 4
+
+class PyWorkerPools:
+    """
+    Pools keyed by (side, sys.path) so that baseline and candidate versions of
+    the same module never share an interpreter.
+
+    Pools are started on first use. When per-case paths call for many of
+    them, at most `max_pools` are kept: the least recently used pool with no
+    call in flight is closed to make room. Pools still in use are never
+    closed, so the limit can be exceeded while more keys than that are busy.
+    """
+    def __init__(self, size: int = 1, max_pools: int = DEFAULT_MAX_POOLS):
+        self.size = size
+        self.max_pools = max_pools
+        self._lock = threading.Lock()
+        self._pools: "OrderedDict[Tuple[str, Tuple[str, ...]], PyWorkerPool]" = OrderedDict()
+        self._in_use: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        self._modules: Dict[Tuple[str, Tuple[str, ...]], set] = {}
+
+    @staticmethod
+    def _key(side: str, call: PyCall) -> Tuple[str, Tuple[str, ...]]:
+        return (side, tuple(call.path or ()))
+
+    def prepare(self, cases: List[Case], run_baseline: bool = True, run_candidate: bool = True):
+        """
+        Records the modules `cases` call, so that each pool preloads all of
+        its modules when it is started.
+        """
+        with self._lock:
+            for case in cases:
+                for side, command, enabled in (("baseline", case.baseline_command, run_baseline),
+                                               ("candidate", case.candidate_command, run_candidate)):
+                    if enabled and isinstance(command, PyCall):
+                        self._modules.setdefault(self._key(side, command), set()).add(command.module)
+
+    @contextmanager
+    def lease(self, side: str, call: PyCall):
+        """
+        Yields the pool for `call`, starting it if needed, and keeps it from
+        being closed until the block exits.
+        """
+        key = self._key(side, call)
+        evicted = []
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                modules = self._modules.get(key, set()) | {call.module}
+                pool = self._pools[key] = PyWorkerPool(self.size, key[1], modules)
+            self._pools.move_to_end(key)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+            for other in list(self._pools):
+                if len(self._pools) <= self.max_pools:
+                    break
+                if not self._in_use.get(other):
+                    evicted.append(self._pools.pop(other))
+        for idle in evicted:
+            idle.close()
+        try:
+            yield pool
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+
+    def drop_stale(self):
+        """
+        Closes the idle pools whose sources changed since they were started
+        (see source_fingerprint), so that reused pools never run old code.
+        """
+        with self._lock:
+            idle = [(key, pool) for key, pool in self._pools.items() if not self._in_use.get(key)]
+        stale = [(key, pool) for key, pool in idle
+                 if source_fingerprint(pool.sys_path, pool.modules) != pool.fingerprint]
+        with self._lock:
+            for key, pool in stale:
+                if self._pools.get(key) is pool:
+                    del self._pools[key]
+        for _, pool in stale:
+            pool.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pools)
+
+    def terminate(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.terminate()
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+
+def run_pycall(
+    call: PyCall,
+    side: str,
+    cwd,
+    env: Dict[str, str],
+    pools: Optional[PyWorkerPools] = None,
+    watcher=None,
+    poll_interval: float = 5.0,
+    cancel=None
+) -> subprocess.CompletedProcess:
+    """
+    Runs a PyCall on a worker pool and returns a CompletedProcess-like result.
+    Without `pools`, a throwaway single-worker pool is used.
+    """
+    from .executor import CaseCancelled
+
+    own_pools = pools is None
+    if own_pools:
+        pools = PyWorkerPools(size=1)
+    try:
+        with pools.lease(side, call) as pool:
+            pending = pool.submit(call, cwd, env)
+            # Wake up regularly to poll the watcher and honour cancellation
+            interval = poll_interval if watcher is not None else 0.2
+            while True:
+                if cancel is not None and cancel.cancelled:
+                    # A worker cannot be interrupted safely mid-call; drop the pool
+                    pools.terminate()
+                    raise CaseCancelled(str(call))
+                try:
+                    returncode, stdout, stderr = pending.get(timeout=interval)
+                    break
+                except multiprocessing.TimeoutError:
+                    if watcher is not None:
+                        watcher.poll()
+    finally:
+        if own_pools:
+            pools.close()
+    return subprocess.CompletedProcess(args=str(call), returncode=returncode, stdout=stdout, stderr=stderr)
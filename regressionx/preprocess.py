@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .domain import Case, Preprocess
+from .executor import run_command, skipped_result, CancelToken
+
+STAMP_NAME = ".regressionx-preprocess.json"
+
+def collect_preprocesses(cases: List[Case]) -> List[Preprocess]:
+    """
+    Returns the distinct Preprocess objects referenced by `cases`, in first-use order.
+    """
+    seen = {}
+    for case in cases:
+        pre = getattr(case, "preprocess", None)
+        if pre is not None and id(pre) not in seen:
+            seen[id(pre)] = pre
+    return list(seen.values())
+
+def side_inputs(pre: Preprocess, side: str) -> List[str]:
+    """
+    The shared inputs of a preprocess step plus those of one side.
+    """
+    own = pre.base_inputs if side == "baseline" else pre.cand_inputs
+    return list(pre.inputs or []) + list(own or [])
+
+def _hash_inputs(h, inputs: List[str]):
+    # Inputs are fingerprinted by path, size and mtime (like make), not by content
+    for entry in sorted(inputs):
+        root = Path(entry)
+        h.update(f"input:{entry}\n".encode("utf-8"))
+        if root.is_file():
+            st = root.stat()
+            h.update(f"{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+            continue
+        if not root.exists():
+            h.update(b"missing\n")
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = Path(dirpath) / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                rel = path.relative_to(root).as_posix()
+                h.update(f"{rel}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+
+def fingerprint(pre: Preprocess, side: str) -> str:
+    """
+    Digest of everything that determines the outcome of one side of a preprocess step.
+    """
+    command = pre.baseline_command if side == "baseline" else pre.candidate_command
+    h = hashlib.sha256()
+    h.update(f"command:{command}\n".encode("utf-8"))
+    for key, value in sorted((pre.env or {}).items()):
+        h.update(f"env:{key}={value}\n".encode("utf-8"))
+    _hash_inputs(h, side_inputs(pre, side))
+    return h.hexdigest()
+
+def _stamp_path(workdir: Path) -> Path:
+    return workdir / STAMP_NAME
+
+def _read_stamp(workdir: Path) -> Optional[dict]:
+    try:
+        with open(_stamp_path(workdir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def run_preprocess_side(
+    pre: Preprocess,
+    side: str,
+    use_cache: bool = True,
+    cancel: CancelToken = None,
+    base_env: Optional[dict] = None
+) -> subprocess.CompletedProcess:
+    """
+    Runs one side ("baseline" or "candidate") of a preprocess step, unless the
+    fingerprint matches the stamp left by the last successful run. A side that
+    declares no inputs is always run: nothing tells whether its sources changed.
+    The step's `env` is applied to `base_env` (default: os.environ).
+    """
+    workdir = Path(pre.base_path if side == "baseline" else pre.cand_path)
+    command = pre.baseline_command if side == "baseline" else pre.candidate_command
+    digest = fingerprint(pre, side)
+
+    if use_cache and side_inputs(pre, side):
+        stamp = _read_stamp(workdir)
+        if stamp and stamp.get("fingerprint") == digest:
+            return subprocess.CompletedProcess(args="(cached)", returncode=0, stdout="", stderr="")
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    stamp_file = _stamp_path(workdir)
+    if stamp_file.exists():
+        stamp_file.unlink() # Invalidate before rebuilding
+
+    env = dict(base_env) if base_env is not None else os.environ.copy()
+    if pre.env:
+        env.update(pre.env)
+    result = run_command(command, workdir, env, cancel=cancel)
+
+    if result.returncode == 0:
+        with open(stamp_file, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": digest, "command": command}, f)
+    return result
+
+def run_preprocesses(
+    preprocesses: List[Preprocess],
+    run_baseline: bool = True,
+    run_candidate: bool = True,
+    use_cache: bool = True,
+    cancel: CancelToken = None,
+    probe=None,
+    base_env: Optional[dict] = None
+) -> Dict[int, Tuple[subprocess.CompletedProcess, subprocess.CompletedProcess]]:
+    """
+    Runs every preprocess step once per requested version, all sides in parallel.
+
+    Returns {id(preprocess): (baseline_result, candidate_result)}.
+    """
+    sides = [s for s, enabled in (("baseline", run_baseline), ("candidate", run_candidate)) if enabled]
+    results: Dict[Tuple[int, str], subprocess.CompletedProcess] = {}
+
+    def work(pre, side):
+        phase = probe.phase(f"preprocess:{side}", pre.name) if probe is not None else nullcontext()
+        try:
+            with phase:
+                results[(id(pre), side)] = run_preprocess_side(pre, side, use_cache, cancel, base_env)
+        except Exception as e:
+            results[(id(pre), side)] = subprocess.CompletedProcess(args=f"({side} preprocess)", returncode=1, stdout="", stderr=str(e))
+
+    threads = [
+        threading.Thread(target=work, args=(pre, side), name=f"regressionx-{pre.name}-{side}")
+        for pre in preprocesses for side in sides
+    ]
+    started = []
+    try:
+        for thread in threads:
+            thread.start()
+            started.append(thread)
+        for thread in started:
+            thread.join()
+    except BaseException:
+        # e.g. KeyboardInterrupt: the commands run in their own process groups, kill them
+        if cancel is not None:
+            cancel.cancel("interrupted")
+        for thread in started:
+            thread.join()
+        raise
+
+    return {
+        id(pre): (
+            results.get((id(pre), "baseline"), skipped_result()),
+            results.get((id(pre), "candidate"), skipped_result()),
+        )
+        for pre in preprocesses
+    }
@@ -1,3 +1,4 @@
+from .comparator import ComparatorResult
 from .domain import Case
 
 class MarkdownReporter:
@@ -5,69 +6,160 @@ class MarkdownReporter:
         self.filename = filename
         self.results = []
 
-    def add_result(self, case: Case, base_res, cand_res, cmp_result):
+    def add_result(self, case: Case, base_res, cand_res, cmp_result, flakiness=None):
         """
         Adds a result to the report.
         Arg types are flexible to allow for both real and mock objects.
+        `flakiness` is an optional FlakinessResult from --rerun-failures.
         """
+        status = "PASSED" if cmp_result.match else "FAILED"
+        if status == "PASSED" and getattr(cmp_result, "sampled", False) is True:
+            status = "SAMPLED PASS"
+        if status == "FAILED" and flakiness is not None and flakiness.verdict == "FLAKY":
+            status = "FLAKY"
         self.results.append({
             "case": case,
             "base": base_res,
             "cand": cand_res,
-            "diff": cmp_result
+            "diff": cmp_result,
+            "status": status,
+            "flakiness": flakiness
         })
 
+    def add_skipped(self, case: Case, reason: str = ""):
+        """
+        Records a case that was not run (or was aborted), e.g. after fail-fast.
+        """
+        self.results.append({
+            "case": case,
+            "base": None,
+            "cand": None,
+            "diff": None,
+            "status": "SKIPPED",
+            "reason": reason
+        })
+
+    @staticmethod
+    def _render_detail(detail):
+        lines = [f"  - `{detail.path}`: {detail.summary()}"]
+        if detail.excerpt:
+            lines.append("")
+            lines.append("    ```diff")
+            lines.extend(f"    {line}" for line in detail.excerpt)
+            if detail.truncated:
+                lines.append("    ... (truncated)")
+            lines.append("    ```")
+            lines.append("")
+        return lines
+
+    @staticmethod
+    def _render_flakiness(flakiness):
+        lines = [
+            f"- [Rerun] {flakiness.verdict}: passed {flakiness.passed}/{flakiness.attempts} attempts",
+            "",
+            "  | Difference | Occurred |",
+            "  | :--- | :--- |",
+        ]
+        for entry, count in flakiness.stability():
+            lines.append(f"  | {entry} | {count}/{flakiness.attempts} |")
+        lines.append("")
+        return lines
+
+    @staticmethod
+    def _render_overflow(diff):
+        """
+        Counts and groups for differences beyond the listed examples.
+        """
+        if not isinstance(diff, ComparatorResult) or not diff.truncated:
+            return []
+        lines = []
+        if diff.omitted_errors:
+            lines.append(f"- [Struct] ... and {diff.omitted_errors} more ({diff.error_count} total)")
+        if diff.omitted_diffs:
+            lines.append(f"- [Content] ... and {diff.omitted_diffs} more ({diff.diff_count} total)")
+        lines.extend([
+            "",
+            "  | Difference | Group | Files |",
+            "  | :--- | :--- | :--- |",
+        ])
+        for kind, group, count in diff.group_summary():
+            lines.append(f"  | {kind.value} | `{group}` | {count} |")
+        lines.append("")
+        return lines
+
     def generate(self):
         """
         Generates the Markdown report.
         """
         total = len(self.results)
-        passed = sum(1 for r in self.results if r["diff"].match)
-        failed = total - passed
-        
+        passed = sum(1 for r in self.results if r["status"] in ("PASSED", "SAMPLED PASS"))
+        sampled = sum(1 for r in self.results if r["status"] == "SAMPLED PASS")
+        skipped = sum(1 for r in self.results if r["status"] == "SKIPPED")
+        flaky = sum(1 for r in self.results if r["status"] == "FLAKY")
+        failed = total - passed - skipped - flaky
+
+        counts = f"**Total:** {total} | **Passed:** {passed} | **Failed:** {failed}"
+        if sampled:
+            counts += f" | **Sampled:** {sampled}"
+        if flaky:
+            counts += f" | **Flaky:** {flaky}"
+        if skipped:
+            counts += f" | **Skipped:** {skipped}"
+
         md = [
             "# RegressionX Report",
             "",
-            f"**Total:** {total} | **Passed:** {passed} | **Failed:** {failed}",
+            counts,
             "",
             "## Summary",
             "| Case | Status |",
             "| :--- | :--- |"
         ]
-        
+
         # Summary Table
         for r in self.results:
             case = r["case"]
-            diff = r["diff"]
-            status_text = "PASSED" if diff.match else "FAILED"
-            md.append(f"| {case.name} | {status_text} |")
-            
+            md.append(f"| {case.name} | {r['status']} |")
+
         md.append("")
         md.append("## Failure Details")
-        
+
         has_failures = False
         for r in self.results:
             case = r["case"]
             diff = r["diff"]
-            
-            if not diff.match:
+
+            if r["status"] in ("FAILED", "FLAKY"):
                 has_failures = True
                 md.append(f"### {case.name}")
-                
+                if r.get("flakiness") is not None:
+                    md.extend(self._render_flakiness(r["flakiness"]))
+
                 for err in diff.errors:
                     md.append(f"- [Struct] {err}")
                 for d in diff.diffs:
                     md.append(f"- [Content] {d}")
-                    
+                md.extend(self._render_overflow(diff))
+                for detail in getattr(diff, "details", {}).values():
+                    md.extend(self._render_detail(detail))
+
                 # Also check execution errors
                 if r["base"].returncode != 0:
                      md.append(f"- [Exec] Baseline Failed: RG={r['base'].returncode}")
                 if r["cand"].returncode != 0:
                      md.append(f"- [Exec] Candidate Failed: RG={r['cand'].returncode}")
                 md.append("")
-                
+
         if not has_failures:
             md.append("No failures detected.")
-        
+
+        if skipped:
+            md.append("")
+            md.append("## Skipped")
+            for r in self.results:
+                if r["status"] == "SKIPPED":
+                    reason = f": {r['reason']}" if r["reason"] else ""
+                    md.append(f"- {r['case'].name}{reason}")
+
         with open(self.filename, "w", encoding="utf-8") as f:
             f.write("\n".join(md))
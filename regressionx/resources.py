@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .domain import Case
+from .scratch import parse_size
+
+# PSI "some avg10" percentages above which no new work is started
+DEFAULT_CPU_PRESSURE_LIMIT = 40.0
+DEFAULT_MEMORY_PRESSURE_LIMIT = 10.0
+
+def _read_meminfo() -> Dict[str, int]:
+    """
+    /proc/meminfo as bytes by field name; empty where unavailable.
+    """
+    info = {}
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                parts = value.split()
+                if parts:
+                    info[key] = int(parts[0]) * (1024 if parts[1:] == ["kB"] else 1)
+    except (OSError, ValueError):
+        pass
+    return info
+
+def host_memory() -> Optional[int]:
+    return _read_meminfo().get("MemTotal")
+
+def read_pressure(resource: str) -> Optional[float]:
+    """
+    The "some avg10" value of /proc/pressure/<resource>, or None without PSI.
+    """
+    try:
+        with open(f"/proc/pressure/{resource}", encoding="ascii") as f:
+            for line in f:
+                fields = line.split()
+                if fields and fields[0] == "some":
+                    for item in fields[1:]:
+                        key, _, value = item.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        pass
+    return None
+
+@dataclass
+class HostLoad:
+    loadavg: Optional[float] = None       # 1-minute load average
+    mem_available: Optional[int] = None   # Bytes
+    cpu_pressure: Optional[float] = None  # PSI some avg10, percent
+    memory_pressure: Optional[float] = None
+
+class HostMonitor:
+    """
+    Samples load average, available memory and PSI, at most once per `min_interval` seconds.
+    """
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._sampled_at = None
+        self._last = HostLoad()
+
+    def sample(self) -> HostLoad:
+        now = time.monotonic()
+        if self._sampled_at is None or now - self._sampled_at >= self.min_interval:
+            try:
+                loadavg = os.getloadavg()[0]
+            except (AttributeError, OSError):
+                loadavg = None
+            self._last = HostLoad(
+                loadavg=loadavg,
+                mem_available=_read_meminfo().get("MemAvailable"),
+                cpu_pressure=read_pressure("cpu"),
+                memory_pressure=read_pressure("memory"),
+            )
+            self._sampled_at = now
+        return self._last
+
+
+def check_hints(cases: List[Case]):
+    """
+    Raises ValueError naming the first case whose `cores`/`memory` hint is
+    malformed, so it is reported when the config is loaded rather than by
+    the scheduler mid-run.
+    """
+    for case in cases:
+        cores = getattr(case, "cores", None)
+        if cores is not None and (isinstance(cores, bool) or not isinstance(cores, (int, float)) or cores <= 0):
+            raise ValueError(f"Case '{case.name}': cores must be a positive number, got {cores!r}")
+        memory = getattr(case, "memory", None)
+        if memory is not None:
+            try:
+                parse_size(memory)
+            except ValueError as e:
+                raise ValueError(f"Case '{case.name}': invalid memory hint: {e}") from None
+
+
+class ResourceAdmission:
+    """
+    Admission controller that bin-packs cases onto the host by their
+    `cores`/`memory` hints (1 core and no memory by default).
+
+    A case is admitted only if its cores fit next to the larger of the cores
+    reserved by running cases and the load average, its memory fits in both
+    the unreserved capacity and MemAvailable, and neither CPU nor memory PSI
+    pressure is above its limit. The host is re-sampled whenever the
+    scheduler re-asks, so the run backs off while the box is saturated and
+    ramps up again as it frees up.
+    """
+    def __init__(
+        self,
+        cores: Optional[float] = None,
+        memory: Optional[int] = None,
+        monitor: Optional[HostMonitor] = None,
+        cpu_pressure_limit: float = DEFAULT_CPU_PRESSURE_LIMIT,
+        memory_pressure_limit: float = DEFAULT_MEMORY_PRESSURE_LIMIT
+    ):
+        self.cores = cores or os.cpu_count() or 1
+        self.memory = memory if memory is not None else host_memory()
+        self.monitor = monitor if monitor is not None else HostMonitor()
+        self.cpu_pressure_limit = cpu_pressure_limit
+        self.memory_pressure_limit = memory_pressure_limit
+        self._lock = threading.Lock()
+        self._reserved: Dict[int, Tuple[float, int]] = {}
+
+    @staticmethod
+    def demand(case) -> Tuple[float, int]:
+        cores = getattr(case, "cores", None) or 1
+        memory = getattr(case, "memory", None)
+        return cores, parse_size(memory) if memory else 0
+
+    def _reserved_totals(self) -> Tuple[float, int]:
+        return (sum(c for c, _ in self._reserved.values()), sum(m for _, m in self._reserved.values()))
+
+    def _saturated(self, load: HostLoad) -> bool:
+        return (
+            (load.cpu_pressure is not None and load.cpu_pressure > self.cpu_pressure_limit) or
+            (load.memory_pressure is not None and load.memory_pressure > self.memory_pressure_limit)
+        )
+
+    def try_acquire(self, case) -> bool:
+        cores, memory = self.demand(case)
+        with self._lock:
+            load = self.monitor.sample()
+            if self._saturated(load):
+                return False
+            used_cores, used_memory = self._reserved_totals()
+            if max(used_cores, load.loadavg or 0.0) + cores > self.cores:
+                return False
+            if memory:
+                free = self.memory - used_memory if self.memory is not None else None
+                if load.mem_available is not None:
+                    free = load.mem_available if free is None else min(free, load.mem_available)
+                if free is not None and memory > free:
+                    return False
+            self._reserved[id(case)] = (cores, memory)
+            return True
+
+    def force_acquire(self, case) -> bool:
+        with self._lock:
+            self._reserved[id(case)] = self.demand(case)
+            return True
+
+    def release(self, case):
+        with self._lock:
+            self._reserved.pop(id(case), None)
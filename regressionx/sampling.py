@@ -0,0 +1,95 @@
+import hashlib
+import math
+import random
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .diagnostics import MismatchDetail
+
+# Bytes read at each sampled offset
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+DEFAULT_SAMPLE_FRACTION = 0.01
+
+def sample_offsets(size: int, fraction: float, rel: str = "", block_size: int = SAMPLE_BLOCK_SIZE) -> List[int]:
+    """
+    Offsets of the blocks to read from a file of `size` bytes: the head, the
+    tail, and enough pseudo-random blocks to cover about `fraction` of it.
+
+    The random blocks are seeded from `rel` and `size`, so both sides of a
+    comparison (and repeated runs) read the same blocks.
+    """
+    if size <= 0:
+        return []
+    blocks = math.ceil(size / block_size)
+    chosen = {0, blocks - 1}
+    wanted = min(blocks, max(len(chosen), math.ceil(blocks * fraction)))
+    if wanted > len(chosen):
+        seed = int.from_bytes(hashlib.sha256(f"{rel}\0{size}".encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        chosen.update(rng.sample(range(1, blocks - 1), wanted - len(chosen)))
+    return [b * block_size for b in sorted(chosen)]
+
+def _sample_digest(path: Path, offsets: List[int], block_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+def sampled_equal(
+    path_a: Path,
+    path_b: Path,
+    fraction: float,
+    rel: str = "",
+    block_size: int = SAMPLE_BLOCK_SIZE
+) -> Tuple[bool, int]:
+    """
+    Compares sizes, then digests of the sampled blocks of both files.
+    Returns (equal, bytes_sampled).
+    """
+    size_a = Path(path_a).stat().st_size
+    if size_a != Path(path_b).stat().st_size:
+        return False, 0
+    offsets = sample_offsets(size_a, fraction, rel, block_size)
+    sampled = sum(min(block_size, size_a - offset) for offset in offsets)
+    equal = _sample_digest(path_a, offsets, block_size) == _sample_digest(path_b, offsets, block_size)
+    return equal, sampled
+
+def diagnose_sampled(
+    path_a: Path,
+    path_b: Path,
+    fraction: float,
+    rel: str = "",
+    block_size: int = SAMPLE_BLOCK_SIZE
+) -> MismatchDetail:
+    """
+    A diagnosis that reads no more than sampled_equal did: the size delta
+    and, for equally sized files, the first differing byte of the first
+    differing sampled block. No excerpt is attached.
+    """
+    detail = MismatchDetail(
+        path=rel,
+        base_size=Path(path_a).stat().st_size,
+        cand_size=Path(path_b).stat().st_size,
+        sampled=True
+    )
+    if detail.base_size != detail.cand_size:
+        return detail
+    with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+        for offset in sample_offsets(detail.base_size, fraction, rel, block_size):
+            fa.seek(offset)
+            fb.seek(offset)
+            block_a = fa.read(block_size)
+            block_b = fb.read(block_size)
+            if block_a != block_b:
+                detail.first_diff_offset = offset + _first_differing_byte(block_a, block_b)
+                break
+    return detail
+
+def _first_differing_byte(block_a: bytes, block_b: bytes) -> int:
+    for i, (a, b) in enumerate(zip(block_a, block_b)):
+        if a != b:
+            return i
+    return min(len(block_a), len(block_b))
@@ -0,0 +1,139 @@
+import contextvars
+import threading
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from .executor import CancelToken
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Times a pending item may be overtaken before later items are held back for it
+DEFAULT_MAX_BYPASS = 16
+
+class Scheduler:
+    """
+    Runs a function over a sequence of items with bounded concurrency.
+
+    Items are started in order, at most `jobs` at a time (but see first-fit
+    below when admission controllers are used). Once the cancel
+    token fires no further items are started; their result slots stay None.
+
+    `admission` is an optional list of controllers with
+    `try_acquire(item) -> bool`, `force_acquire(item)` and `release(item)`
+    (see ScratchBudget). An item only starts once every controller admits it;
+    controllers are re-asked whenever an item finishes and at least every
+    `poll_interval` seconds. An item is always admitted when nothing else is
+    running, so an oversized item cannot stall the run.
+
+    When the oldest pending item is not admitted, later items that are
+    admitted start first (first-fit), so one large item does not leave the
+    host idle. An item overtaken `max_bypass` times holds back every later
+    item until it has started, so large items are not starved.
+    """
+    def __init__(
+        self,
+        jobs: int = 1,
+        cancel: Optional[CancelToken] = None,
+        admission: Optional[list] = None,
+        poll_interval: float = 1.0,
+        max_bypass: int = DEFAULT_MAX_BYPASS
+    ):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+        self.jobs = jobs
+        self.cancel = cancel or CancelToken()
+        self.admission = list(admission or [])
+        self.poll_interval = poll_interval
+        self.max_bypass = max_bypass
+        self._cond = threading.Condition()
+        self._running = 0
+
+    def _try_admit(self, item) -> bool:
+        acquired = []
+        for controller in self.admission:
+            if controller.try_acquire(item) or (self._running == 0 and controller.force_acquire(item)):
+                acquired.append(controller)
+                continue
+            for done in reversed(acquired):
+                done.release(item)
+            return False
+        return True
+
+    def _pick(self, items, pending: List[int], bypassed: List[int]) -> Optional[int]:
+        """
+        Admits the first pending item that fits and returns its position in
+        `pending`, or None if none can start now.
+        """
+        if self._running >= self.jobs:
+            return None
+        for position, index in enumerate(pending):
+            if self._try_admit(items[index]):
+                for skipped in pending[:position]:
+                    bypassed[skipped] += 1
+                return position
+            if bypassed[index] >= self.max_bypass:
+                return None
+        return None
+
+    def _release(self, item):
+        for controller in reversed(self.admission):
+            controller.release(item)
+
+    def _worker(self, fn, item, index, results):
+        try:
+            results[index] = fn(item)
+        finally:
+            with self._cond:
+                self._release(item)
+                self._running -= 1
+                self._cond.notify_all()
+
+    def run(self, items: Sequence[T], fn: Callable[[T], R]) -> List[Optional[R]]:
+        """
+        Calls `fn(item)` for each item and returns the results in item order.
+        `fn` is expected to handle its own exceptions.
+        """
+        results: List[Optional[R]] = [None] * len(items)
+        threads = []
+        timeout = self.poll_interval if self.admission else None
+        pending = list(range(len(items)))
+        bypassed = [0] * len(items)
+        try:
+            while pending:
+                with self._cond:
+                    while not self.cancel.cancelled:
+                        position = self._pick(items, pending, bypassed)
+                        if position is not None:
+                            break
+                        self._cond.wait(timeout)
+                    if self.cancel.cancelled:
+                        break
+                    self._running += 1
+                index = pending.pop(position)
+                item = items[index]
+                # Workers inherit the caller's context (e.g. the daemon's output routing)
+                context = contextvars.copy_context()
+                thread = threading.Thread(
+                    target=context.run,
+                    args=(self._worker, fn, item, index, results),
+                    name=f"regressionx-worker-{index}"
+                )
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+        except BaseException:
+            # e.g. KeyboardInterrupt: kill in-flight cases before unwinding
+            self.stop("interrupted")
+            for thread in threads:
+                thread.join()
+            raise
+        return results
+
+    def stop(self, reason: str = "cancelled"):
+        """
+        Stops scheduling new items and kills in-flight commands.
+        """
+        with self._cond:
+            self.cancel.cancel(reason)
+            self._cond.notify_all()
@@ -0,0 +1,166 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .domain import Case
+from .flaky import scratch_case
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def parse_size(text: str) -> int:
+    """
+    Parses sizes like "512M", "10G" or "1048576" into bytes.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+def tree_size(path: Path) -> int:
+    """
+    Total size in bytes of the regular files under `path`.
+    """
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ScratchBudget:
+    """
+    Admission controller that keeps the scratch root within a size budget.
+
+    The footprint of a case is unknown until it has run, so each running case
+    reserves the largest footprint observed so far (or `initial_estimate`),
+    and reservations of running cases grow when a larger one is observed.
+    Until any footprint is known, cases are admitted one at a time. With
+    `root`, its measured usage also counts, so cases that outgrow their
+    reservation while running hold back further admissions.
+    """
+    def __init__(
+        self,
+        budget: int,
+        initial_estimate: Optional[int] = None,
+        root: Optional[Path] = None,
+        measure_interval: float = 1.0
+    ):
+        self.budget = budget
+        self.estimate = initial_estimate
+        self.root = Path(root) if root is not None else None
+        self.measure_interval = measure_interval
+        self._lock = threading.Lock()
+        self._reserved: Dict[int, int] = {}
+        self._measured_at = None
+        self._measured = 0
+
+    @property
+    def reserved(self) -> int:
+        with self._lock:
+            return sum(self._reserved.values())
+
+    def _usage(self) -> int:
+        used = sum(self._reserved.values())
+        if self.root is None:
+            return used
+        now = time.monotonic()
+        if self._measured_at is None or now - self._measured_at >= self.measure_interval:
+            self._measured = tree_size(self.root) if self.root.exists() else 0
+            self._measured_at = now
+        return max(used, self._measured)
+
+    def try_acquire(self, case) -> bool:
+        with self._lock:
+            if self.estimate is None:
+                if self._reserved:
+                    return False
+                self._reserved[id(case)] = 0
+                return True
+            if self._usage() + self.estimate > self.budget:
+                return False
+            self._reserved[id(case)] = self.estimate
+            return True
+
+    def force_acquire(self, case) -> bool:
+        with self._lock:
+            self._reserved[id(case)] = self.estimate or 0
+            return True
+
+    def release(self, case):
+        with self._lock:
+            self._reserved.pop(id(case), None)
+
+    def observe(self, footprint: int):
+        """
+        Records the measured scratch footprint of a finished case.
+        """
+        with self._lock:
+            self.estimate = max(self.estimate or 0, footprint)
+            for key, reserved in self._reserved.items():
+                self._reserved[key] = max(reserved, self.estimate)
+
+
+def _replace_tree(src: Path, dst: Path):
+    """
+    Copies `src` next to `dst`, then swaps it in, so `dst` holds either the
+    old tree or the complete new one.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{dst.name}-", dir=str(dst.parent)))
+    try:
+        shutil.copytree(src, staging, dirs_exist_ok=True)
+        if dst.is_dir() and not dst.is_symlink():
+            old = Path(tempfile.mkdtemp(prefix=f".{dst.name}-old-", dir=str(dst.parent)))
+            os.replace(dst, old / dst.name)
+            os.replace(staging, dst)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            if dst.exists() or dst.is_symlink():
+                dst.unlink()
+            os.replace(staging, dst)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+class ScratchRun:
+    """
+    Runs one case in a private directory under the scratch root and, when
+    asked, copies its outputs to the configured base_path/cand_path.
+    """
+    def __init__(self, case: Case, scratch_root: Path, run_baseline: bool, run_candidate: bool):
+        self.case = case
+        self.run_baseline = run_baseline
+        self.run_candidate = run_candidate
+        Path(scratch_root).mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", case.name)[:64]
+        self.root = Path(tempfile.mkdtemp(prefix=f"{safe_name}-", dir=str(scratch_root)))
+        self.scratch = scratch_case(case, self.root, run_baseline, run_candidate)
+
+    def footprint(self) -> int:
+        return tree_size(self.root)
+
+    def persist(self):
+        """
+        Copies the executed sides from scratch to their configured paths,
+        replacing what is there so no stale files of earlier runs remain.
+        """
+        for enabled, src, dst in (
+            (self.run_baseline, self.scratch.base_path, self.case.base_path),
+            (self.run_candidate, self.scratch.cand_path, self.case.cand_path),
+        ):
+            if enabled and Path(src).exists():
+                _replace_tree(Path(src), Path(dst))
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,102 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, ExitStack
+from typing import List, Optional
+
+class Tracer:
+    """
+    Records phase spans in the Chrome trace-event format.
+
+    The resulting file can be opened in Perfetto (ui.perfetto.dev) or
+    chrome://tracing. Each worker thread is shown as its own track.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads = {}
+        self.events: List[dict] = []
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _register_thread(self, tid: int):
+        if tid not in self._threads:
+            name = threading.current_thread().name
+            self._threads[tid] = name
+            self.events.append({
+                "name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                "args": {"name": name},
+            })
+
+    @contextmanager
+    def phase(self, name: str, case_name: Optional[str] = None):
+        """
+        Records the enclosed block as a complete ("X") event.
+        """
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            end = self._now_us()
+            tid = threading.get_ident()
+            event = {
+                "name": name, "cat": "regressionx", "ph": "X",
+                "ts": start, "dur": end - start,
+                "pid": self._pid, "tid": tid,
+            }
+            if case_name is not None:
+                event["args"] = {"case": case_name}
+            with self._lock:
+                self._register_thread(tid)
+                self.events.append(event)
+
+    def write(self, path: str):
+        with self._lock:
+            data = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+class Profiler:
+    """
+    Wraps selected sections (comparison, reporting) in a single cProfile session.
+
+    Only one cProfile profiler can be active at a time, so sections are
+    serialised while profiling is enabled.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._profile = cProfile.Profile()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def section(self):
+        with self._lock:
+            self._profile.enable()
+            try:
+                yield
+            finally:
+                self._profile.disable()
+
+    def write(self):
+        self._profile.dump_stats(self.path)
+
+
+class ProbeSet:
+    """
+    Fans a `phase(name, case_name)` call out to several probes
+    (e.g. RunMetrics and Tracer) at once.
+    """
+    def __init__(self, *probes):
+        self.probes = [p for p in probes if p is not None]
+
+    @contextmanager
+    def phase(self, name: str, case_name: Optional[str] = None):
+        with ExitStack() as stack:
+            for probe in self.probes:
+                stack.enter_context(probe.phase(name, case_name))
+            yield
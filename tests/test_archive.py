@@ -0,0 +1,96 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+import time
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.archive import ArchiveStats, ChunkStore
+from regressionx.comparator import compare_directories
+
+class TestChunkStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.base = self.test_dir / "base"
+        self.cand = self.test_dir / "cand"
+        for root in (self.base, self.cand):
+            (root / "sub").mkdir(parents=True)
+            (root / "sub" / "same.bin").write_bytes(b"x" * 100)
+            (root / "empty").mkdir()
+        (self.base / "out.txt").write_text("old\n")
+        (self.cand / "out.txt").write_text("new\n")
+        self.store = ChunkStore(self.test_dir / "store", chunk_size=16)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_identical_content_is_stored_once(self):
+        stats = ArchiveStats()
+        self.store.put_trees([self.base, self.cand], jobs=2, stats=stats)
+
+        self.assertEqual(stats.files, 4)
+        # 100 bytes of "x" in 16-byte chunks: two distinct chunks, plus "old\n" and "new\n"
+        self.assertEqual(stats.new_chunks, 4)
+
+    def test_unchanged_files_are_not_read_again(self):
+        self.store.put_trees([self.base], stats=ArchiveStats())
+        self.store.save_stat_cache()
+
+        stats = ArchiveStats()
+        ChunkStore(self.store.root, chunk_size=16).put_trees([self.base], stats=stats)
+
+        self.assertEqual(stats.unchanged_files, 2)
+        self.assertEqual(stats.new_chunks, 0)
+
+    def test_restore_round_trip(self):
+        base_tree, cand_tree = self.store.put_trees([self.base, self.cand])
+        self.store.write_index("night-1", {"c": {"baseline": base_tree, "candidate": cand_tree}})
+
+        index = self.store.load_index("night-1")
+        restored = self.test_dir / "restored"
+        self.store.restore_tree(index["cases"]["c"]["baseline"], restored)
+
+        self.assertTrue(compare_directories(self.base, restored).match)
+        self.assertTrue((restored / "empty").is_dir())
+        self.assertEqual(self.store.runs(), ["night-1"])
+
+    def test_single_file_and_missing_outputs(self):
+        file_tree, missing = self.store.put_trees([self.base / "out.txt", self.test_dir / "nope"])
+        self.assertIsNone(missing)
+
+        self.store.restore_tree(file_tree, self.test_dir / "copy.txt")
+        self.assertEqual((self.test_dir / "copy.txt").read_text(), "old\n")
+
+    def test_concurrent_writers_create_a_chunk_once(self):
+        import threading
+        stats = ArchiveStats()
+        barrier = threading.Barrier(8)
+
+        def put():
+            barrier.wait()
+            self.store.put_chunk(b"shared", stats)
+
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(stats.new_chunks, 1)
+        digest = self.store.put_chunk(b"shared")
+        self.assertEqual(self.store.get_chunk(digest), b"shared")
+        # No temporary files are left behind
+        self.assertEqual(os.listdir(self.store._chunk_path(digest).parent), [digest])
+
+    def test_latest_run_is_the_last_written(self):
+        for run_id in ("nightly-9", "nightly-10"):
+            self.store.write_index(run_id, {})
+            time.sleep(0.01)
+        self.assertEqual(self.store.runs(), ["nightly-9", "nightly-10"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
+import shutil
 import sys
 import os
+import tempfile
 
 # Ensure the root directory is in sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -18,6 +20,12 @@ class TestCLI(unittest.TestCase):
     def setUp(self):
         if cli is None:
             self.fail("Implementation Missing: regressionx.cli module not found")
+        # Never hand the mocked runs to a daemon that happens to listen on this machine
+        patcher = patch('regressionx.daemon.daemon_available', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
 
     def _make_case(self, name):
         return Case(
@@ -121,6 +129,283 @@ class TestCLI(unittest.TestCase):
         self.assertEqual(kwargs["run_baseline"], False)
         self.assertEqual(kwargs["run_candidate"], True)
 
+    @patch('regressionx.cli.run_case')
+    @patch('regressionx.cli.load_config')
+    @patch('regressionx.cli.compare_directories')
+    def test_metrics_file_written(self, mock_compare, mock_load, mock_run):
+        import json
+        mock_load.return_value = [self._make_case("c1")]
+        self._set_compare_ok(mock_compare)
+        mock_compare.return_value.files_compared = 3
+        mock_compare.return_value.bytes_compared = 30
+
+        metrics_path = os.path.join(self.work_dir, "metrics.json")
+        cli.main([
+            "compare", "--config", "dummy_config.py",
+            "--report", os.path.join(self.work_dir, "report.md"),
+            "--metrics", metrics_path
+        ])
+        with open(metrics_path, encoding="utf-8") as f:
+            snap = json.load(f)
+
+        self.assertEqual(snap["cases_passed"], 1)
+        self.assertEqual(snap["files_compared"], 3)
+        self.assertEqual(snap["bytes_compared"], 30)
+        self.assertIn("compare", snap["phase_seconds"])
+
+    @patch('regressionx.cli.run_case')
+    @patch('regressionx.cli.load_config')
+    @patch('regressionx.cli.compare_directories')
+    def test_trace_and_profile_written(self, mock_compare, mock_load, mock_run):
+        import json
+        mock_load.return_value = [self._make_case("c1")]
+        self._set_compare_ok(mock_compare)
+
+        trace_path = os.path.join(self.work_dir, "trace.json")
+        profile_path = os.path.join(self.work_dir, "run.prof")
+        cli.main([
+            "compare", "--config", "dummy_config.py",
+            "--report", os.path.join(self.work_dir, "report.md"),
+            "--trace", trace_path, "--profile", profile_path
+        ])
+        with open(trace_path, encoding="utf-8") as f:
+            events = json.load(f)["traceEvents"]
+        self.assertTrue(os.path.exists(profile_path))
+
+        names = {e["name"] for e in events if e["ph"] == "X"}
+        self.assertTrue({"load_config", "case", "compare", "report"} <= names)
+
+    @patch('regressionx.cli.run_case')
+    @patch('regressionx.cli.load_config')
+    @patch('regressionx.cli.compare_directories')
+    def test_fail_fast_skips_remaining_cases(self, mock_compare, mock_load, mock_run):
+        mock_load.return_value = [self._make_case("c1"), self._make_case("c2"), self._make_case("c3")]
+        mock_compare.return_value.match = False
+        mock_compare.return_value.errors = []
+        mock_compare.return_value.diffs = ["Content mismatch: out.txt"]
+
+        report_path = os.path.join(self.work_dir, "report.md")
+        with self.assertRaises(SystemExit) as cm:
+            cli.main(["compare", "--config", "dummy_config.py", "--report", report_path, "--fail-fast"])
+        with open(report_path, encoding="utf-8") as f:
+            content = f.read()
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertEqual(mock_compare.call_count, 1)
+        self.assertIn("| c1 | FAILED |", content)
+        self.assertIn("| c2 | SKIPPED |", content)
+        self.assertIn("| c3 | SKIPPED |", content)
+        self.assertIn("- c2: not run (failure limit reached)", content)
+
+    @patch('regressionx.cli.run_case')
+    @patch('regressionx.cli.load_config')
+    @patch('regressionx.cli.compare_directories')
+    def test_failed_preprocess_fails_dependent_cases(self, mock_compare, mock_load, mock_run):
+        from regressionx.domain import Preprocess
+
+        pre = Preprocess(
+            baseline_command="exit 0",
+            candidate_command="exit 4",
+            base_path=os.path.join(self.work_dir, "build_base"),
+            cand_path=os.path.join(self.work_dir, "build_cand")
+        )
+        cases = [self._make_case("c1"), self._make_case("c2")]
+        cases[0].preprocess = pre
+        mock_load.return_value = cases
+        mock_run.return_value = (
+            type('obj', (object,), {'returncode': 0}),
+            type('obj', (object,), {'returncode': 0}),
+            Path("/tmp/a"), Path("/tmp/b")
+        )
+        self._set_compare_ok(mock_compare)
+
+        report_path = os.path.join(self.work_dir, "report.md")
+        with self.assertRaises(SystemExit):
+            cli.main(["run", "--config", "dummy_config.py", "--report", report_path])
+        with open(report_path, encoding="utf-8") as f:
+            content = f.read()
+
+        # Only the case without the failing preprocess is executed
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertIn("| c1 | FAILED |", content)
+        self.assertIn("| c2 | PASSED |", content)
+        self.assertIn("Preprocess 'preprocess' Failed", content)
+
+    @patch('regressionx.cli.load_config')
+    def test_freeze_then_compare_against_manifests(self, mock_load):
+
+        case = Case(
+            name="c1",
+            baseline_command="echo A > out.txt",
+            candidate_command="echo B > out.txt",
+            base_path=os.path.join(self.work_dir, "base"),
+            cand_path=os.path.join(self.work_dir, "cand")
+        )
+        mock_load.return_value = [case]
+        manifests = os.path.join(self.work_dir, "manifests")
+        report_path = os.path.join(self.work_dir, "report.md")
+
+        with self.assertRaises(SystemExit):
+            # No candidate output yet, so this comparison fails
+            cli.main(["run_base", "--config", "dummy_config.py", "--report", report_path])
+        cli.main(["freeze", "--config", "dummy_config.py", "--manifests", manifests])
+        shutil.rmtree(case.base_path)
+
+        with self.assertRaises(SystemExit) as cm:
+            cli.main(["run_cand", "--config", "dummy_config.py", "--report", report_path,
+                      "--manifests", manifests])
+        with open(report_path, encoding="utf-8") as f:
+            content = f.read()
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn("- [Content] Content mismatch: out.txt", content)
+
+    @patch('regressionx.cli.load_config')
+    def test_rerun_failures_classifies_flaky_and_consistent(self, mock_load):
+
+        counter = os.path.join(self.work_dir, "counter")
+        # Differs from the baseline only on its very first execution
+        flaky_cmd = (f"echo x >> {counter}; "
+                     f"if [ $(wc -l < {counter}) -eq 1 ]; then echo B; else echo A; fi > out.txt")
+        mock_load.return_value = [
+            Case(name="flaky", baseline_command="echo A > out.txt", candidate_command=flaky_cmd,
+                 base_path=os.path.join(self.work_dir, "f", "base"), cand_path=os.path.join(self.work_dir, "f", "cand")),
+            Case(name="broken", baseline_command="echo A > out.txt", candidate_command="echo B > out.txt",
+                 base_path=os.path.join(self.work_dir, "b", "base"), cand_path=os.path.join(self.work_dir, "b", "cand")),
+        ]
+        report_path = os.path.join(self.work_dir, "report.md")
+
+        with self.assertRaises(SystemExit):
+            cli.main(["run", "--config", "dummy_config.py", "--report", report_path,
+                      "--rerun-failures", "2", "--jobs", "2"])
+        with open(report_path, encoding="utf-8") as f:
+            content = f.read()
+
+        self.assertIn("| flaky | FLAKY |", content)
+        self.assertIn("| broken | FAILED |", content)
+        self.assertIn("- [Rerun] FLAKY: passed 2/3 attempts", content)
+        self.assertIn("| Content mismatch: out.txt | 3/3 |", content)
+
+    @patch('regressionx.cli.load_config')
+    def test_scratch_root_persists_only_failed_cases(self, mock_load):
+
+        mock_load.return_value = [
+            Case(name="same", baseline_command="echo A > out.txt", candidate_command="echo A > out.txt",
+                 base_path=os.path.join(self.work_dir, "s", "base"), cand_path=os.path.join(self.work_dir, "s", "cand")),
+            Case(name="diff", baseline_command="echo A > out.txt", candidate_command="echo B > out.txt",
+                 base_path=os.path.join(self.work_dir, "d", "base"), cand_path=os.path.join(self.work_dir, "d", "cand")),
+        ]
+        scratch_root = os.path.join(self.work_dir, "shm")
+
+        with self.assertRaises(SystemExit):
+            cli.main(["run", "--config", "dummy_config.py", "--report", os.path.join(self.work_dir, "report.md"),
+                      "--scratch-root", scratch_root, "--scratch-budget", "1M", "--jobs", "2"])
+
+        self.assertFalse(os.path.exists(os.path.join(self.work_dir, "s")))
+        with open(os.path.join(self.work_dir, "d", "cand", "out.txt")) as f:
+            self.assertEqual(f.read().strip(), "B")
+        self.assertEqual(os.listdir(scratch_root), [])
+
+    @patch('regressionx.cli.load_config')
+    def test_scratch_root_keeps_baseline_only_outputs(self, mock_load):
+        cand = os.path.join(self.work_dir, "cand")
+        os.makedirs(cand)
+        with open(os.path.join(cand, "out.txt"), "w") as f:
+            f.write("A\n")
+        mock_load.return_value = [
+            Case(name="same", baseline_command="echo A > out.txt", candidate_command="true",
+                 base_path=os.path.join(self.work_dir, "base"), cand_path=cand),
+        ]
+
+        cli.main(["run_base", "--config", "dummy_config.py", "--report", os.path.join(self.work_dir, "report.md"),
+                  "--scratch-root", os.path.join(self.work_dir, "shm")])
+
+        # The passing baseline is the reference for later runs, so it is not discarded
+        with open(os.path.join(self.work_dir, "base", "out.txt")) as f:
+            self.assertEqual(f.read().strip(), "A")
+
+    @patch('regressionx.cli.load_config')
+    def test_archive_then_compare_restored_outputs(self, mock_load):
+
+        case = Case(name="c", baseline_command="echo A > out.txt", candidate_command="echo B > out.txt",
+                    base_path=os.path.join(self.work_dir, "base"), cand_path=os.path.join(self.work_dir, "cand"))
+        mock_load.return_value = [case]
+        for path, text in ((case.base_path, "A\n"), (case.cand_path, "A\n")):
+            os.makedirs(path)
+            with open(os.path.join(path, "out.txt"), "w") as f:
+                f.write(text)
+        store = os.path.join(self.work_dir, "store")
+
+        with patch('sys.stdout', new_callable=MagicMock):
+            cli.main(["archive", "--config", "dummy_config.py", "--store", store, "--run", "n1"])
+        shutil.rmtree(case.base_path)
+        shutil.rmtree(case.cand_path)
+
+        # Both sides come from the archive; the configured paths are not recreated
+        with patch('sys.stdout', new_callable=MagicMock):
+            cli.main(["compare", "--config", "dummy_config.py", "--report", os.path.join(self.work_dir, "report.md"),
+                      "--from-archive", store])
+        self.assertFalse(os.path.exists(case.base_path))
+
+        # run_cand compares a fresh candidate against the archived baseline
+        with self.assertRaises(SystemExit):
+            cli.main(["run_cand", "--config", "dummy_config.py", "--report", os.path.join(self.work_dir, "report.md"),
+                      "--from-archive", store, "--archive-run", "n1"])
+
+    @patch('regressionx.cli.load_config')
+    def test_reruns_compare_against_the_archive(self, mock_load):
+
+        marker = os.path.join(self.work_dir, "marker")
+        # Fails on the first attempt only
+        flaky = f"if [ -f {marker} ]; then echo A > out.txt; else touch {marker}; echo B > out.txt; fi"
+        case = Case(name="c", baseline_command="echo A > out.txt", candidate_command=flaky,
+                    base_path=os.path.join(self.work_dir, "base"), cand_path=os.path.join(self.work_dir, "cand"))
+        mock_load.return_value = [case]
+        os.makedirs(case.base_path)
+        with open(os.path.join(case.base_path, "out.txt"), "w") as f:
+            f.write("A\n")
+        store = os.path.join(self.work_dir, "store")
+        report = os.path.join(self.work_dir, "report.md")
+
+        with patch('sys.stdout', new_callable=MagicMock):
+            cli.main(["archive", "--config", "dummy_config.py", "--store", store])
+        shutil.rmtree(case.base_path)
+
+        with patch('sys.stdout', new_callable=MagicMock), self.assertRaises(SystemExit):
+            cli.main(["run_cand", "--config", "dummy_config.py", "--report", report,
+                      "--from-archive", store, "--rerun-failures", "2"])
+        with open(report) as f:
+            self.assertIn("FLAKY", f.read())
+
+    @patch('regressionx.cli.load_config')
+    def test_merkle_compare_persists_digests_next_to_outputs(self, mock_load):
+
+        mock_load.return_value = [
+            Case(name="diff", baseline_command="echo A > out.txt", candidate_command="echo B > out.txt",
+                 base_path=os.path.join(self.work_dir, "base"), cand_path=os.path.join(self.work_dir, "cand")),
+        ]
+        report_path = os.path.join(self.work_dir, "report.md")
+
+        with self.assertRaises(SystemExit):
+            cli.main(["run", "--config", "dummy_config.py", "--report", report_path, "--merkle"])
+        with open(report_path, encoding="utf-8") as f:
+            content = f.read()
+
+        self.assertIn("- [Content] Content mismatch: out.txt", content)
+        self.assertTrue(os.path.exists(os.path.join(self.work_dir, "base.regressionx-merkle.json")))
+
+    @patch('sys.stderr', new_callable=MagicMock)
+    def test_manifests_rejected_when_running_baseline(self, mock_stderr):
+        with self.assertRaises(SystemExit) as cm:
+            cli.main(["run", "--config", "dummy_config.py", "--manifests", "/tmp/m"])
+        self.assertNotEqual(cm.exception.code, 0)
+
+    @patch('sys.stderr', new_callable=MagicMock)
+    def test_non_positive_metrics_interval_rejected(self, mock_stderr):
+        with self.assertRaises(SystemExit) as cm:
+            cli.main(["run", "--config", "dummy_config.py", "--metrics", "m.prom", "--metrics-interval", "0"])
+        self.assertEqual(cm.exception.code, 2)
+
     @patch('sys.stderr', new_callable=MagicMock)
     def test_missing_config_arg_prints_usage(self, mock_stderr):
         # Arrange
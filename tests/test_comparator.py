@@ -5,9 +5,10 @@ from pathlib import Path
 
 # We will implement this module next
 try:
-    from regressionx.comparator import compare_directories
+    from regressionx.comparator import compare_directories, IncrementalComparator
 except ImportError:
     compare_directories = None
+    IncrementalComparator = None
 
 class TestComparator(unittest.TestCase):
     def setUp(self):
@@ -88,5 +89,123 @@ class TestComparator(unittest.TestCase):
         self.assertFalse(result.match)
         self.assertIn("Only in baseline: missing.txt", result.errors)
 
+    def test_counts_compared_files_and_bytes(self):
+        self.create_file(self.dir_a, "f1.txt", "12345")
+        self.create_file(self.dir_b, "f1.txt", "12345")
+        self.create_file(self.dir_a, "sub/f2.txt", "abc")
+        self.create_file(self.dir_b, "sub/f2.txt", "abc")
+
+        result = compare_directories(self.dir_a, self.dir_b)
+
+        self.assertEqual(result.files_compared, 2)
+        self.assertEqual(result.bytes_compared, 8)
+
+    def test_incremental_compares_settled_files_only(self):
+        self.create_file(self.dir_a, "done.txt", "same")
+        self.create_file(self.dir_b, "done.txt", "same")
+        self.create_file(self.dir_a, "base_only.txt", "x")
+
+        watcher = IncrementalComparator(self.dir_a, self.dir_b, settle_seconds=0)
+        # First sighting only records signatures
+        self.assertEqual(watcher.poll(), 0)
+        self.assertEqual(watcher.poll(), 1)
+        self.assertEqual(watcher.poll(), 0)
+        self.assertTrue(watcher.compared["done.txt"][2])
+
+        # Work done by the polls is part of the final result; finish() does not redo it
+        result = watcher.finish()
+        self.assertEqual((result.files_compared, result.bytes_compared), (1, 4))
+
+    def test_incremental_finish_recompares_changed_files(self):
+        self.create_file(self.dir_a, "f1.txt", "same")
+        self.create_file(self.dir_b, "f1.txt", "same")
+
+        watcher = IncrementalComparator(self.dir_a, self.dir_b, settle_seconds=0)
+        watcher.poll()
+        watcher.poll()
+        self.create_file(self.dir_b, "f1.txt", "changed afterwards")
+
+        result = watcher.finish()
+        self.assertFalse(result.match)
+        self.assertIn("Content mismatch: f1.txt", result.diffs)
+
+    def test_precompared_verdict_is_reused_when_unchanged(self):
+        self.create_file(self.dir_a, "f1.txt", "content")
+        self.create_file(self.dir_b, "f1.txt", "content")
+        sig_a = ((self.dir_a / "f1.txt").stat().st_size, (self.dir_a / "f1.txt").stat().st_mtime_ns)
+        sig_b = ((self.dir_b / "f1.txt").stat().st_size, (self.dir_b / "f1.txt").stat().st_mtime_ns)
+
+        # A stale verdict for unchanged files is trusted as-is
+        result = compare_directories(self.dir_a, self.dir_b, precompared={"f1.txt": (sig_a, sig_b, False)})
+        self.assertFalse(result.match)
+
+    def test_reused_verdicts_are_not_counted_as_compared(self):
+        self.create_file(self.dir_a, "f1.txt", "content")
+        self.create_file(self.dir_b, "f1.txt", "content")
+        self.create_file(self.dir_a, "f2.txt", "abc")
+        self.create_file(self.dir_b, "f2.txt", "abc")
+        sig_a = ((self.dir_a / "f1.txt").stat().st_size, (self.dir_a / "f1.txt").stat().st_mtime_ns)
+        sig_b = ((self.dir_b / "f1.txt").stat().st_size, (self.dir_b / "f1.txt").stat().st_mtime_ns)
+
+        result = compare_directories(self.dir_a, self.dir_b, precompared={"f1.txt": (sig_a, sig_b, True)})
+
+        self.assertTrue(result.match)
+        self.assertEqual(result.files_compared, 1)
+        self.assertEqual(result.bytes_compared, 3)
+
+    def test_content_mismatch_is_diagnosed(self):
+        self.create_file(self.dir_a, "sub/f1.txt", "a\nb\nc\n")
+        self.create_file(self.dir_b, "sub/f1.txt", "a\nB\nc\n")
+
+        result = compare_directories(self.dir_a, self.dir_b)
+
+        detail = result.details[str(Path("sub") / "f1.txt")]
+        self.assertEqual(detail.first_diff_line, 2)
+        self.assertIn("+B", detail.excerpt)
+
+    def test_number_of_diagnosed_files_is_capped(self):
+        for i in range(5):
+            self.create_file(self.dir_a, f"f{i}.txt", "a")
+            self.create_file(self.dir_b, f"f{i}.txt", "b")
+
+        result = compare_directories(self.dir_a, self.dir_b, max_details=2)
+
+        self.assertEqual(len(result.diffs), 5)
+        self.assertEqual(len(result.details), 2)
+
+    def test_listed_differences_are_capped_but_counted_and_grouped(self):
+        from regressionx.comparator import DiffKind
+        for i in range(6):
+            self.create_file(self.dir_a, f"data/f{i}.csv", "a")
+            self.create_file(self.dir_b, f"data/f{i}.csv", "b")
+        for i in range(3):
+            self.create_file(self.dir_b, f"extra{i}.log", "x")
+
+        result = compare_directories(self.dir_a, self.dir_b, max_examples=2)
+
+        self.assertFalse(result.match)
+        self.assertEqual(len(result.diffs), 2)
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual((result.diff_count, result.error_count), (6, 3))
+        self.assertEqual((result.omitted_diffs, result.omitted_errors), (4, 1))
+        self.assertTrue(result.truncated)
+        self.assertEqual(result.counts[DiffKind.CONTENT_MISMATCH], 6)
+        self.assertEqual(result.group_summary(), [
+            (DiffKind.CONTENT_MISMATCH, "data/*.csv", 6),
+            (DiffKind.ONLY_IN_CANDIDATE, "./*.log", 3),
+        ])
+
+    def test_sampled_comparison_is_flagged_and_checks_sizes(self):
+        self.create_file(self.dir_a, "same.txt", "content")
+        self.create_file(self.dir_b, "same.txt", "content")
+        self.create_file(self.dir_a, "grown.txt", "a")
+        self.create_file(self.dir_b, "grown.txt", "ab")
+
+        result = compare_directories(self.dir_a, self.dir_b, sample_fraction=0.5)
+
+        self.assertTrue(result.sampled)
+        self.assertEqual(result.diffs, ["Content mismatch: grown.txt"])
+        self.assertEqual(result.files_compared, 2)
+
 if __name__ == "__main__":
     unittest.main()
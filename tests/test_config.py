@@ -42,5 +42,25 @@ class TestConfigLoader(unittest.TestCase):
             if os.path.exists(config_path):
                 os.unlink(config_path)
 
+    def test_malformed_resource_hint_names_the_case(self):
+        with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as f:
+            f.write(textwrap.dedent("""
+                from regressionx.domain import Case
+
+                cases = [
+                    Case(name="ok", baseline_command="a", candidate_command="b", base_path="a", cand_path="b",
+                         memory="2G"),
+                    Case(name="bad", baseline_command="a", candidate_command="b", base_path="a", cand_path="b",
+                         memory="lots"),
+                ]
+            """))
+            config_path = f.name
+        self.addCleanup(os.unlink, config_path)
+
+        with self.assertRaises(ValueError) as cm:
+            load_config(config_path)
+        self.assertIn("Case 'bad'", str(cm.exception))
+        self.assertIn("'lots'", str(cm.exception))
+
 if __name__ == "__main__":
     unittest.main()
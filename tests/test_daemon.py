@@ -0,0 +1,333 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import tempfile
+import shutil
+import threading
+import signal
+import subprocess
+import sys
+import os
+import time
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx import cli, daemon
+from regressionx.daemon import DaemonServer, DaemonState, FairShare, _ContextStream, daemon_available
+from regressionx.domain import Case
+
+class TestFairShare(unittest.TestCase):
+    def test_concurrent_requests_get_equal_shares(self):
+        fair = FairShare(slots=4)
+        first, second = fair.for_request("first"), fair.for_request("second")
+        a = [object() for _ in range(6)]
+        b = [object() for _ in range(2)]
+        fair.register("first")
+
+        self.assertTrue(all(first.try_acquire(item) for item in a[:3]))
+        fair.register("second")
+        # The first request already holds more than its half; the second gets the remaining slot
+        self.assertFalse(first.try_acquire(a[3]))
+        self.assertTrue(second.try_acquire(b[0]))
+        self.assertFalse(second.try_acquire(b[1]))
+
+        first.release(a[0])
+        first.release(a[1])
+        self.assertTrue(second.try_acquire(b[1]))
+        self.assertTrue(first.try_acquire(a[4]))
+
+        fair.unregister("second")
+        self.assertFalse(first.try_acquire(a[5]))
+
+class TestDaemonState(unittest.TestCase):
+    def test_requests_get_pools_of_their_own(self):
+        from regressionx.domain import PyCall
+        from regressionx.pool import run_pycall
+
+        state = DaemonState(slots=2)
+        work_dir = tempfile.mkdtemp()
+        try:
+            first, second = state.checkout_pools(1), state.checkout_pools(1)
+            self.assertIsNot(first, second)
+
+            # Cancelling one request terminates only its own pools
+            run_pycall(PyCall(target="os:getcwd"), "baseline", work_dir, {}, first)
+            first.terminate()
+            res = run_pycall(PyCall(target="os:getcwd"), "baseline", work_dir, {}, second)
+            self.assertEqual(res.returncode, 0)
+
+            # Pools checked back in are reused warm
+            state.checkin_pools(second)
+            self.assertIs(state.checkout_pools(1), second)
+            state.checkin_pools(second)
+        finally:
+            state.close()
+            shutil.rmtree(work_dir)
+
+    def test_pools_with_edited_sources_are_not_reused(self):
+        from regressionx.domain import PyCall
+        from regressionx.pool import run_pycall
+
+        state = DaemonState(slots=1)
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        self.addCleanup(state.close)
+        module = os.path.join(work_dir, "rx_edited_tool.py")
+        call = PyCall(target="rx_edited_tool:main", path=[work_dir])
+
+        with open(module, "w") as f:
+            f.write("def main():\n    print('old')\n")
+        pools = state.checkout_pools(1)
+        self.assertEqual(run_pycall(call, "candidate", work_dir, {}, pools).stdout, "old\n")
+        state.checkin_pools(pools)
+
+        with open(module, "w") as f:
+            f.write("def main():\n    print('new')\n")
+        os.utime(module, ns=(1, 1))
+        pools = state.checkout_pools(1)
+        self.assertEqual(run_pycall(call, "candidate", work_dir, {}, pools).stdout, "new\n")
+        state.checkin_pools(pools)
+
+class TestDaemonProcess(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.socket_path = os.path.join(self.work_dir, "d.sock")
+        with open(os.path.join(self.work_dir, "rx_warm_tool.py"), "w") as f:
+            f.write("def main():\n    print('hi')\n")
+        with open(os.path.join(self.work_dir, "suite.py"), "w") as f:
+            f.write(
+                "from regressionx.domain import Case, PyCall\n"
+                f"call = PyCall('rx_warm_tool:main', path=[{self.work_dir!r}])\n"
+                "cases = [Case(name='py', baseline_command=call, candidate_command=call,"
+                " base_path='base', cand_path='cand')]\n"
+            )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        self.env = dict(os.environ, PYTHONPATH=root)
+
+    def _regressionx(self, *args, **kwargs):
+        return subprocess.Popen([sys.executable, "-m", "regressionx", *args], cwd=self.work_dir, env=self.env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+
+    def test_sigterm_stops_a_daemon_holding_warm_pools(self):
+        server = self._regressionx("serve", "--socket", self.socket_path, "-j", "2")
+        self.addCleanup(server.kill)
+        deadline = time.monotonic() + 10
+        while daemon_available(self.socket_path) is None:
+            self.assertLess(time.monotonic(), deadline, "daemon did not start")
+            time.sleep(0.05)
+
+        client = self._regressionx("run", "--config", "suite.py", "--report", "r.md", "--socket", self.socket_path)
+        self.assertEqual(client.wait(30), 0)
+
+        server.send_signal(signal.SIGTERM)
+        self.assertEqual(server.wait(10), 0)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+class TestUnsupportedPlatform(unittest.TestCase):
+    def setUp(self):
+        # Simulate e.g. Windows: no Unix domain sockets, no user ids
+        for module, name in ((daemon.socket, "AF_UNIX"), (os, "getuid")):
+            if hasattr(module, name):
+                self.addCleanup(setattr, module, name, getattr(module, name))
+                delattr(module, name)
+
+    def test_no_daemon_is_probed(self):
+        self.assertFalse(daemon.daemon_supported())
+        self.assertIsNone(daemon_available())
+        self.assertIsNone(daemon_available("/nonexistent/regressionx.sock"))
+
+    @patch('regressionx.cli.load_config')
+    def test_cli_runs_locally(self, mock_load):
+        mock_load.return_value = []
+        work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, work_dir)
+        with patch('sys.stdout', new_callable=MagicMock):
+            cli.main(["compare", "--config", "suite.py", "--report", os.path.join(work_dir, "r.md")])
+        self.assertTrue(os.path.exists(os.path.join(work_dir, "r.md")))
+
+    def test_serve_refuses_to_start(self):
+        with patch('sys.stderr', new_callable=MagicMock):
+            with self.assertRaises(SystemExit) as cm:
+                cli.main(["serve"])
+        self.assertEqual(cm.exception.code, 1)
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.work_dir, "d.sock")
+        self.server = DaemonServer(self.socket_path, DaemonState(slots=2))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.saved = (sys.stdout, sys.stderr)
+        sys.stdout = _ContextStream(sys.stdout, "stdout")
+        sys.stderr = _ContextStream(sys.stderr, "stderr")
+
+    def tearDown(self):
+        sys.stdout, sys.stderr = self.saved
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.work_dir)
+
+    def _parse(self, *args):
+        # Parsed arguments as the client would send them
+        with patch('regressionx.cli.run_mode') as run_mode:
+            cli.main([*args, "--no-daemon"])
+        return run_mode.call_args[0][0]
+
+    @patch('regressionx.cli.load_config')
+    def test_cli_runs_through_daemon_with_relative_paths(self, mock_load):
+        mock_load.return_value = [
+            Case(name="same", baseline_command="echo A > out.txt", candidate_command="echo A > out.txt",
+                 base_path="s/base", cand_path="s/cand"),
+            Case(name="diff", baseline_command="echo A > out.txt", candidate_command="echo B > out.txt",
+                 base_path="d/base", cand_path="d/cand"),
+        ]
+        self.assertEqual(daemon_available(self.socket_path), self.socket_path)
+
+        with open(os.path.join(self.work_dir, "suite.py"), "w") as f:
+            f.write("cases = []\n")
+        saved_cwd = os.getcwd()
+        os.chdir(self.work_dir)
+        try:
+            with patch('regressionx.daemon.run_via_daemon', wraps=daemon.run_via_daemon) as client:
+                with self.assertRaises(SystemExit) as exit_info:
+                    cli.main(["run", "--config", "suite.py", "--report", "report.md",
+                              "--socket", self.socket_path, "-j", "2"])
+        finally:
+            os.chdir(saved_cwd)
+
+        self.assertEqual(exit_info.exception.code, 1)
+        self.assertEqual(client.call_count, 1)
+        mock_load.assert_called_once_with(os.path.join(self.work_dir, "suite.py"))
+        with open(os.path.join(self.work_dir, "d", "cand", "out.txt")) as f:
+            self.assertEqual(f.read().strip(), "B")
+        with open(os.path.join(self.work_dir, "report.md"), encoding="utf-8") as f:
+            self.assertIn("| diff | FAILED |", f.read())
+
+    @patch('regressionx.cli.load_config')
+    def test_commands_run_in_the_clients_environment(self, mock_load):
+        from regressionx.daemon import Session
+
+        mock_load.return_value = [
+            Case(name="env", baseline_command="echo $RX_CLIENT_VAR > out.txt",
+                 candidate_command="echo $RX_CLIENT_VAR > out.txt", base_path="base", cand_path="cand"),
+        ]
+        config = os.path.join(self.work_dir, "suite.py")
+        with open(config, "w") as f:
+            f.write("cases = []\n")
+        parsed_args = self._parse("run", "--config", config, "--report", os.path.join(self.work_dir, "r.md"))
+        env = {"PATH": os.environ.get("PATH", ""), "RX_CLIENT_VAR": "from-client"}
+        self.assertNotIn("RX_CLIENT_VAR", os.environ)
+
+        with patch('sys.stdout', new_callable=MagicMock):
+            cli.run_mode(parsed_args, session=Session(self.server.state, self.work_dir, env))
+
+        with open(os.path.join(self.work_dir, "base", "out.txt")) as f:
+            self.assertEqual(f.read().strip(), "from-client")
+
+    def test_only_our_own_users_daemon_is_trusted(self):
+        self.assertEqual(daemon_available(self.socket_path), self.socket_path)
+        # The socket file belongs to someone else
+        with patch('regressionx.daemon.os.getuid', return_value=os.getuid() + 1):
+            self.assertIsNone(daemon_available(self.socket_path))
+        # The listening process runs as someone else
+        with patch('regressionx.daemon._peer_uid', return_value=os.getuid() + 1):
+            self.assertIsNone(daemon_available(self.socket_path))
+
+    def test_fallback_socket_directory_is_private(self):
+        private = os.path.join(self.work_dir, "private")
+        daemon._private_dir(private)
+        self.assertEqual(os.stat(private).st_mode & 0o777, 0o700)
+
+        shared = os.path.join(self.work_dir, "shared")
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        with self.assertRaises(RuntimeError):
+            daemon._private_dir(shared)
+
+    def test_only_environment_differences_are_sent(self):
+        daemon_env = {"PATH": "/bin", "HOME": "/home/me", "STALE": "1"}
+        client_env = {"PATH": "/opt/bin:/bin", "HOME": "/home/me", "RX_CLIENT_VAR": "x"}
+
+        changed, unset = daemon._env_delta(client_env, daemon_env)
+
+        self.assertEqual(changed, {"PATH": "/opt/bin:/bin", "RX_CLIENT_VAR": "x"})
+        self.assertEqual(unset, ["STALE"])
+        self.assertEqual(daemon._apply_env_delta(daemon_env, changed, unset), client_env)
+
+    @patch('regressionx.cli.load_config')
+    def test_client_hanging_up_cancels_its_request(self, mock_load):
+        import json
+        import socket
+
+        mock_load.return_value = [
+            Case(name="slow", baseline_command="sleep 30", candidate_command="true",
+                 base_path="base", cand_path="cand"),
+        ]
+        config = os.path.join(self.work_dir, "suite.py")
+        with open(config, "w") as f:
+            f.write("cases = []\n")
+        parsed_args = self._parse("run", "--config", config, "--report", os.path.join(self.work_dir, "r.md"))
+        request = {"args": vars(parsed_args), "cwd": self.work_dir, "env": {}, "unset": []}
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.socket_path)
+        client.makefile("rb").readline() # The daemon's environment
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        deadline = time.monotonic() + 10
+        while not self.server.state.fair.requests():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        start = time.monotonic()
+        client.close()
+
+        while self.server.state.fair.requests():
+            self.assertLess(time.monotonic(), deadline, "request still running after its client left")
+            time.sleep(0.05)
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_client_reports_a_lost_connection(self):
+        import io
+        import socket
+        from argparse import Namespace
+
+        ours, theirs = socket.socketpair()
+        theirs.sendall(b'{"env": {}}\n')
+        theirs.close()
+        with patch('regressionx.daemon._connect', return_value=ours), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            code = daemon.run_via_daemon(self.socket_path, Namespace())
+
+        self.assertEqual(code, 1)
+        self.assertIn("RegressionX daemon", stderr.getvalue())
+
+    @patch('regressionx.cli.load_config')
+    def test_requests_without_jobs_may_use_all_slots(self, mock_load):
+        from regressionx.daemon import Session
+
+        mock_load.return_value = []
+        config = os.path.join(self.work_dir, "suite.py")
+        with open(config, "w") as f:
+            f.write("cases = []\n")
+        report = os.path.join(self.work_dir, "r.md")
+        unset = self._parse("compare", "--config", config, "--report", report)
+        capped = self._parse("compare", "--config", config, "--report", report, "-j", "1")
+        self.assertIsNone(unset.jobs)
+
+        with patch('sys.stdout', new_callable=MagicMock):
+            for parsed_args in (unset, capped):
+                cli.run_mode(parsed_args, session=Session(self.server.state, self.work_dir, {}))
+
+        self.assertEqual((unset.jobs, capped.jobs), (2, 1))
+
+    @patch('regressionx.cli.load_config')
+    def test_no_daemon_runs_locally(self, mock_load):
+        mock_load.return_value = []
+        with patch('regressionx.daemon.run_via_daemon') as client, patch('sys.stdout', new_callable=MagicMock):
+            cli.main(["compare", "--config", "suite.py", "--report", os.path.join(self.work_dir, "r.md"),
+                      "--socket", self.socket_path, "--no-daemon"])
+        client.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
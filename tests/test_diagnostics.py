@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.diagnostics import diagnose_mismatch
+
+class TestDiagnoseMismatch(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.root = Path(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, data):
+        p = self.root / name
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        p.write_bytes(data)
+        return p
+
+    def test_text_mismatch_reports_line_and_excerpt(self):
+        base = "".join(f"line {i}\n" for i in range(1, 101))
+        cand = base.replace("line 50\n", "LINE 50\n")
+        a = self.write("a.log", base)
+        b = self.write("b.log", cand)
+
+        detail = diagnose_mismatch(a, b, "out.log")
+
+        self.assertTrue(detail.is_text)
+        self.assertEqual(detail.first_diff_line, 50)
+        self.assertEqual(detail.first_diff_offset, base.index("line 50"))
+        self.assertEqual(detail.size_delta, 0)
+        self.assertIn("-line 50", detail.excerpt)
+        self.assertIn("+LINE 50", detail.excerpt)
+        self.assertTrue(any(line.startswith("@@ -47") for line in detail.excerpt))
+
+    def test_binary_mismatch_has_offset_but_no_excerpt(self):
+        a = self.write("a.bin", b"\0\1\2\3\4")
+        b = self.write("b.bin", b"\0\1\7\3\4\5")
+
+        detail = diagnose_mismatch(a, b, "out.bin")
+
+        self.assertFalse(detail.is_text)
+        self.assertEqual(detail.first_diff_offset, 2)
+        self.assertEqual(detail.size_delta, 1)
+        self.assertEqual(detail.excerpt, [])
+
+    def test_prefix_difference_is_at_end_of_shorter_file(self):
+        a = self.write("a.txt", "same\n")
+        b = self.write("b.txt", "same\nextra\n")
+
+        detail = diagnose_mismatch(a, b, "out.txt")
+
+        self.assertEqual(detail.first_diff_offset, 5)
+        self.assertEqual(detail.first_diff_line, 2)
+        self.assertIn("+extra", detail.excerpt)
+
+    def test_excerpt_is_capped(self):
+        a = self.write("a.txt", "".join(f"a{i}\n" for i in range(1000)))
+        b = self.write("b.txt", "".join(f"b{i}\n" for i in range(1000)))
+
+        detail = diagnose_mismatch(a, b, "out.txt", max_lines=10, max_bytes=10000)
+
+        self.assertEqual(len(detail.excerpt), 10)
+        self.assertTrue(detail.truncated)
+
+    def test_difference_found_across_block_boundaries(self):
+        base = "".join(f"row {i:04d}\n" for i in range(500))
+        cand = base.replace("row 0321", "row XXXX")
+        a = self.write("a.txt", base)
+        b = self.write("b.txt", cand)
+
+        with patch("regressionx.diagnostics.BLOCK_SIZE", 64):
+            detail = diagnose_mismatch(a, b, "out.txt")
+
+        self.assertEqual(detail.first_diff_line, 322)
+        self.assertEqual(detail.first_diff_offset, base.index("row 0321") + 4)
+        self.assertIn("-row 0321", detail.excerpt)
+
+if __name__ == "__main__":
+    unittest.main()
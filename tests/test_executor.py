@@ -97,6 +97,102 @@ class TestJobExecutor(unittest.TestCase):
             self.assertFalse((cand_dir / "output.txt").exists())
         finally:
             shutil.rmtree(work_dir)
-        
+
+    def test_run_case_polls_watcher_while_running(self):
+        import shutil
+
+        class CountingWatcher:
+            polls = 0
+            def poll(self):
+                self.polls += 1
+
+        work_dir, base_dir, cand_dir, case = self._make_case_with_dirs(
+            "watched",
+            "sleep 0.3; echo A > output.txt",
+            "sleep 0.3; echo B > output.txt"
+        )
+        watcher = CountingWatcher()
+        try:
+            # Not polled while only the baseline is produced: the candidate tree is stale then
+            run_case(case, run_candidate=False, watcher=watcher, poll_interval=0.05)
+            self.assertEqual(watcher.polls, 0)
+
+            base_res, cand_res, _, _ = run_case(case, watcher=watcher, poll_interval=0.05)
+
+            self.assertEqual(base_res.returncode, 0)
+            self.assertEqual(cand_res.returncode, 0)
+            self.assertGreater(watcher.polls, 0)
+            self.assertEqual((base_dir / "output.txt").read_text().strip(), "A")
+        finally:
+            shutil.rmtree(work_dir)
+
+    def test_cancel_kills_running_command(self):
+        import shutil
+        import threading
+        import time
+        from regressionx.executor import CancelToken, CaseCancelled
+
+        work_dir, base_dir, cand_dir, case = self._make_case_with_dirs(
+            "cancelled",
+            "sleep 30",
+            "echo B > output.txt"
+        )
+        token = CancelToken()
+        timer = threading.Timer(0.2, token.cancel)
+        try:
+            timer.start()
+            start = time.monotonic()
+            with self.assertRaises(CaseCancelled):
+                run_case(case, cancel=token)
+            self.assertLess(time.monotonic() - start, 10)
+            # The candidate is never started once the token has fired
+            self.assertFalse((cand_dir / "output.txt").exists())
+        finally:
+            timer.cancel()
+            shutil.rmtree(work_dir)
+
+    def test_cancel_keeps_the_first_reason(self):
+        from regressionx.executor import CancelToken
+
+        token = CancelToken()
+        self.assertIsNone(token.reason)
+        token.cancel("interrupted")
+        token.cancel("failure limit reached")
+        self.assertEqual(token.reason, "interrupted")
+
+    def test_sigterm_kills_commands_in_their_own_process_group(self):
+        import shutil
+        import signal
+        import threading
+        import time
+        from regressionx.executor import CancelToken, CaseCancelled, cancel_on_interrupt
+
+        work_dir, base_dir, cand_dir, case = self._make_case_with_dirs("terminated", "sleep 30", "true")
+        token = CancelToken()
+        outcome = []
+
+        def run():
+            try:
+                run_case(case, cancel=token)
+            except CaseCancelled:
+                outcome.append("cancelled")
+
+        worker = threading.Thread(target=run)
+        start = time.monotonic()
+        try:
+            with self.assertRaises(SystemExit):
+                with cancel_on_interrupt(token):
+                    worker.start()
+                    time.sleep(0.3)
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    time.sleep(10)
+            worker.join(10)
+            self.assertEqual(outcome, ["cancelled"])
+            self.assertEqual(token.reason, "terminated")
+            self.assertLess(time.monotonic() - start, 10)
+            self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+        finally:
+            shutil.rmtree(work_dir)
+
 if __name__ == "__main__":
     unittest.main()
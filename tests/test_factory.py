@@ -64,5 +64,64 @@ class TestTemplateFactory(unittest.TestCase):
         with self.assertRaises(KeyError):
             tmpl.generate([{"name": "fail", "other": "value"}])
 
+    def test_preprocess_is_shared_by_generated_cases(self):
+        if Template is None:
+            self.fail("Implementation Missing")
+        from regressionx import Preprocess
+
+        build = Preprocess(
+            baseline_command="make -C old",
+            candidate_command="make -C new",
+            base_path="/tmp/build/baseline",
+            cand_path="/tmp/build/candidate"
+        )
+        tmpl = Template(
+            baseline_command="old/tool {name}",
+            candidate_command="new/tool {name}",
+            base_path="/tmp/{name}/baseline",
+            cand_path="/tmp/{name}/candidate",
+            preprocess=build
+        )
+
+        cases = tmpl.generate([{"name": "a"}, {"name": "b"}])
+
+        self.assertIs(cases[0].preprocess, build)
+        self.assertIs(cases[1].preprocess, build)
+
+    def test_pycall_arguments_are_formatted(self):
+        if Template is None:
+            self.fail("Implementation Missing")
+        from regressionx import PyCall
+
+        tmpl = Template(
+            baseline_command=PyCall("tool.cli:main", {"mode": "{mode}", "retries": 2}, path=["/repo/{rev}"]),
+            candidate_command="new_tool --mode {mode}",
+            base_path="/tmp/{name}/baseline",
+            cand_path="/tmp/{name}/candidate"
+        )
+
+        case = tmpl.generate([{"name": "a", "mode": "fast", "rev": "v1"}])[0]
+
+        self.assertEqual(case.baseline_command, PyCall("tool.cli:main", {"mode": "fast", "retries": 2}, path=["/repo/v1"]))
+        self.assertEqual(case.candidate_command, "new_tool --mode fast")
+
+    def test_resource_hints_with_per_case_override(self):
+        if Template is None:
+            self.fail("Implementation Missing")
+
+        tmpl = Template(
+            baseline_command="old {name}",
+            candidate_command="new {name}",
+            base_path="/tmp/{name}/baseline",
+            cand_path="/tmp/{name}/candidate",
+            cores=2,
+            memory="4G"
+        )
+
+        small, big = tmpl.generate([{"name": "small"}, {"name": "big", "cores": 32, "memory": "100G"}])
+
+        self.assertEqual((small.cores, small.memory), (2, "4G"))
+        self.assertEqual((big.cores, big.memory), (32, "100G"))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.comparator import ComparatorResult
+from regressionx.domain import Case
+from regressionx.flaky import scratch_case, summarize
+
+class TestFlakiness(unittest.TestCase):
+    def test_consistent_failure(self):
+        attempts = [
+            ComparatorResult(match=False, diffs=["Content mismatch: a.txt"]),
+            ComparatorResult(match=False, diffs=["Content mismatch: a.txt"]),
+        ]
+        result = summarize(attempts)
+
+        self.assertEqual(result.verdict, "FAIL")
+        self.assertEqual(result.differences, {"Content mismatch: a.txt": 2})
+
+    def test_flaky_with_per_file_stability(self):
+        attempts = [
+            ComparatorResult(match=False, diffs=["Content mismatch: a.txt", "Content mismatch: b.txt"]),
+            ComparatorResult(match=True),
+            ComparatorResult(match=False, diffs=["Content mismatch: a.txt"]),
+        ]
+        result = summarize(attempts)
+
+        self.assertEqual(result.verdict, "FLAKY")
+        self.assertEqual((result.passed, result.attempts), (1, 3))
+        self.assertEqual(result.stability(), [("Content mismatch: a.txt", 2), ("Content mismatch: b.txt", 1)])
+
+    def test_scratch_case_moves_only_executed_sides(self):
+        case = Case(name="c", baseline_command="a", candidate_command="b", base_path="/data/base", cand_path="/data/cand")
+
+        copy = scratch_case(case, Path("/scratch/0"), run_baseline=False, run_candidate=True)
+
+        self.assertEqual(copy.base_path, "/data/base")
+        self.assertEqual(copy.cand_path, str(Path("/scratch/0") / "candidate"))
+        self.assertEqual(copy.candidate_command, "b")
+        self.assertEqual(case.cand_path, "/data/cand")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.manifest import (
+    build_manifest, compare_to_manifest, write_manifest, load_manifest, manifest_path
+)
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.root = Path(self.test_dir)
+        self.base = self.root / "base"
+        self.cand = self.root / "cand"
+        self.base.mkdir()
+        self.cand.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def create_file(self, parent: Path, name: str, content):
+        p = parent / name
+        p.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        p.write_bytes(content)
+
+    def _frozen(self, text=False):
+        path = manifest_path(str(self.root / "manifests"), "suite/case 1")
+        write_manifest(path, build_manifest(self.base, text=text))
+        return load_manifest(path)
+
+    def test_identical_tree_matches(self):
+        for tree in (self.base, self.cand):
+            self.create_file(tree, "f1.txt", "content")
+            self.create_file(tree, "sub/f2.bin", b"\0\1\2")
+
+        result = compare_to_manifest(self._frozen(), self.cand)
+
+        self.assertTrue(result.match)
+        self.assertEqual(result.files_compared, 2)
+
+    def test_content_and_size_mismatch(self):
+        self.create_file(self.base, "same_size.txt", "AAAA")
+        self.create_file(self.cand, "same_size.txt", "BBBB")
+        self.create_file(self.base, "grown.txt", "a")
+        self.create_file(self.cand, "grown.txt", "abc")
+
+        result = compare_to_manifest(self._frozen(), self.cand)
+
+        self.assertFalse(result.match)
+        self.assertIn("Content mismatch: same_size.txt", result.diffs)
+        self.assertIn("Content mismatch: grown.txt", result.diffs)
+        self.assertEqual(result.details["grown.txt"].size_delta, 2)
+
+    def test_structural_differences(self):
+        self.create_file(self.base, "gone/a.txt", "a")
+        self.create_file(self.base, "gone/b.txt", "b")
+        self.create_file(self.cand, "extra.txt", "x")
+
+        result = compare_to_manifest(self._frozen(), self.cand)
+
+        self.assertFalse(result.match)
+        # A missing directory is reported once, like compare_directories does
+        self.assertEqual(result.errors, ["Only in baseline: gone", "Only in candidate: extra.txt"])
+
+    def test_type_mismatch(self):
+        from regressionx.comparator import DiffKind
+
+        self.create_file(self.base, "was_dir/a.txt", "a")
+        self.create_file(self.cand, "was_dir", "now a file")
+        self.create_file(self.base, "was_file", "a file")
+        self.create_file(self.cand, "was_file/b.txt", "b")
+
+        result = compare_to_manifest(self._frozen(), self.cand)
+
+        self.assertFalse(result.match)
+        # Children of a retyped entry are not reported on their own
+        self.assertEqual(result.errors, ["Type mismatch: was_dir", "Type mismatch: was_file"])
+        self.assertEqual(result.counts, {DiffKind.TYPE_MISMATCH: 2})
+
+    def test_text_digests_ignore_line_endings(self):
+        self.create_file(self.base, "out.log", "a\r\nb  \r\n")
+        self.create_file(self.cand, "out.log", "a\nb\n")
+        manifest = self._frozen(text=True)
+
+        self.assertFalse(compare_to_manifest(manifest, self.cand).match)
+        self.assertTrue(compare_to_manifest(manifest, self.cand, text=True).match)
+
+    def test_single_file_output(self):
+        base_file = self.root / "base.txt"
+        cand_file = self.root / "cand.txt"
+        base_file.write_text("same", encoding="utf-8")
+        cand_file.write_text("same", encoding="utf-8")
+
+        self.assertTrue(compare_to_manifest(build_manifest(base_file), cand_file).match)
+
+    def test_missing_candidate(self):
+        self.create_file(self.base, "f1.txt", "content")
+        result = compare_to_manifest(self._frozen(), self.root / "nowhere")
+
+        self.assertFalse(result.match)
+
+if __name__ == "__main__":
+    unittest.main()
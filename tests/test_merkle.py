@@ -0,0 +1,120 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.comparator import DiffKind
+from regressionx.merkle import (
+    DigestCache, MerkleIncrementalComparator, build_tree, digest_cache_path, merkle_compare
+)
+
+class TestMerkle(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.dir_a = self.root / "base"
+        self.dir_b = self.root / "cand"
+        for d in (self.dir_a, self.dir_b):
+            for sub in ("same", "changed"):
+                for i in range(3):
+                    self.create_file(d, f"{sub}/f{i}.txt", f"{sub} {i}")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def create_file(self, parent: Path, name: str, content: str):
+        p = parent / name
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(content, encoding='utf-8')
+
+    def test_equal_trees_match_and_cache_is_reused(self):
+        result = merkle_compare(self.dir_a, self.dir_b)
+
+        self.assertTrue(result.match)
+        self.assertEqual(result.files_compared, 0)
+        self.assertTrue(digest_cache_path(self.dir_a).exists())
+        self.assertFalse((self.dir_a / digest_cache_path(self.dir_a).name).exists())
+
+        cache = DigestCache(self.dir_a)
+        build_tree(self.dir_a, cache)
+        self.assertEqual(cache.hashed_files, 0)
+
+    def test_only_differing_subtrees_are_descended(self):
+        self.create_file(self.dir_b, "changed/f1.txt", "different")
+        self.create_file(self.dir_b, "changed/new.txt", "x")
+
+        result = merkle_compare(self.dir_a, self.dir_b)
+
+        self.assertFalse(result.match)
+        self.assertEqual(result.diffs, ["Content mismatch: changed/f1.txt"])
+        self.assertEqual(result.errors, ["Only in candidate: changed/new.txt"])
+        self.assertEqual(result.files_compared, 3)
+        self.assertIn("changed/f1.txt", result.details)
+
+    def test_modified_file_is_rehashed(self):
+        self.assertTrue(merkle_compare(self.dir_a, self.dir_b).match)
+        path = self.dir_b / "same" / "f0.txt"
+        path.write_text("edited", encoding="utf-8")
+        os.utime(path, ns=(1, 1))
+
+        result = merkle_compare(self.dir_a, self.dir_b)
+
+        self.assertEqual(result.diffs, ["Content mismatch: same/f0.txt"])
+
+    def test_type_mismatch_and_single_files(self):
+        shutil.rmtree(self.dir_b / "same")
+        self.create_file(self.dir_b, "same", "now a file")
+        result = merkle_compare(self.dir_a, self.dir_b)
+        self.assertEqual(result.counts, {DiffKind.TYPE_MISMATCH: 1})
+
+        self.assertTrue(merkle_compare(self.dir_a / "changed" / "f0.txt", self.dir_b / "changed" / "f0.txt").match)
+        self.assertFalse(merkle_compare(self.dir_a / "changed" / "f0.txt", self.dir_b / "changed" / "f1.txt").match)
+
+    def test_unchanged_trees_short_circuit_on_cached_roots(self):
+        from unittest.mock import patch
+
+        self.assertTrue(merkle_compare(self.dir_a, self.dir_b).match)
+        with patch("regressionx.merkle.build_tree") as build:
+            self.assertTrue(merkle_compare(self.dir_a, self.dir_b).match)
+        build.assert_not_called()
+
+        # Any change to either tree invalidates the cached root
+        self.create_file(self.dir_b, "same/extra.txt", "x")
+        self.assertFalse(merkle_compare(self.dir_a, self.dir_b).match)
+
+    def test_default_ignores_are_skipped(self):
+        self.create_file(self.dir_b, "__pycache__/mod.pyc", "bytecode")
+        self.create_file(self.dir_b, "same/.git", "gitdir: elsewhere")
+
+        self.assertTrue(merkle_compare(self.dir_a, self.dir_b).match)
+
+    def test_symlinks_are_compared_by_target_not_followed(self):
+        for d in (self.dir_a, self.dir_b):
+            os.symlink("..", d / "same" / "loop")
+        os.symlink("f0.txt", self.dir_a / "changed" / "link")
+        os.symlink("f1.txt", self.dir_b / "changed" / "link")
+
+        result = merkle_compare(self.dir_a, self.dir_b)
+
+        self.assertEqual(result.diffs, ["Content mismatch: changed/link"])
+        self.assertEqual(result.errors, [])
+
+    def test_incremental_comparator_fills_digests_while_running(self):
+        self.create_file(self.dir_b, "changed/f2.txt", "different")
+        watcher = MerkleIncrementalComparator(self.dir_a, self.dir_b, settle_seconds=0)
+        watcher.poll()
+        watcher.poll()
+        hashed = [cache.hashed_files for cache in watcher.caches]
+        self.assertEqual(hashed, [6, 6])
+
+        result = watcher.finish()
+
+        self.assertEqual([cache.hashed_files for cache in watcher.caches], hashed)
+        self.assertEqual(result.diffs, ["Content mismatch: changed/f2.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import sys
+import time
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.metrics import RunMetrics, MetricsWriter, write_atomic
+from regressionx.comparator import ComparatorResult
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_case_lifecycle_counters(self):
+        metrics = RunMetrics(cases_total=3)
+        metrics.case_started()
+        metrics.case_started()
+        metrics.case_finished(passed=True)
+
+        snap = metrics.snapshot()
+        self.assertEqual(snap["cases_queued"], 1)
+        self.assertEqual(snap["cases_running"], 1)
+        self.assertEqual(snap["cases_passed"], 1)
+        self.assertEqual(snap["cases_failed"], 0)
+
+    def test_comparison_and_phase_accounting(self):
+        metrics = RunMetrics()
+        metrics.add_comparison(ComparatorResult(files_compared=2, bytes_compared=100), 0.5)
+        with metrics.phase("compare"):
+            pass
+
+        snap = metrics.snapshot()
+        self.assertEqual(snap["files_compared"], 2)
+        self.assertEqual(snap["bytes_compared"], 100)
+        self.assertEqual(snap["compare_throughput_bytes_per_second"], 200.0)
+        self.assertIn("compare", snap["phase_seconds"])
+
+    def test_prometheus_format(self):
+        metrics = RunMetrics(cases_total=2)
+        metrics.add_phase("baseline", 1.5)
+        text = metrics.to_prometheus()
+
+        self.assertIn('regressionx_cases{state="queued"} 2', text)
+        self.assertIn('regressionx_phase_seconds_total{phase="baseline"} 1.500000', text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_writer_chooses_format_by_extension(self):
+        metrics = RunMetrics(cases_total=1)
+        json_path = os.path.join(self.test_dir, "metrics.json")
+        prom_path = os.path.join(self.test_dir, "regressionx.prom")
+
+        for path in (json_path, prom_path):
+            writer = MetricsWriter(metrics, path, interval=60)
+            writer.start()
+            writer.stop()
+
+        with open(json_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["cases_total"], 1)
+        with open(prom_path, encoding="utf-8") as f:
+            self.assertIn("# TYPE regressionx_cases gauge", f.read())
+
+    def test_write_atomic_leaves_no_temp_files(self):
+        path = os.path.join(self.test_dir, "out.prom")
+        write_atomic(path, "a 1\n")
+        write_atomic(path, "a 2\n")
+
+        self.assertEqual(os.listdir(self.test_dir), ["out.prom"])
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a 2\n")
+
+    def test_write_atomic_makes_file_world_readable(self):
+        path = os.path.join(self.test_dir, "out.prom")
+        write_atomic(path, "a 1\n")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+    def test_writer_survives_write_errors(self):
+        from unittest.mock import patch
+        writer = MetricsWriter(RunMetrics(), os.path.join(self.test_dir, "m.prom"), interval=0.01)
+        calls = []
+
+        def failing_write():
+            calls.append(1)
+            raise OSError("disk full")
+
+        with patch.object(writer, "write", side_effect=failing_write), patch("sys.stderr") as stderr:
+            writer._thread.start()
+            while len(calls) < 2:
+                time.sleep(0.01)
+            writer._stop.set()
+            writer._thread.join()
+        self.assertIn("disk full", "".join(str(c) for c in stderr.write.call_args_list))
+
+    def test_rejects_non_positive_interval(self):
+        with self.assertRaises(ValueError):
+            MetricsWriter(RunMetrics(), os.path.join(self.test_dir, "m.prom"), interval=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import tempfile
+import shutil
+import textwrap
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.domain import Case, PyCall
+from regressionx.pool import PyWorkerPools, run_pycall
+
+TOOL_SOURCE = textwrap.dedent('''
+    import os
+    import sys
+
+    VERSION = "{version}"
+    IMPORTS = globals().get("IMPORTS", 0) + 1
+
+    def write(name, text):
+        with open(name, "w") as f:
+            f.write(VERSION + ":" + text + ":" + os.environ.get("RX_MODE", ""))
+        print("wrote", name)
+        print("to stderr", file=sys.stderr)
+
+    def whoami():
+        print(os.getpid(), IMPORTS)
+
+    def fail(code):
+        return code
+
+    def boom():
+        raise RuntimeError("kaput")
+''')
+
+class TestPyWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.root = Path(self.test_dir)
+        for version in ("old", "new"):
+            src = self.root / version
+            src.mkdir()
+            (src / "rx_sample_tool.py").write_text(TOOL_SOURCE.format(version=version), encoding="utf-8")
+        self.work = self.root / "work"
+        self.work.mkdir()
+        self.pools = PyWorkerPools(size=1)
+
+    def tearDown(self):
+        self.pools.close()
+        shutil.rmtree(self.test_dir)
+
+    def _call(self, func, version="old", **kwargs):
+        return PyCall(target=f"rx_sample_tool:{func}", kwargs=kwargs, path=[str(self.root / version)])
+
+    def test_call_runs_in_cwd_with_env_and_captures_output(self):
+        res = run_pycall(self._call("write", name="out.txt", text="hi"), "baseline",
+                         self.work, {"RX_MODE": "fast"}, self.pools)
+
+        self.assertEqual(res.returncode, 0)
+        self.assertEqual((self.work / "out.txt").read_text(), "old:hi:fast")
+        self.assertEqual(res.stdout, "wrote out.txt\n")
+        self.assertEqual(res.stderr, "to stderr\n")
+
+    def test_worker_is_reused_and_module_imported_once(self):
+        first = run_pycall(self._call("whoami"), "baseline", self.work, {}, self.pools)
+        second = run_pycall(self._call("whoami"), "baseline", self.work, {}, self.pools)
+
+        self.assertEqual(first.stdout, second.stdout)
+        self.assertTrue(first.stdout.strip().endswith(" 1"))
+        self.assertNotEqual(first.stdout.split()[0], str(os.getpid()))
+
+    def test_sides_use_separate_interpreters(self):
+        run_pycall(self._call("write", "old", name="a.txt", text="x"), "baseline", self.work, {}, self.pools)
+        run_pycall(self._call("write", "new", name="b.txt", text="x"), "candidate", self.work, {}, self.pools)
+
+        self.assertTrue((self.work / "a.txt").read_text().startswith("old:"))
+        self.assertTrue((self.work / "b.txt").read_text().startswith("new:"))
+
+    def test_return_codes_and_exceptions(self):
+        self.assertEqual(run_pycall(self._call("fail", code=3), "baseline", self.work, {}, self.pools).returncode, 3)
+
+        res = run_pycall(self._call("boom"), "baseline", self.work, {}, self.pools)
+        self.assertEqual(res.returncode, 1)
+        self.assertIn("RuntimeError: kaput", res.stderr)
+
+    def test_unimportable_target_fails_the_call(self):
+        res = run_pycall(PyCall(target="no_such_module_xyz:main"), "baseline", self.work, {}, self.pools)
+        self.assertEqual(res.returncode, 1)
+        self.assertIn("ModuleNotFoundError", res.stderr)
+
+        # The pool survives and still serves other calls
+        pools = PyWorkerPools(size=1)
+        try:
+            call = PyCall(target="no_such_module_xyz:main", path=[str(self.root / "old")])
+            pools.prepare([Case(name="bad", baseline_command=call, candidate_command="true",
+                                base_path="b", cand_path="c")])
+            self.assertEqual(run_pycall(call, "baseline", self.work, {}, pools).returncode, 1)
+            self.assertEqual(run_pycall(self._call("fail", code=0), "baseline", self.work, {}, pools).returncode, 0)
+        finally:
+            pools.close()
+
+    def test_pools_start_lazily_and_idle_ones_are_capped(self):
+        pools = PyWorkerPools(size=1, max_pools=1)
+        try:
+            cases = [
+                Case(name=v, baseline_command=self._call("whoami", v), candidate_command="true",
+                     base_path="b", cand_path="c")
+                for v in ("old", "new")
+            ]
+            pools.prepare(cases)
+            self.assertEqual(len(pools), 0)
+
+            for case in cases:
+                res = run_pycall(case.baseline_command, "baseline", self.work, {}, pools)
+                self.assertEqual(res.returncode, 0)
+                self.assertEqual(len(pools), 1)
+        finally:
+            pools.close()
+
+    def test_run_case_dispatches_pycalls(self):
+        from regressionx.executor import run_case
+        case = Case(
+            name="py",
+            baseline_command=self._call("write", "old", name="out.txt", text="{x}"),
+            candidate_command="echo shell > out.txt",
+            base_path=str(self.root / "base"),
+            cand_path=str(self.root / "cand")
+        )
+        base_res, cand_res, base_path, cand_path = run_case(case, pools=self.pools)
+
+        self.assertEqual(base_res.returncode, 0)
+        self.assertTrue((base_path / "out.txt").read_text().startswith("old:"))
+        self.assertEqual((cand_path / "out.txt").read_text().strip(), "shell")
+
+if __name__ == "__main__":
+    unittest.main()
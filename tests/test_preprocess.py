@@ -0,0 +1,136 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.domain import Case, Preprocess
+from regressionx.preprocess import collect_preprocesses, run_preprocesses, fingerprint
+
+class TestPreprocess(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.root = Path(self.test_dir)
+        self.src = self.root / "src"
+        self.src.mkdir()
+        (self.src / "main.c").write_text("int main() {}", encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _make_pre(self, base_cmd="echo built >> build.log", cand_cmd="echo built >> build.log"):
+        return Preprocess(
+            baseline_command=base_cmd,
+            candidate_command=cand_cmd,
+            base_path=str(self.root / "build_base"),
+            cand_path=str(self.root / "build_cand"),
+            inputs=[str(self.src)]
+        )
+
+    def _build_count(self, side):
+        log = self.root / f"build_{side}" / "build.log"
+        return len(log.read_text().splitlines()) if log.exists() else 0
+
+    def test_collect_deduplicates_shared_steps(self):
+        pre = self._make_pre()
+        other = self._make_pre()
+        cases = [
+            Case(name=f"c{i}", baseline_command="", candidate_command="", base_path="", cand_path="", preprocess=p)
+            for i, p in enumerate([pre, None, pre, other, pre])
+        ]
+        self.assertEqual(collect_preprocesses(cases), [pre, other])
+
+    def test_runs_once_per_version_and_caches(self):
+        pre = self._make_pre()
+
+        results = run_preprocesses([pre])
+        base_res, cand_res = results[id(pre)]
+        self.assertEqual((base_res.returncode, cand_res.returncode), (0, 0))
+        self.assertEqual((self._build_count("base"), self._build_count("cand")), (1, 1))
+
+        # Unchanged fingerprint: both sides are skipped
+        base_res, cand_res = run_preprocesses([pre])[id(pre)]
+        self.assertEqual(base_res.args, "(cached)")
+        self.assertEqual((self._build_count("base"), self._build_count("cand")), (1, 1))
+
+        # Forcing ignores the cache
+        run_preprocesses([pre], use_cache=False)
+        self.assertEqual((self._build_count("base"), self._build_count("cand")), (2, 2))
+
+    def test_input_change_invalidates_cache(self):
+        pre = self._make_pre()
+        before = fingerprint(pre, "baseline")
+        run_preprocesses([pre])
+
+        (self.src / "util.c").write_text("void f() {}", encoding="utf-8")
+        self.assertNotEqual(fingerprint(pre, "baseline"), before)
+
+        run_preprocesses([pre])
+        self.assertEqual(self._build_count("base"), 2)
+
+    def test_side_inputs_only_invalidate_their_side(self):
+        cand_src = self.root / "cand_src"
+        cand_src.mkdir()
+        (cand_src / "main.c").write_text("int main() {}", encoding="utf-8")
+        pre = self._make_pre()
+        pre.inputs = None
+        pre.base_inputs = [str(self.src)]
+        pre.cand_inputs = [str(cand_src)]
+        run_preprocesses([pre])
+
+        (cand_src / "main.c").write_text("int main() { return 1; }", encoding="utf-8")
+        base_res, cand_res = run_preprocesses([pre])[id(pre)]
+
+        self.assertEqual(base_res.args, "(cached)")
+        self.assertEqual((self._build_count("base"), self._build_count("cand")), (1, 2))
+
+    def test_step_without_inputs_always_runs(self):
+        pre = self._make_pre()
+        pre.inputs = None
+        run_preprocesses([pre])
+        run_preprocesses([pre])
+
+        self.assertEqual((self._build_count("base"), self._build_count("cand")), (2, 2))
+
+    def test_only_requested_sides_run(self):
+        pre = self._make_pre()
+        base_res, cand_res = run_preprocesses([pre], run_candidate=False)[id(pre)]
+
+        self.assertEqual(cand_res.args, "(skipped)")
+        self.assertEqual((self._build_count("base"), self._build_count("cand")), (1, 0))
+
+    def test_failed_step_is_not_cached(self):
+        pre = self._make_pre(cand_cmd="echo built >> build.log; exit 3")
+
+        _, cand_res = run_preprocesses([pre])[id(pre)]
+        self.assertEqual(cand_res.returncode, 3)
+
+        _, cand_res = run_preprocesses([pre])[id(pre)]
+        self.assertEqual(cand_res.returncode, 3)
+        self.assertEqual(self._build_count("cand"), 2)
+
+    def test_interrupt_kills_running_steps(self):
+        import signal
+        import threading
+        import time
+        from regressionx.executor import CancelToken
+
+        pre = self._make_pre(base_cmd="sleep 30", cand_cmd="sleep 30")
+        token = CancelToken()
+        timer = threading.Timer(0.3, os.kill, (os.getpid(), signal.SIGINT))
+        start = time.monotonic()
+        try:
+            timer.start()
+            with self.assertRaises(KeyboardInterrupt):
+                run_preprocesses([pre], cancel=token)
+        finally:
+            timer.cancel()
+        self.assertTrue(token.cancelled)
+        self.assertLess(time.monotonic() - start, 10)
+
+if __name__ == "__main__":
+    unittest.main()
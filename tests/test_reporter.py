@@ -69,5 +69,71 @@ class TestMarkdownReporter(unittest.TestCase):
         self.assertIn("| case_fail | FAILED |", content)
         self.assertIn("- [Content] Content Mismatch", content)
 
+    def test_skipped_cases(self):
+        reporter = MarkdownReporter(self.report_path)
+        case1 = Case(name="case_fail", baseline_command="echo a", candidate_command="echo b", base_path="/tmp/a1", cand_path="/tmp/b1")
+        case2 = Case(name="case_unrun", baseline_command="echo a", candidate_command="echo b", base_path="/tmp/a2", cand_path="/tmp/b2")
+        reporter.add_result(case1, MockProcess(0), MockProcess(0), MockCmpResult(False, [], ["Content Mismatch"]))
+        reporter.add_skipped(case2, "not run")
+        reporter.generate()
+
+        with open(self.report_path, "r", encoding="utf-8") as report_file:
+            content = report_file.read()
+
+        self.assertIn("**Total:** 2 | **Passed:** 0 | **Failed:** 1 | **Skipped:** 1", content)
+        self.assertIn("| case_unrun | SKIPPED |", content)
+        self.assertIn("- case_unrun: not run", content)
+
+    def test_mismatch_details_are_rendered(self):
+        from regressionx.diagnostics import MismatchDetail
+        reporter = MarkdownReporter(self.report_path)
+        case = Case(name="case_fail", baseline_command="echo a", candidate_command="echo b", base_path="/tmp/a1", cand_path="/tmp/b1")
+        cmp_result = MockCmpResult(False, [], ["Content mismatch: output.log"])
+        cmp_result.details = {"output.log": MismatchDetail(
+            path="output.log", base_size=10, cand_size=12,
+            first_diff_offset=4, first_diff_line=2, is_text=True,
+            excerpt=["@@ -1,2 +1,2 @@", " a", "-b", "+bb"]
+        )}
+        reporter.add_result(case, MockProcess(0), MockProcess(0), cmp_result)
+        reporter.generate()
+
+        with open(self.report_path, "r", encoding="utf-8") as report_file:
+            content = report_file.read()
+
+        self.assertIn("`output.log`: size 10 -> 12 (+2 bytes), first difference at byte 4 (line 2)", content)
+        self.assertIn("```diff", content)
+        self.assertIn("    +bb", content)
+
+    def test_omitted_differences_are_summarized_by_group(self):
+        from regressionx.comparator import ComparatorResult, DiffKind
+        reporter = MarkdownReporter(self.report_path)
+        case = Case(name="case_fail", baseline_command="echo a", candidate_command="echo b", base_path="/tmp/a1", cand_path="/tmp/b1")
+        cmp_result = ComparatorResult(max_examples=1)
+        for i in range(1000):
+            cmp_result.add_difference(DiffKind.CONTENT_MISMATCH, f"out/part{i}.bin")
+        reporter.add_result(case, MockProcess(0), MockProcess(0), cmp_result)
+        reporter.generate()
+
+        with open(self.report_path, "r", encoding="utf-8") as report_file:
+            content = report_file.read()
+
+        self.assertIn("- [Content] Content mismatch: out/part0.bin", content)
+        self.assertNotIn("part1.bin", content)
+        self.assertIn("- [Content] ... and 999 more (1000 total)", content)
+        self.assertIn("| Content mismatch | `out/*.bin` | 1000 |", content)
+
+    def test_sampled_match_is_reported_as_sampled_pass(self):
+        from regressionx.comparator import ComparatorResult
+        reporter = MarkdownReporter(self.report_path)
+        case = Case(name="case_big", baseline_command="echo a", candidate_command="echo a", base_path="/tmp/a1", cand_path="/tmp/b1")
+        reporter.add_result(case, MockProcess(0), MockProcess(0), ComparatorResult(sampled=True))
+        reporter.generate()
+
+        with open(self.report_path, "r", encoding="utf-8") as report_file:
+            content = report_file.read()
+
+        self.assertIn("| case_big | SAMPLED PASS |", content)
+        self.assertIn("**Passed:** 1 | **Failed:** 0 | **Sampled:** 1", content)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.domain import Case
+from regressionx.resources import HostLoad, HostMonitor, ResourceAdmission
+
+class FixedMonitor:
+    def __init__(self, load: HostLoad):
+        self.load = load
+
+    def sample(self) -> HostLoad:
+        return self.load
+
+def make_case(name, cores=None, memory=None):
+    return Case(name=name, baseline_command="a", candidate_command="b",
+                base_path="/tmp/base", cand_path="/tmp/cand", cores=cores, memory=memory)
+
+class TestResourceAdmission(unittest.TestCase):
+    def test_bin_packs_cores_and_memory(self):
+        admission = ResourceAdmission(cores=8, memory=100, monitor=FixedMonitor(HostLoad()))
+        big = make_case("big", cores=6, memory=60)
+        small = make_case("small", cores=2, memory=30)
+        other = make_case("other", cores=1)
+
+        self.assertTrue(admission.try_acquire(big))
+        self.assertTrue(admission.try_acquire(small))
+        self.assertFalse(admission.try_acquire(other))
+
+        admission.release(small)
+        self.assertTrue(admission.try_acquire(other))
+        self.assertFalse(admission.try_acquire(make_case("hungry", memory=50)))
+
+    def test_memory_hints_accept_sizes(self):
+        self.assertEqual(ResourceAdmission.demand(make_case("c", cores=4, memory="2K")), (4, 2048))
+        self.assertEqual(ResourceAdmission.demand(make_case("c")), (1, 0))
+
+    def test_backs_off_under_external_load_and_pressure(self):
+        monitor = FixedMonitor(HostLoad(loadavg=7.5))
+        admission = ResourceAdmission(cores=8, memory=100, monitor=monitor)
+        self.assertFalse(admission.try_acquire(make_case("a")))
+
+        monitor.load = HostLoad(loadavg=0.5, mem_available=10)
+        self.assertFalse(admission.try_acquire(make_case("b", memory=20)))
+        self.assertTrue(admission.try_acquire(make_case("c", memory=5)))
+
+        monitor.load = HostLoad(loadavg=0.0, cpu_pressure=80.0)
+        self.assertFalse(admission.try_acquire(make_case("d")))
+
+        monitor.load = HostLoad(loadavg=0.0, cpu_pressure=1.0)
+        self.assertTrue(admission.try_acquire(make_case("e")))
+
+    def test_oversized_case_can_be_forced(self):
+        admission = ResourceAdmission(cores=4, memory=None, monitor=FixedMonitor(HostLoad()))
+        huge = make_case("huge", cores=64)
+        self.assertFalse(admission.try_acquire(huge))
+        admission.force_acquire(huge)
+        admission.release(huge)
+        self.assertTrue(admission.try_acquire(make_case("next", cores=4)))
+
+    def test_host_monitor_samples(self):
+        load = HostMonitor(min_interval=60).sample()
+        self.assertIsInstance(load, HostLoad)
+
+if __name__ == "__main__":
+    unittest.main()
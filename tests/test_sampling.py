@@ -0,0 +1,82 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.sampling import diagnose_sampled, sample_offsets, sampled_equal
+
+class TestSampling(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name: str, data: bytes) -> Path:
+        path = self.test_dir / name
+        path.write_bytes(data)
+        return path
+
+    def test_offsets_cover_head_tail_and_fraction(self):
+        offsets = sample_offsets(100 * 10, 0.2, "a.bin", block_size=10)
+
+        self.assertEqual(len(offsets), 20)
+        self.assertEqual(offsets[0], 0)
+        self.assertEqual(offsets[-1], 990)
+        self.assertEqual(offsets, sorted(set(offsets)))
+
+    def test_offsets_are_deterministic_per_path(self):
+        self.assertEqual(sample_offsets(10000, 0.1, "a.bin", 10), sample_offsets(10000, 0.1, "a.bin", 10))
+        self.assertNotEqual(sample_offsets(10000, 0.1, "a.bin", 10), sample_offsets(10000, 0.1, "b.bin", 10))
+
+    def test_small_and_empty_files(self):
+        self.assertEqual(sample_offsets(0, 0.5), [])
+        self.assertEqual(sample_offsets(5, 0.5, block_size=10), [0])
+        self.assertEqual(sample_offsets(100, 1.0, block_size=10), list(range(0, 100, 10)))
+
+    def test_size_difference_is_detected_without_reading(self):
+        equal, sampled = sampled_equal(self.write("a", b"x" * 10), self.write("b", b"x" * 11), 0.5)
+        self.assertFalse(equal)
+        self.assertEqual(sampled, 0)
+
+    def test_difference_in_tail_is_detected(self):
+        data = bytearray(b"x" * 1000)
+        path_a = self.write("a", bytes(data))
+        data[-1:] = b"y"
+        path_b = self.write("b", bytes(data))
+
+        equal, sampled = sampled_equal(path_a, path_b, 0.01, block_size=10)
+
+        self.assertFalse(equal)
+        self.assertEqual(sampled, 20)
+
+    def test_identical_files_sample_equal(self):
+        data = os.urandom(4096)
+        equal, _ = sampled_equal(self.write("a", data), self.write("b", data), 0.1, block_size=64)
+        self.assertTrue(equal)
+
+    def test_diagnosis_only_reports_sampled_differences(self):
+        data = bytearray(b"x" * 1000)
+        path_a = self.write("a", bytes(data))
+        data[500:501] = b"?" # Outside the sampled blocks
+        data[-3:-2] = b"y"   # Inside the tail block
+        path_b = self.write("b", bytes(data))
+
+        detail = diagnose_sampled(path_a, path_b, 0.01, block_size=10)
+
+        self.assertEqual(detail.first_diff_offset, 997)
+        self.assertEqual(detail.excerpt, [])
+        self.assertIn("first sampled difference at byte 997", detail.summary())
+
+    def test_diagnosis_of_size_mismatch_reads_nothing(self):
+        detail = diagnose_sampled(self.write("a", b"x" * 10), self.write("b", b"y" * 12), 0.5)
+        self.assertEqual(detail.size_delta, 2)
+        self.assertIsNone(detail.first_diff_offset)
+
+if __name__ == "__main__":
+    unittest.main()
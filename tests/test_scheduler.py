@@ -0,0 +1,144 @@
+import unittest
+import threading
+import time
+import sys
+import os
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.scheduler import Scheduler
+
+class TestScheduler(unittest.TestCase):
+    def test_results_are_returned_in_item_order(self):
+        def work(n):
+            time.sleep(0.01 * (5 - n))
+            return n * n
+
+        results = Scheduler(jobs=4).run(list(range(5)), work)
+        self.assertEqual(results, [0, 1, 4, 9, 16])
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def work(_):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+        Scheduler(jobs=2).run(list(range(6)), work)
+        self.assertEqual(state["peak"], 2)
+
+    def test_cancel_stops_scheduling_new_items(self):
+        scheduler = Scheduler(jobs=1)
+
+        def work(n):
+            if n == 1:
+                scheduler.stop()
+            return n
+
+        results = scheduler.run([0, 1, 2, 3], work)
+        self.assertEqual(results, [0, 1, None, None])
+
+    def test_admission_controller_limits_concurrency(self):
+        class OneAtATime:
+            def __init__(self):
+                self.holder = None
+                self.forced = 0
+
+            def try_acquire(self, item):
+                if self.holder is None:
+                    self.holder = item
+                    return True
+                return False
+
+            def force_acquire(self, item):
+                self.forced += 1
+                self.holder = item
+                return True
+
+            def release(self, item):
+                self.holder = None
+
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def work(_):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+        controller = OneAtATime()
+        Scheduler(jobs=4, admission=[controller], poll_interval=0.01).run(list(range(4)), work)
+        self.assertEqual(state["peak"], 1)
+        self.assertIsNone(controller.holder)
+
+    def test_admission_never_stalls_an_idle_scheduler(self):
+        class Never:
+            def try_acquire(self, item):
+                return False
+
+            def force_acquire(self, item):
+                return True
+
+            def release(self, item):
+                pass
+
+        results = Scheduler(jobs=2, admission=[Never()], poll_interval=0.01).run([1, 2], lambda n: n)
+        self.assertEqual(results, [1, 2])
+
+    class Cores:
+        # Admits items whose size (in cores) fits next to the running ones
+        def __init__(self, capacity):
+            self.capacity = capacity
+            self.used = {}
+            self.started = []
+            self.lock = threading.Lock()
+
+        def try_acquire(self, item):
+            with self.lock:
+                if sum(self.used.values()) + item[1] > self.capacity:
+                    return False
+                return self.force_acquire(item)
+
+        def force_acquire(self, item):
+            self.used[item[0]] = item[1]
+            self.started.append(item[0])
+            return True
+
+        def release(self, item):
+            with self.lock:
+                del self.used[item[0]]
+
+    def test_small_items_overtake_a_blocked_large_one(self):
+        items = [("small1", 1), ("large", 4), ("small2", 1), ("small3", 1)]
+        cores = self.Cores(4)
+        results = Scheduler(jobs=4, admission=[cores], poll_interval=0.01).run(
+            items, lambda item: time.sleep(0.1) or item[0]
+        )
+
+        self.assertEqual(cores.started, ["small1", "small2", "small3", "large"])
+        self.assertEqual(results, ["small1", "large", "small2", "small3"])
+
+    def test_overtaking_is_limited_so_large_items_do_not_starve(self):
+        items = [("small1", 1), ("large", 4), ("small2", 1), ("small3", 1)]
+        cores = self.Cores(4)
+        Scheduler(jobs=4, admission=[cores], poll_interval=0.01, max_bypass=1).run(
+            items, lambda item: time.sleep(0.1)
+        )
+
+        self.assertEqual(cores.started, ["small1", "small2", "large", "small3"])
+
+    def test_rejects_zero_jobs(self):
+        with self.assertRaises(ValueError):
+            Scheduler(jobs=0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+from pathlib import Path
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.domain import Case
+from regressionx.scratch import ScratchBudget, ScratchRun, parse_size, tree_size
+
+class TestParseSize(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(parse_size("1048576"), 1048576)
+        self.assertEqual(parse_size("512M"), 512 * 1024 ** 2)
+        self.assertEqual(parse_size("10g"), 10 * 1024 ** 3)
+        self.assertEqual(parse_size("1.5KiB"), 1536)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+class TestScratchBudget(unittest.TestCase):
+    def test_reserves_largest_observed_footprint(self):
+        budget = ScratchBudget(100)
+        self.assertTrue(budget.try_acquire("a"))
+        budget.observe(60)
+        budget.release("a")
+
+        self.assertTrue(budget.try_acquire("b"))
+        self.assertFalse(budget.try_acquire("c"))
+        self.assertEqual(budget.reserved, 60)
+
+        budget.release("b")
+        self.assertTrue(budget.try_acquire("c"))
+
+    def test_force_acquire_ignores_budget(self):
+        budget = ScratchBudget(10, initial_estimate=50)
+        self.assertFalse(budget.try_acquire("a"))
+        budget.force_acquire("a")
+        self.assertEqual(budget.reserved, 50)
+
+    def test_admits_one_case_at_a_time_until_a_footprint_is_known(self):
+        budget = ScratchBudget(100)
+        self.assertTrue(budget.try_acquire("a"))
+        self.assertFalse(budget.try_acquire("b"))
+        budget.observe(30)
+        self.assertTrue(budget.try_acquire("b"))
+
+    def test_larger_footprint_raises_running_reservations(self):
+        budget = ScratchBudget(80, initial_estimate=10)
+        self.assertTrue(budget.try_acquire("a"))
+        self.assertTrue(budget.try_acquire("b"))
+        budget.observe(45)
+        budget.release("a")
+
+        self.assertEqual(budget.reserved, 45)
+        self.assertFalse(budget.try_acquire("c"))
+
+    def test_measured_usage_of_root_counts(self):
+        root = Path(tempfile.mkdtemp())
+        try:
+            budget = ScratchBudget(100, initial_estimate=10, root=root, measure_interval=0)
+            self.assertTrue(budget.try_acquire("a"))
+            # "a" outgrows its reservation while running
+            (root / "big").write_bytes(b"x" * 95)
+            self.assertFalse(budget.try_acquire("b"))
+            (root / "big").unlink()
+            self.assertTrue(budget.try_acquire("b"))
+        finally:
+            shutil.rmtree(root)
+
+class TestScratchRun(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.case = Case(name="case/1", baseline_command="a", candidate_command="b",
+                         base_path=str(self.test_dir / "out" / "base"),
+                         cand_path=str(self.test_dir / "out" / "cand"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_persist_copies_executed_sides_only(self):
+        run = ScratchRun(self.case, self.test_dir / "shm", run_baseline=False, run_candidate=True)
+        self.assertEqual(run.scratch.base_path, self.case.base_path)
+        cand = Path(run.scratch.cand_path)
+        cand.mkdir(parents=True)
+        (cand / "out.txt").write_text("hello")
+        self.assertEqual(run.footprint(), 5)
+
+        run.persist()
+        run.cleanup()
+
+        self.assertEqual((self.test_dir / "out" / "cand" / "out.txt").read_text(), "hello")
+        self.assertFalse((self.test_dir / "out" / "base").exists())
+        self.assertFalse(run.root.exists())
+
+    def test_persist_replaces_stale_outputs(self):
+        stale = self.test_dir / "out" / "cand" / "stale.txt"
+        stale.parent.mkdir(parents=True)
+        stale.write_text("from an earlier run")
+        run = ScratchRun(self.case, self.test_dir / "shm", run_baseline=False, run_candidate=True)
+        cand = Path(run.scratch.cand_path)
+        cand.mkdir(parents=True)
+        (cand / "out.txt").write_text("hello")
+
+        run.persist()
+        run.cleanup()
+
+        self.assertEqual(os.listdir(self.test_dir / "out" / "cand"), ["out.txt"])
+        self.assertEqual(os.listdir(self.test_dir / "out"), ["cand"])
+
+    def test_tree_size(self):
+        (self.test_dir / "d").mkdir()
+        (self.test_dir / "d" / "a").write_bytes(b"x" * 3)
+        (self.test_dir / "b").write_bytes(b"x" * 4)
+        self.assertEqual(tree_size(self.test_dir), 7)
+        self.assertEqual(tree_size(self.test_dir / "b"), 4)
+
+if __name__ == "__main__":
+    unittest.main()
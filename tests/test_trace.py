@@ -0,0 +1,74 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import pstats
+import sys
+import threading
+
+# Ensure the root directory is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from regressionx.trace import Tracer, Profiler, ProbeSet
+from regressionx.metrics import RunMetrics
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_records_complete_events_per_thread(self):
+        tracer = Tracer()
+        with tracer.phase("compare", "c1"):
+            pass
+
+        def traced():
+            with tracer.phase("baseline", "c2"):
+                pass
+        worker = threading.Thread(target=traced, name="worker-1")
+        worker.start()
+        worker.join()
+
+        spans = [e for e in tracer.events if e["ph"] == "X"]
+        self.assertEqual([s["name"] for s in spans], ["compare", "baseline"])
+        self.assertEqual(spans[0]["args"], {"case": "c1"})
+        self.assertNotEqual(spans[0]["tid"], spans[1]["tid"])
+        names = [e["args"]["name"] for e in tracer.events if e["ph"] == "M"]
+        self.assertIn("worker-1", names)
+
+    def test_write_chrome_trace_json(self):
+        tracer = Tracer()
+        with tracer.phase("report"):
+            pass
+        path = os.path.join(self.test_dir, "trace.json")
+        tracer.write(path)
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertIn("traceEvents", data)
+        self.assertTrue(any(e["name"] == "report" for e in data["traceEvents"]))
+
+    def test_probe_set_fans_out(self):
+        tracer = Tracer()
+        metrics = RunMetrics()
+        with ProbeSet(metrics, tracer, None).phase("candidate", "c1"):
+            pass
+
+        self.assertIn("candidate", metrics.snapshot()["phase_seconds"])
+        self.assertTrue(any(e.get("name") == "candidate" for e in tracer.events))
+
+    def test_profiler_dumps_stats(self):
+        path = os.path.join(self.test_dir, "run.prof")
+        profiler = Profiler(path)
+        with profiler.section():
+            sorted(range(1000))
+        profiler.write()
+
+        stats = pstats.Stats(path)
+        self.assertGreater(stats.total_calls, 0)
+
+if __name__ == "__main__":
+    unittest.main()